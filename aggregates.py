@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Running aggregates over a set of income streams
+Totals are adjusted as stream fields change, so status queries read them
+in O(1) instead of re-scanning every stream
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from state_registry import STREAMS, StateRegistry
+
+logger = logging.getLogger(__name__)
+
+# Fields whose changes move a stream between or within the totals
+_STRUCTURAL = ("type", "status", "monthly_target")
+# Member count above which rebuild() sums the columns with NumPy
+_VECTOR_REBUILD = 1000
+
+
+class StreamAggregates:
+    """Active count, target sums and per-type totals of member streams
+
+    Streams join with :meth:`add` and leave with :meth:`remove`; after that
+    every write through an ``IncomeStream`` property updates the totals via
+    a registry watcher. ``version`` goes up on any change to a member, so
+    callers can cache anything derived from the streams and rebuild it only
+    when the version moves. Bulk column writes bypass the watcher and must
+    be followed by :meth:`rebuild`.
+    """
+
+    def __init__(self, registry: StateRegistry = STREAMS):
+        self.registry = registry
+        self.members = set()
+        self.version = 0
+        self.membership = 0  # bumped whenever streams join or leave
+        self._active = registry.code("status", "active")
+        self._columns = [registry.columns[f] for f in ("type", "status", "monthly_target", "current_earnings")]
+        self._clear()
+        registry.watch(self._changed)
+
+    def _clear(self):
+        self.count = 0
+        self.active_count = 0
+        self.monthly_target = 0.0
+        self.active_target = 0.0
+        self.earnings = 0.0
+        # type code -> [streams, active, monthly_target, active_target, earnings]
+        self._by_type: Dict[int, list] = {}
+
+    def _add(self, type_code: int, active: bool, target: float, earnings: float, sign: int):
+        totals = self._by_type.get(type_code)
+        if totals is None:
+            totals = self._by_type[type_code] = [0, 0, 0.0, 0.0, 0.0]
+        self.count += sign
+        self.monthly_target += sign * target
+        self.earnings += sign * earnings
+        totals[0] += sign
+        totals[2] += sign * target
+        totals[4] += sign * earnings
+        if active:
+            self.active_count += sign
+            self.active_target += sign * target
+            totals[1] += sign
+            totals[3] += sign * target
+
+    def _row(self, index: int):
+        types, statuses, targets, earnings = self._columns
+        return types[index], statuses[index] == self._active, targets[index], earnings[index]
+
+    def add(self, stream):
+        if stream._id in self.members:
+            return
+        self.members.add(stream._id)
+        self._add(*self._row(stream._id), 1)
+        self.version += 1
+        self.membership += 1
+
+    def remove(self, stream):
+        if stream._id not in self.members:
+            return
+        self.members.discard(stream._id)
+        self._add(*self._row(stream._id), -1)
+        self.version += 1
+        self.membership += 1
+
+    def reset(self, streams: Iterable = (), ids: Optional[Iterable[int]] = None):
+        """Make ``streams`` the member set and recompute every total
+
+        ``ids`` (their row indices) saves a pass over the views for bulk loads.
+        """
+        self.members = set(ids) if ids is not None else {s._id for s in streams}
+        self.membership += 1
+        self.rebuild(ids)
+
+    def rebuild(self, ids: Optional[Iterable[int]] = None):
+        """Recompute the totals from the columns (after bulk writes, or to shed float drift)"""
+        self._clear()
+        if len(self.members) >= _VECTOR_REBUILD:
+            self._rebuild_vectorized(self.members if ids is None else ids)
+        else:
+            for index in self.members:
+                self._add(*self._row(index), 1)
+        self.version += 1
+
+    def _rebuild_vectorized(self, ids: Iterable[int]):
+        import numpy as np
+
+        if isinstance(ids, range):
+            ids = np.arange(ids.start, ids.stop, ids.step)
+        else:
+            ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        types, statuses, targets, earnings = (np.frombuffer(c, dtype=c.typecode)[ids] for c in self._columns)
+        on = statuses == self._active
+        sums = [np.bincount(types, minlength=256), np.bincount(types[on], minlength=256),
+                np.bincount(types, weights=targets, minlength=256),
+                np.bincount(types[on], weights=targets[on], minlength=256),
+                np.bincount(types, weights=earnings, minlength=256)]
+        for code in np.flatnonzero(sums[0]).tolist():
+            totals = [int(sums[0][code]), int(sums[1][code]), float(sums[2][code]),
+                      float(sums[3][code]), float(sums[4][code])]
+            self._by_type[code] = totals
+            self.count += totals[0]
+            self.active_count += totals[1]
+            self.monthly_target += totals[2]
+            self.active_target += totals[3]
+            self.earnings += totals[4]
+
+    def _changed(self, index: int, field: str, old, new):
+        if index not in self.members:
+            return
+        self.version += 1
+        if field == "current_earnings":
+            delta = new - old
+            self.earnings += delta
+            self._by_type[self._columns[0][index]][4] += delta
+        elif field in _STRUCTURAL:
+            type_code, active, target, earnings = self._row(index)
+            if field == "type":
+                self._add(old, active, target, earnings, -1)
+            elif field == "status":
+                self._add(type_code, old == self._active, target, earnings, -1)
+            else:
+                self._add(type_code, active, old, earnings, -1)
+            self._add(type_code, active, target, earnings, 1)
+
+    def by_type(self) -> Dict[str, Dict]:
+        table = self.registry.tables["type"]
+        return {
+            table[code]: {
+                "streams": t[0],
+                "active_streams": t[1],
+                "monthly_target": t[2],
+                "monthly_projection": t[3],
+                "earnings": t[4],
+            }
+            for code, t in self._by_type.items() if t[0]
+        }
+
+
+class MemberArrays:
+    """Per-stream NumPy columns for engines that keep statistics on members
+
+    Columns are indexed by registry row, so a cycle's streams can be
+    updated with one fancy-indexed operation. The registry hands the rows
+    of released streams to new ones, so :meth:`forget_departed` resets
+    the rows of streams that left since it last ran. NumPy is imported on
+    the first :meth:`grow`.
+    """
+
+    def __init__(self, aggregates: StreamAggregates, fields: Dict[str, float]):
+        self.aggregates = aggregates
+        self.fields = dict(fields)  # column name -> initial value
+        self.rows = 0
+        for name in self.fields:
+            setattr(self, name, None)
+        self._members = set()
+        self._membership = None
+
+    def grow(self, rows: int):
+        if rows <= self.rows:
+            return
+        import numpy as np
+
+        size = max(rows, 2 * self.rows, 64)
+        for name, fill in self.fields.items():
+            grown = np.full(size, fill, dtype=np.float64)
+            if self.rows:
+                grown[:self.rows] = getattr(self, name)
+            setattr(self, name, grown)
+        self.rows = size
+
+    def forget_departed(self) -> List[int]:
+        """Reset the rows of streams that left; returns those rows"""
+        aggregates = self.aggregates
+        if aggregates.membership == self._membership:
+            return []
+        self._membership = aggregates.membership
+        departed = list(self._members - aggregates.members)
+        self._members = set(aggregates.members)
+        known = [index for index in departed if index < self.rows]
+        if known:
+            for name, fill in self.fields.items():
+                getattr(self, name)[known] = fill
+        return departed
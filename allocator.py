@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Auto-reinvest allocator
+Periodically re-splits the monthly target budget and the agent slots
+across streams by measured return per unit of cost
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from aggregates import MemberArrays, StreamAggregates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPITAL = 10000.0
+DEFAULT_ALLOCATOR = {
+    "interval_cycles": 24,      # cycles between rebalances
+    "reinvest_rate": 0.5,       # share of net earnings added to capital at each rebalance
+    "step": 0.5,                # fraction of the way to the solved split moved per rebalance
+    "min_share": 0.1,           # floor as a fraction of an equal split, so every stream keeps being measured
+    "max_stream_share": 0.35,   # cap per stream with automation.diversification on
+    "min_cost_seconds": 0.01,   # latency floor, so near-free streams do not dominate
+    "agent_slots": 20,          # agents shared across streams
+    "yield_span": 48,           # cycles; EWMA weight 2 / (span + 1)
+}
+# stream.agents before the allocator has split the slots: no limit
+UNALLOCATED = -1
+
+
+def solve_split(weights, low, high, budget: float, lam: Optional[float] = None,
+                max_iterations: int = 50) -> Tuple:
+    """Split ``budget`` in proportion to ``weights`` within per-entry bounds
+
+    Finds the level ``lam`` with ``sum(clip(weights / lam, low, high)) ==
+    budget`` by iterating on the set of unclipped entries, which settles in
+    a few O(n) passes. Passing the previous solve's ``lam`` starts from the
+    old active set, so a rebalance after small changes converges at once.
+    Returns the split and ``lam`` for the next call.
+    """
+    import numpy as np
+
+    if not weights.any():
+        return np.full(len(weights), budget / len(weights)), lam
+    if lam is None or lam <= 0:
+        lam = weights.sum() / budget
+    for _ in range(max_iterations):
+        x = np.clip(weights / lam, low, high)
+        free = (x > low) & (x < high)
+        if not free.any():
+            # Every entry sits on a bound: unless that already meets the
+            # budget, move lam to the nearest level that frees one
+            total = x.sum()
+            if abs(total - budget) <= 1e-9 * budget:
+                break
+            if total < budget:
+                floored = (x <= low) & (weights > 0)
+                if not floored.any():
+                    break
+                lam = (weights[floored] / low[floored]).max() * (1 - 1e-9)
+            else:
+                capped = x >= high
+                if not capped.any():
+                    break
+                lam = (weights[capped] / high[capped]).min() * (1 + 1e-9)
+            continue
+        remaining = budget - x[~free].sum()
+        if remaining <= 0:
+            break
+        new_lam = weights[free].sum() / remaining
+        if abs(new_lam - lam) <= 1e-12 * lam:
+            break
+        lam = new_lam
+    total = x.sum()
+    if total > 0 and abs(total - budget) > 1e-9 * budget:
+        x *= budget / total  # only if the bounds left no exact level
+    return x, lam
+
+
+def apportion(shares, slots: int):
+    """Largest-remainder rounding of ``shares`` to ``slots`` whole units
+
+    While there are at least as many slots as shares every entry gets one
+    first and only the rest is split, so no stream is starved of work.
+    """
+    import numpy as np
+
+    total = shares.sum()
+    if slots <= 0 or total <= 0:
+        return np.zeros(len(shares), dtype=np.int64)
+    floor = 1 if slots >= len(shares) else 0
+    spare = slots - floor * len(shares)
+    quotas = shares * (spare / total)
+    units = np.floor(quotas).astype(np.int64)
+    short = spare - int(units.sum())
+    if short > 0:
+        units[np.argsort(units - quotas, kind="stable")[:short]] += 1
+    return units + floor
+
+
+class Allocator:
+    """Reinvests earnings and rebalances targets and agents across streams
+
+    On with ``automation.auto_reinvest``; tuned by the optional
+    ``allocator`` section. Every cycle the pnl of each stream per unit of
+    target and size (its yield) and its wall latency feed per-stream
+    EWMAs. Every ``interval_cycles`` a share of the net earnings since
+    the last rebalance is reinvested: capital grows by it and the total
+    monthly target grows in proportion. That total is split across the
+    active streams in proportion to yield per second of latency, bounded
+    below by ``min_share`` of an equal split and above by
+    ``max_stream_share``, and targets move ``step`` of the way there.
+    Agent slots follow the new targets, at least one per active stream
+    while ``agent_slots`` allows; a stream's slots bound how much work its
+    strategy plugin keeps in flight (see ``StrategyRunner``).
+    """
+
+    def __init__(self, aggregates: StreamAggregates, config: Dict):
+        self.aggregates = aggregates
+        self.registry = aggregates.registry
+        self.stats = MemberArrays(aggregates, {"cycles": 0, "returns": 0.0, "seconds": 0.0})
+        self.capital = config.get("execution", {}).get("capital", DEFAULT_CAPITAL)
+        self.earned = 0.0  # net earnings since the last rebalance
+        self.last_cycle = 0
+        self.rebalances = 0
+        self.last_solve_ms = 0.0
+        self._lam = None
+        self.configure(config)
+
+    def configure(self, config: Dict):
+        """(Re)read the settings, e.g. after a config reload"""
+        automation = config.get("automation", {})
+        settings = {**DEFAULT_ALLOCATOR, **config.get("allocator", {})}
+        self.enabled = bool(automation.get("auto_reinvest", False))
+        self.interval = int(settings["interval_cycles"])
+        self.reinvest_rate = settings["reinvest_rate"]
+        self.step = min(1.0, settings["step"])
+        self.min_share = settings["min_share"]
+        self.max_share = settings["max_stream_share"] if automation.get("diversification") else 1.0
+        self.min_cost = settings["min_cost_seconds"]
+        self.agent_slots = int(settings["agent_slots"])
+        self.alpha = 2.0 / (settings["yield_span"] + 1)
+
+    def _column(self, field: str):
+        import numpy as np
+
+        column = self.registry.columns[field]
+        return np.frombuffer(column, dtype=column.typecode)
+
+    def observe(self, streams: Sequence, results: Sequence, sizes: Sequence[float], seconds: Sequence[float]):
+        """Fold a cycle's earnings and latencies in (exceptions are skipped)"""
+        self.stats.forget_departed()
+        if not self.enabled:
+            return
+        done = [(s, r, k, t) for s, r, k, t in zip(streams, results, sizes, seconds)
+                if not isinstance(r, BaseException)]
+        if not done:
+            return
+        import numpy as np
+
+        ids = np.fromiter((d[0]._id for d in done), dtype=np.int64, count=len(done))
+        pnl = np.fromiter((d[1] for d in done), dtype=np.float64, count=len(done))
+        size = np.fromiter((d[2] for d in done), dtype=np.float64, count=len(done))
+        wall = np.fromiter((d[3] for d in done), dtype=np.float64, count=len(done))
+        stats = self.stats
+        stats.grow(int(ids.max()) + 1)
+        self.earned += float(pnl.sum())
+
+        deployed = self._column("monthly_target")[ids] * size
+        valid = deployed > 0
+        ids, pnl, wall, deployed = ids[valid], pnl[valid], wall[valid], deployed[valid]
+        observed = pnl / deployed
+        first = stats.cycles[ids] == 0
+        stats.cycles[ids] += 1
+        for name, value in (("returns", observed), ("seconds", wall)):
+            column = getattr(stats, name)
+            column[ids] = np.where(first, value, column[ids] + self.alpha * (value - column[ids]))
+
+    def due(self, cycle: int) -> bool:
+        return self.enabled and cycle - self.last_cycle >= self.interval
+
+    def rebalance(self, streams: Sequence, cycle: int) -> Optional[Dict]:
+        """Solve and write new targets and agent counts for ``streams`` (the active ones)
+
+        Writes go straight to the registry columns; the caller must
+        rebuild anything that watches them. Returns a summary, or None
+        when no stream has been measured yet.
+        """
+        self.stats.forget_departed()
+        self.last_cycle = cycle
+        if not streams:
+            return None
+        import numpy as np
+
+        started = time.perf_counter()
+        stats = self.stats
+        ids = np.fromiter((s._id for s in streams), dtype=np.int64, count=len(streams))
+        stats.grow(int(ids.max()) + 1)
+        measured = stats.cycles[ids] > 0
+        if not measured.any():
+            return None
+
+        # Reinvest: capital grows by the reinvested share, losses are borne in full
+        reinvested = self.earned * self.reinvest_rate if self.earned > 0 else self.earned
+        targets = self._column("monthly_target")[ids]
+        budget = targets.sum() * max(0.0, 1 + reinvested / self.capital) if self.capital > 0 else targets.sum()
+        self.capital += reinvested
+        self.earned = 0.0
+
+        score = np.maximum(stats.returns[ids], 0.0) / np.maximum(stats.seconds[ids], self.min_cost)
+        score[~measured] = score[measured].mean()  # unmeasured streams start at the average
+        n = len(ids)
+        low = np.full(n, self.min_share * budget / n)
+        high = np.full(n, max(self.max_share, 1.0 / n) * budget)
+        split, self._lam = solve_split(score, low, high, budget, self._lam)
+
+        new_targets = targets + self.step * (split - targets)
+        new_targets *= budget / new_targets.sum()
+        agents = apportion(new_targets, self.agent_slots)
+        self._column("monthly_target")[ids] = new_targets
+        self._column("agents")[ids] = agents
+        self.last_solve_ms = (time.perf_counter() - started) * 1000
+        self.rebalances += 1
+
+        summary = {
+            "streams": n,
+            "capital": self.capital,
+            "reinvested": reinvested,
+            "monthly_target": float(new_targets.sum()),
+            "moved": float(np.abs(new_targets - targets).sum()),
+            "solve_ms": self.last_solve_ms,
+        }
+        logger.info(f"Rebalanced {n} streams: target ${summary['monthly_target']:.2f}/month "
+                    f"(reinvested ${reinvested:.2f}, moved ${summary['moved']:.2f}) "
+                    f"in {self.last_solve_ms:.2f}ms")
+        return summary
+
+    def state(self) -> Dict:
+        """Capital and rebalance position, for checkpoints"""
+        return {"capital": self.capital, "earned": self.earned, "last_cycle": self.last_cycle}
+
+    def load_state(self, state: Dict):
+        self.capital = state["capital"]
+        self.earned = state["earned"]
+        self.last_cycle = state["last_cycle"]
+
+    def summary(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "capital": self.capital,
+            "pending_earnings": self.earned,
+            "rebalances": self.rebalances,
+            "last_solve_ms": self.last_solve_ms,
+        }
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Throughput and scaling benchmarks for the orchestrators
+Runs process_tasks, run_income_stream and run_income_cycle with the
+simulated work sleeps switched off, sweeps agent/task/stream counts and
+compares the results against a JSON baseline
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from metrics import LatencyHistogram, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+OUTPUT_PATH = os.path.join("benchmarks", "latest.json")
+
+# Parameter grids per suite; every combination is one case
+SWEEPS = {
+    "full": {
+        "process_tasks": {"agents": [5, 50, 200], "tasks": [2000, 20000]},
+        "run_income_stream": {"agents": [5, 50, 200], "tasks": [2000, 20000]},
+        "run_income_cycle": {"streams": [5, 50, 500], "cycles": [400]},
+    },
+    "quick": {
+        "process_tasks": {"agents": [5, 50], "tasks": [5000]},
+        "run_income_stream": {"agents": [5, 50], "tasks": [5000]},
+        "run_income_cycle": {"streams": [5, 50], "cycles": [1000]},
+    },
+}
+
+SPECIALTIES = ["market_analysis", "trading", "content", "api", "data"]
+
+# run_income_cycle measures the bare cycle: the risk engine and the
+# allocator are pinned off so the numbers do not move with the defaults
+CYCLE_AUTOMATION = {"auto_reinvest": False, "risk_management": False, "diversification": False}
+
+
+def _merged(registry: MetricsRegistry, name: str) -> LatencyHistogram:
+    merged = LatencyHistogram()
+    for (metric_name, _), metric in registry.metrics.items():
+        if metric_name == name:
+            merged.merge(metric)
+    return merged
+
+
+async def _bench_process_tasks(agents: int, tasks: int):
+    from system_core import MobileAIAgent, MobileOrchestrator
+
+    MobileAIAgent.task_delay = 0
+    registry = MetricsRegistry()
+    orch = MobileOrchestrator(metrics=registry)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(agents):
+            orch.register_agent(MobileAIAgent(f"agent-{i}", SPECIALTIES[i % len(SPECIALTIES)]))
+    started = time.perf_counter()
+    await orch.process_tasks(tasks, collect=False)
+    return time.perf_counter() - started, tasks, _merged(registry, "agent_task_seconds"), "task"
+
+
+async def _bench_run_income_stream(agents: int, tasks: int):
+    from system_enhanced import EnhancedOrchestrator, RealAIAgent
+
+    RealAIAgent.task_delay = 0
+    registry = MetricsRegistry()
+    orch = EnhancedOrchestrator(metrics=registry)
+    duration = max(1, tasks // agents)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(agents):
+            orch.register_agent(RealAIAgent(f"agent-{i}", SPECIALTIES[i % len(SPECIALTIES)]))
+        started = time.perf_counter()
+        await orch.run_income_stream("Benchmark", duration=duration)
+        elapsed = time.perf_counter() - started
+    await orch.close()
+    return elapsed, duration * agents, _merged(registry, "agent_task_seconds"), "task"
+
+
+async def _bench_run_income_cycle(streams: int, cycles: int):
+    from clock import SimulatedClock
+    from wealth_generator import IncomeStream, WealthGenerator
+
+    logging.disable(logging.INFO)
+    registry = MetricsRegistry()
+    generator = WealthGenerator(clock=SimulatedClock(), metrics=registry)
+    generator.config["automation"] = dict(CYCLE_AUTOMATION)
+    generator.risk.configure(generator.config)
+    generator.allocator.configure(generator.config)
+    now = generator.clock.now().isoformat()
+    generator.income_streams = [
+        IncomeStream(f"Stream {i}", "active" if i % 2 else "passive", "active", 100.0 + i, 0.0, now)
+        for i in range(streams)
+    ]
+    started = time.perf_counter()
+    for _ in range(cycles):
+        await generator.run_income_cycle()
+    return time.perf_counter() - started, streams * cycles, registry.histogram("income_cycle_seconds"), "cycle"
+
+
+BENCHMARKS = {
+    "process_tasks": _bench_process_tasks,
+    "run_income_stream": _bench_run_income_stream,
+    "run_income_cycle": _bench_run_income_cycle,
+}
+
+
+def run_case(case: Dict) -> Dict:
+    """Run one case in the current process and measure it"""
+    elapsed, items, latency, unit = asyncio.run(BENCHMARKS[case["suite"]](**case["params"]))
+    return {
+        "items": items,
+        "seconds": elapsed,
+        "tasks_per_sec": items / elapsed if elapsed > 0 else 0.0,
+        "latency_of": unit,
+        "p50_ms": latency.percentile(50) / 1000,
+        "p99_ms": latency.percentile(99) / 1000,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def case_id(case: Dict) -> str:
+    return case["suite"] + "[" + ",".join(f"{k}={v}" for k, v in case["params"].items()) + "]"
+
+
+def build_cases(sweep: str, suites: Optional[List[str]] = None) -> List[Dict]:
+    cases = []
+    for suite, grid in SWEEPS[sweep].items():
+        if suites and suite not in suites:
+            continue
+        keys = list(grid)
+        combos = [{}]
+        for key in keys:
+            combos = [dict(c, **{key: v}) for c in combos for v in grid[key]]
+        cases.extend({"suite": suite, "params": params} for params in combos)
+    return cases
+
+
+def run_cases(cases: List[Dict], repeat: int = 3) -> Dict[str, Dict]:
+    """Run every case ``repeat`` times, each in a fresh process so peak RSS is per case"""
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for case in cases:
+            runs = pool.map(run_case, [case] * repeat, chunksize=1)
+            result = {
+                "suite": case["suite"],
+                "params": case["params"],
+                "items": runs[0]["items"],
+                "latency_of": runs[0]["latency_of"],
+                "repeats": repeat,
+                # Best of the repeats: noise from other processes only ever slows a run down
+                "tasks_per_sec": max(r["tasks_per_sec"] for r in runs),
+                "p50_ms": min(r["p50_ms"] for r in runs),
+                "p99_ms": min(r["p99_ms"] for r in runs),
+                "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+            }
+            results[case_id(case)] = result
+            print(f"  {case_id(case):<48} {result['tasks_per_sec']:>12,.0f}/s  "
+                  f"p50 {result['p50_ms']:>8.3f}ms  p99 {result['p99_ms']:>8.3f}ms  "
+                  f"rss {result['peak_rss_mb']:>6.1f}MB", flush=True)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = 0.25,
+            latency_threshold: float = 1.5) -> List[Dict]:
+    """Cases that got worse than the baseline by more than the thresholds
+
+    Throughput and RSS use ``threshold``. p99 comes from 2x-wide histogram
+    buckets, so it uses the looser ``latency_threshold`` (1.5 = more than
+    one bucket worse).
+    """
+    checks = [("tasks_per_sec", -1, threshold), ("peak_rss_mb", 1, threshold), ("p99_ms", 1, latency_threshold)]
+    regressions = []
+    for cid, current in results.items():
+        base = baseline.get(cid)
+        if not base:
+            continue
+        for field, direction, limit in checks:
+            if not base.get(field):
+                continue
+            change = current[field] / base[field] - 1
+            if change * direction > limit:
+                regressions.append({"case": cid, "metric": field, "baseline": base[field],
+                                    "current": current[field], "change": change})
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Orchestrator throughput benchmarks")
+    parser.add_argument('--quick', action='store_true', help='Small sweep (CI)')
+    parser.add_argument('--suite', action='append', choices=sorted(BENCHMARKS),
+                        help='Only run this suite (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the best is kept')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='Where to write this run\'s results')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Flag throughput drops / RSS growth beyond this fraction')
+    parser.add_argument('--latency-threshold', type=float, default=1.5,
+                        help='Flag p99 growth beyond this fraction')
+    args = parser.parse_args()
+
+    sweep = "quick" if args.quick else "full"
+    cases = build_cases(sweep, args.suite)
+    print(f"Running {len(cases)} cases x {args.repeat} ({sweep} sweep, sleeps disabled)")
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sweep": sweep,
+            "repeat": args.repeat,
+        },
+        "results": run_cases(cases, args.repeat),
+    }
+    _write_json(args.output, report)
+    print(f"Results written to {args.output}")
+
+    status = 0
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline["results"], args.threshold, args.latency_threshold)
+        compared = len(set(report["results"]) & set(baseline["results"]))
+        print(f"Compared {compared} cases against {args.baseline} "
+              f"(commit {baseline['meta'].get('commit')}, {baseline['meta'].get('timestamp')})")
+        for r in regressions:
+            print(f"  REGRESSION {r['case']} {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} "
+                  f"({r['change']:+.1%})")
+        if regressions:
+            status = 1
+        else:
+            print("  No regressions")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Crash-safe checkpoints for long runs
+A compact binary snapshot of registry rows plus a write-ahead log of the
+rows changed since, both written from a worker thread
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import struct
+import zlib
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from state_registry import StateRegistry
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"WGCP1\n"
+FRAME = struct.Struct("<II")  # payload length, crc32
+_DTYPES = {"int": np.int64, "float": np.float64, "code": np.uint8, "time": np.int64}
+
+
+def _capture(registry: StateRegistry, ids: np.ndarray, positions: np.ndarray, meta: Dict) -> Tuple[Dict, List]:
+    """Copy ``ids`` rows out of the registry (cheap, on the caller's thread)"""
+    header = {"meta": meta, "registry": registry.name, "rows": len(ids),
+              "columns": [], "strings": {}, "tables": {}}
+    arrays = [positions.astype(np.int64)]
+    for field, kind in registry.kinds.items():
+        column = registry.columns[field]
+        if kind == "str":
+            header["strings"][field] = [column[i] for i in ids.tolist()]
+            continue
+        header["columns"].append([field, kind])
+        arrays.append(np.frombuffer(column, dtype=_DTYPES[kind])[ids])
+        if kind == "code":
+            header["tables"][field] = list(registry.tables[field])
+    return header, arrays
+
+
+def _encode(header: Dict, arrays: List[np.ndarray]) -> bytes:
+    head = json.dumps(header, separators=(",", ":")).encode()
+    payload = b"".join([struct.pack("<I", len(head)), head] + [a.tobytes() for a in arrays])
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode(payload: bytes) -> Tuple[Dict, np.ndarray, Dict[str, np.ndarray]]:
+    (head_len,) = struct.unpack_from("<I", payload)
+    header = json.loads(payload[4:4 + head_len])
+    rows = header["rows"]
+    offset = 4 + head_len
+    positions = np.frombuffer(payload, dtype=np.int64, count=rows, offset=offset)
+    offset += positions.nbytes
+    columns = {}
+    for field, kind in header["columns"]:
+        columns[field] = np.frombuffer(payload, dtype=_DTYPES[kind], count=rows, offset=offset)
+        offset += columns[field].nbytes
+    return header, positions, columns
+
+
+def _read_frames(path: str) -> Tuple[List[bytes], int]:
+    """Intact frames of a file and the offset just past the last one"""
+    frames = []
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = len(MAGIC) if data.startswith(MAGIC) else 0
+    while offset + FRAME.size <= len(data):
+        length, crc = FRAME.unpack_from(data, offset)
+        payload = data[offset + FRAME.size:offset + FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break  # torn write at the tail
+        frames.append(payload)
+        offset += FRAME.size + length
+    return frames, offset
+
+
+def _fsync_dir(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CheckpointStore:
+    """Numbered snapshots (``snapshot-N.bin``) with a WAL each (``wal-N.log``)
+
+    A snapshot is written to a temporary file, fsynced and renamed into
+    place, so it is either complete or absent. WAL frames carry a length
+    and CRC; a torn frame at the tail is cut off on recovery. Older
+    generations beyond ``keep`` are deleted once a newer snapshot exists.
+    """
+
+    def __init__(self, directory: str, keep: int = 2):
+        self.directory = directory
+        self.keep = max(1, keep)
+        os.makedirs(directory, exist_ok=True)
+        self.seq = max(self._sequences(), default=0)
+        self._wal = None
+
+    def _path(self, kind: str, seq: int) -> str:
+        suffix = "bin" if kind == "snapshot" else "log"
+        return os.path.join(self.directory, f"{kind}-{seq:08d}.{suffix}")
+
+    def _sequences(self) -> List[int]:
+        pattern = re.compile(r"snapshot-(\d{8})\.bin$")
+        return sorted(int(m.group(1)) for p in glob.glob(os.path.join(self.directory, "snapshot-*.bin"))
+                      if (m := pattern.search(p)))
+
+    def write_snapshot(self, frame: bytes) -> int:
+        seq = self.seq + 1
+        path = self._path("snapshot", seq)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(frame)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+
+        if self._wal:
+            self._wal.close()
+        self._wal = open(self._path("wal", seq), 'wb')
+        self.seq = seq
+        for old in self._sequences()[:-self.keep]:
+            for kind in ("snapshot", "wal"):
+                try:
+                    os.remove(self._path(kind, old))
+                except FileNotFoundError:
+                    pass
+        return seq
+
+    def append_wal(self, frame: bytes):
+        if self._wal is None:
+            self._wal = open(self._path("wal", self.seq), 'ab')
+        self._wal.write(frame)
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    def load(self) -> Optional[Tuple[bytes, List[bytes]]]:
+        """(snapshot payload, WAL payloads) of the newest readable generation"""
+        for seq in reversed(self._sequences()):
+            frames, _ = _read_frames(self._path("snapshot", seq))
+            if not frames:
+                logger.warning(f"Checkpoint snapshot {seq} is unreadable, trying an older one")
+                continue
+            wal_path = self._path("wal", seq)
+            wal = []
+            if os.path.exists(wal_path):
+                wal, end = _read_frames(wal_path)
+                if end < os.path.getsize(wal_path):
+                    logger.warning(f"Dropping torn tail of {wal_path}")
+                    with open(wal_path, 'r+b') as f:
+                        f.truncate(end)
+            self.seq = seq
+            return frames[0], wal
+        return None
+
+    def clear(self):
+        """Delete every generation; other files in the directory are left alone"""
+        self.close()
+        pattern = re.compile(r"(snapshot-\d{8}\.bin(\.tmp)?|wal-\d{8}\.log)$")
+        for name in os.listdir(self.directory):
+            if pattern.match(name):
+                os.remove(os.path.join(self.directory, name))
+        self.seq = 0
+
+    def close(self):
+        if self._wal:
+            self._wal.close()
+            self._wal = None
+
+
+class StreamCheckpointer:
+    """Checkpoints a ``WealthGenerator``: its streams plus run counters
+
+    Rows written through view properties are tracked with a registry
+    watcher, so each WAL frame holds only the streams that changed since
+    the previous one. A full snapshot is taken every ``snapshot_every``
+    frames and whenever streams join or leave. Rows are copied on the
+    loop; encoding and fsync happen in a worker thread, and a checkpoint
+    only waits if the previous write is still in flight.
+    """
+
+    def __init__(self, generator, directory: str, snapshot_every: int = 100, keep: int = 2):
+        self.generator = generator
+        self.store = CheckpointStore(directory, keep)
+        self.snapshot_every = snapshot_every
+        self.frames_since_snapshot = 0
+        self._ids = None
+        self._positions: Dict[int, int] = {}
+        self._membership = None
+        self._dirty = set()
+        self._all_dirty = False
+        self._pending: Optional[asyncio.Future] = None
+        registry = generator.aggregates.registry
+        self.registry = registry
+        registry.watch(self._changed)
+
+    def _changed(self, index: int, field: str, old, new):
+        if index in self._positions:
+            self._dirty.add(index)
+
+    def mark_all_dirty(self):
+        """After bulk column writes that bypass the watcher (``simulate_cycles``)"""
+        self._all_dirty = True
+
+    def _meta(self) -> Dict:
+        g = self.generator
+        return {
+            "total_earnings": g.total_earnings,
+            "cycle_count": g.cycle_count,
+            "runtime_seconds": (g.clock.now() - g.start_time).total_seconds(),
+            # Snapshot position -> cycle the risk engine resumes the stream at
+            "paused": [[self._positions[index], until] for index, until in g.risk.paused_until().items()
+                       if index in self._positions],
+            "allocator": g.allocator.state(),
+        }
+
+    async def checkpoint(self, snapshot: bool = False):
+        """Write a WAL frame, or a snapshot when one is due"""
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+        g = self.generator
+        loop = asyncio.get_running_loop()
+        if (snapshot or self._ids is None or self._membership != g.aggregates.membership
+                or self.frames_since_snapshot >= self.snapshot_every):
+            self._ids = np.fromiter((s._id for s in g.income_streams), dtype=np.int64,
+                                    count=len(g.income_streams))
+            self._positions = {index: pos for pos, index in enumerate(self._ids.tolist())}
+            self._membership = g.aggregates.membership
+            header, arrays = _capture(self.registry, self._ids, np.arange(len(self._ids)), self._meta())
+            header["snapshot"] = True
+            self._dirty.clear()
+            self._all_dirty = False
+            self.frames_since_snapshot = 0
+            self._pending = loop.run_in_executor(None, lambda: self.store.write_snapshot(_encode(header, arrays)))
+            return
+
+        if self._all_dirty:
+            positions = np.arange(len(self._ids))
+        else:
+            positions = np.fromiter((self._positions[i] for i in self._dirty), dtype=np.int64,
+                                    count=len(self._dirty))
+        self._dirty.clear()
+        self._all_dirty = False
+        header, arrays = _capture(self.registry, self._ids[positions], positions, self._meta())
+        self.frames_since_snapshot += 1
+        self._pending = loop.run_in_executor(None, lambda: self.store.append_wal(_encode(header, arrays)))
+
+    def restore(self, stream_cls: type) -> bool:
+        """Rebuild the generator's streams and counters from disk; False if nothing saved"""
+        loaded = self.store.load()
+        if loaded is None:
+            return False
+        snapshot, wal = loaded
+        header, _, columns = _decode(snapshot)
+        rows = header["rows"]
+        columns = {field: values.copy() for field, values in columns.items()}
+        strings = header["strings"]
+        meta = header["meta"]
+        tables = header["tables"]
+        for payload in wal:
+            frame, positions, values = _decode(payload)
+            for field, column in values.items():
+                columns[field][positions] = column
+            for field, column in frame["strings"].items():
+                target = strings[field]
+                for pos, value in zip(positions.tolist(), column):
+                    target[pos] = value
+            meta = frame["meta"]
+            tables = frame["tables"]  # tables only grow, so the newest covers every code
+
+        # Code tables of the saving process -> codes of this one
+        for field, table in tables.items():
+            lut = np.array([self.registry.code(field, value) for value in table] or [0], dtype=np.uint8)
+            columns[field] = lut[columns[field]]
+        for field, kind in self.registry.kinds.items():
+            if field not in columns and field not in strings:
+                # Field added since this checkpoint was written
+                if kind == "str":
+                    strings[field] = [""] * rows
+                else:
+                    columns[field] = np.zeros(rows, dtype=_DTYPES[kind])
+        ids = self.registry.extend({**columns, **strings}, rows)
+        streams = stream_cls._views(ids)
+
+        g = self.generator
+        g._set_streams(streams, ids)
+        g.total_earnings = meta["total_earnings"]
+        g.cycle_count = meta["cycle_count"]
+        g.start_time = g.clock.now() - timedelta(seconds=meta["runtime_seconds"])
+        if "allocator" in meta:
+            g.allocator.load_state(meta["allocator"])
+        if "paused" in meta:
+            for pos, until in meta["paused"]:
+                g.risk.hold(streams[pos], until)
+        else:
+            # Written before pauses were saved: give paused streams a fresh cooldown
+            for stream in streams:
+                if stream.status == "paused":
+                    g.risk.hold(stream, g.cycle_count + g.risk.cooldown_cycles)
+        self._ids = None  # next checkpoint is a fresh snapshot of this process's rows
+        logger.info(f"Resumed {rows} streams at cycle {g.cycle_count} from checkpoint "
+                    f"{self.store.seq} (+{len(wal)} WAL frames)")
+        return True
+
+    async def close(self):
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+        self.store.close()
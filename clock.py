@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Pluggable clocks for the wealth generation loop
+WallClock sleeps for real; SimulatedClock jumps straight to the wake-up time
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class WallClock:
+    """Real time: ``datetime.now()`` and ``asyncio.sleep``"""
+
+    simulated = False
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    async def sleep(self, seconds: float):
+        import asyncio
+
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock:
+    """Virtual time that advances only when something sleeps
+
+    Sleeping moves the clock to ``now + seconds`` and yields to the event loop
+    once. Sleeps started at the same virtual instant (e.g. streams processed
+    concurrently under ``gather``) therefore overlap instead of adding up.
+    """
+
+    simulated = True
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._now = start or datetime.now()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance(self, seconds: float):
+        """Move the clock forward without yielding"""
+        self._now += timedelta(seconds=seconds)
+
+    async def sleep(self, seconds: float):
+        import asyncio
+
+        wake_at = self._now + timedelta(seconds=seconds)
+        await asyncio.sleep(0)
+        if wake_at > self._now:
+            self._now = wake_at
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Config hot-reload
+Watches the config file (inotify on Linux, mtime polling elsewhere),
+validates every new version and hands it over for the next cycle
+"""
+
+import json
+import logging
+import os
+import struct
+import sys
+from typing import Dict, List, Optional, Set
+
+from settings import load_config
+from strategy_registry import EXECUTORS
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event mask bits and the fixed part of an event record
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def validate_config(config) -> List[str]:
+    """Problems that make ``config`` unusable; empty if it can be applied"""
+    if not isinstance(config, dict):
+        return ["config must be a JSON object"]
+    errors = []
+    for section in ("strategies", "targets", "automation", "plugins", "risk", "allocator"):
+        if section in config and not isinstance(config[section], dict):
+            errors.append(f"{section} must be an object")
+    if errors:
+        return errors
+    if "strategies" not in config:
+        errors.append("strategies section is missing")
+
+    for key, enabled in config.get("strategies", {}).items():
+        if not isinstance(enabled, bool):
+            errors.append(f"strategies.{key} must be true or false")
+    for key, value in config.get("targets", {}).items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            errors.append(f"targets.{key} must be a non-negative number")
+    for key, value in config.get("automation", {}).items():
+        if not isinstance(value, (bool, int, float)):
+            errors.append(f"automation.{key} must be a boolean or a number")
+    risk = config.get("automation", {}).get("max_risk_per_trade")
+    if isinstance(risk, (int, float)) and not isinstance(risk, bool) and not 0 < risk <= 1:
+        errors.append("automation.max_risk_per_trade must be in (0, 1]")
+    for section in ("risk", "allocator"):
+        for key, value in config.get(section, {}).items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                errors.append(f"{section}.{key} must be a positive number")
+
+    for key, options in config.get("plugins", {}).items():
+        if not isinstance(options, dict):
+            errors.append(f"plugins.{key} must be an object")
+            continue
+        if options.get("executor", "asyncio") not in EXECUTORS:
+            errors.append(f"plugins.{key}.executor must be one of {EXECUTORS}")
+        timeout = options.get("timeout")
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                    or timeout <= 0):
+            errors.append(f"plugins.{key}.timeout must be a positive number or null")
+    return errors
+
+
+def changed_sections(old: Dict, new: Dict) -> Set[str]:
+    """Top-level sections that differ between two configs"""
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+def _inotify_watch(directory: str) -> Optional[int]:
+    """A non-blocking inotify fd reporting finished writes and renames in ``directory``"""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+
+    try:
+        libc = ctypes.CDLL("libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class ConfigWatcher:
+    """Reloads a JSON config file when it changes
+
+    The parent directory is watched rather than the file, so editors that
+    save by renaming a new file over the old one are seen too. Bursts of
+    events are debounced. A new version that fails to parse or validate
+    is logged and ignored; the last good one stays pending until
+    :meth:`take` collects it, so the caller decides when to apply it.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 2.0, debounce: float = 0.2):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.mode = None  # "inotify" or "poll" once started
+        self.reloads = 0
+        self.rejected = 0
+        self._name = os.fsencode(os.path.basename(self.path))
+        self._pending: Optional[Dict] = None
+        self._fd: Optional[int] = None
+        self._timer: Optional["asyncio.TimerHandle"] = None
+        self._poller: Optional["asyncio.Task"] = None
+        self._signature = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    async def start(self):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self._fd = _inotify_watch(os.path.dirname(self.path))
+        if self._fd is not None:
+            loop.add_reader(self._fd, self._on_events)
+            self.mode = "inotify"
+        else:
+            self._poller = asyncio.create_task(self._poll())
+            self.mode = "poll"
+        logger.info(f"Watching {self.path} for config changes ({self.mode})")
+
+    def _on_events(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        touched = False
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            touched = touched or name == self._name
+        if touched:
+            import asyncio
+
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = asyncio.get_running_loop().call_later(self.debounce, self._reload)
+
+    async def _poll(self):
+        import asyncio
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                self._reload()
+
+    def _reload(self):
+        self._timer = None
+        try:
+            config = load_config(self.path, None, cached=False)
+        except (OSError, json.JSONDecodeError) as e:
+            self.rejected += 1
+            logger.error(f"Ignoring unreadable config {self.path}: {e}")
+            return
+        if config is None:
+            logger.warning(f"Config {self.path} disappeared; keeping the current one")
+            return
+        errors = validate_config(config)
+        if errors:
+            self.rejected += 1
+            logger.error(f"Ignoring invalid config {self.path}: " + "; ".join(errors))
+            return
+        self.reloads += 1
+        self._pending = config
+
+    def take(self) -> Optional[Dict]:
+        """The newest valid config seen since the last call, if any"""
+        config, self._pending = self._pending, None
+        return config
+
+    async def close(self):
+        import asyncio
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
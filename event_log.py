@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Append-only NDJSON event log
+Buffered writes, periodic fsync, size-based segment rotation and an
+incremental reader for rebuilding reports in constant memory
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _segment_path(base_path: str, index: int) -> str:
+    stem, ext = os.path.splitext(base_path)
+    return f"{stem}.{index:06d}{ext or '.ndjson'}"
+
+
+def list_segments(base_path: str) -> List[str]:
+    """Existing segments of a log, oldest first"""
+    stem, ext = os.path.splitext(base_path)
+    pattern = re.compile(re.escape(os.path.basename(stem)) + r"\.(\d{6})" + re.escape(ext or ".ndjson") + "$")
+    paths = [p for p in glob.glob(f"{glob.escape(stem)}.*") if pattern.search(os.path.basename(p))]
+    return sorted(paths)
+
+
+def remove_segments(base_path: str) -> int:
+    """Delete every segment of a log; returns how many there were"""
+    paths = list_segments(base_path)
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+
+class EventLogWriter:
+    """Appends JSON records, one per line, to numbered segment files
+
+    Records are buffered in memory up to ``buffer_bytes``; the file is
+    fsynced at most every ``fsync_interval`` seconds; a new segment is
+    started once the current one exceeds ``max_bytes``.
+    """
+
+    def __init__(self, base_path: str, max_bytes: int = 64 * 1024 * 1024,
+                 buffer_bytes: int = 64 * 1024, fsync_interval: float = 1.0):
+        self.base_path = base_path
+        self.max_bytes = max_bytes
+        self.buffer_bytes = buffer_bytes
+        self.fsync_interval = fsync_interval
+        self.records_written = 0
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._last_sync = time.monotonic()
+
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        segments = list_segments(base_path)
+        self.segment_index = int(re.findall(r"\.(\d{6})", segments[-1])[-1]) if segments else 1
+        self._file = open(_segment_path(base_path, self.segment_index), 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    @property
+    def current_segment(self) -> str:
+        return _segment_path(self.base_path, self.segment_index)
+
+    def append(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.records_written += 1
+        if self._buffered >= self.buffer_bytes:
+            self.flush()
+        elif time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.flush(sync=True)
+
+    def flush(self, sync: bool = False):
+        if self._buffer:
+            data = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+            self._file.write(data)
+            self._size += len(data.encode('utf-8'))
+        self._file.flush()
+        if sync or time.monotonic() - self._last_sync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+        if self._size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self.segment_index += 1
+        self._file = open(self.current_segment, 'a', encoding='utf-8')
+        self._size = 0
+        logger.info(f"Event log rotated to {self.current_segment}")
+
+    def close(self):
+        self.flush(sync=True)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventLogReader:
+    """Reads records appended since the last call, across segments
+
+    Only complete lines are consumed, so a reader can tail a log that is
+    still being written.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.segment: Optional[str] = None
+        self.offset = 0
+
+    def read(self) -> Iterator[Dict]:
+        for path in list_segments(self.base_path):
+            if self.segment is not None and path < self.segment:
+                continue
+            if path != self.segment:
+                self.segment, self.offset = path, 0
+            with open(path, 'rb') as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    self.offset += len(line)
+                    yield json.loads(line)
+
+
+class ReportAccumulator:
+    """Running totals over ``{"source", "amount", "ts"}`` records
+
+    State is O(distinct sources) no matter how many records are folded in.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.total = 0.0
+        self.by_source: Dict[str, Dict] = {}
+        self.by_type: Dict[str, int] = {}
+        self.first_ts = None
+        self.last_ts = None
+
+    def apply(self, record: Dict):
+        self.records += 1
+        kind = record.get("type", "event")
+        self.by_type[kind] = self.by_type.get(kind, 0) + 1
+        ts = record.get("ts")
+        if ts is not None:
+            if self.first_ts is None:
+                self.first_ts = ts
+            self.last_ts = ts
+        amount = record.get("amount")
+        if amount is None:
+            return
+        self.total += amount
+        source = record.get("source", "unknown")
+        entry = self.by_source.get(source)
+        if entry is None:
+            entry = self.by_source[source] = {"count": 0, "amount": 0.0}
+        entry["count"] += 1
+        entry["amount"] += amount
+
+    def update(self, reader: EventLogReader) -> "ReportAccumulator":
+        for record in reader.read():
+            self.apply(record)
+        return self
+
+    def summary(self) -> Dict:
+        return {
+            "records": self.records,
+            "total": self.total,
+            "by_type": dict(self.by_type),
+            "by_source": {k: dict(v) for k, v in self.by_source.items()},
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+        }
+
+
+def rebuild_report(base_path: str) -> Dict:
+    """Fold an entire log into a summary in one streaming pass"""
+    return ReportAccumulator().update(EventLogReader(base_path)).summary()
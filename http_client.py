@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Shared pooled HTTP client for agents calling external APIs"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+from yarl import URL
+
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens/second up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        self._refill()
+        self.tokens -= tokens
+        if self.tokens < 0:
+            # Reserve now, then sleep until the deficit has been refilled
+            wait = -self.tokens / self.rate
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+
+class HostStats:
+    __slots__ = ("requests", "errors", "retries", "connections_created", "connections_reused", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.latency = LatencyHistogram()
+
+    def summary(self) -> Dict[str, Any]:
+        acquired = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "connections_created": self.connections_created,
+            "pool_hit_rate": self.connections_reused / acquired if acquired else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+
+class HttpClientPool:
+    """One keep-alive ``aiohttp.ClientSession`` per host, shared by all agents
+
+    Requests are rate limited per API key with token buckets and retried
+    on connection errors and 429/5xx responses with full-jitter
+    exponential backoff.
+    """
+
+    def __init__(self, limit_per_host: int = 20, keepalive_timeout: float = 30.0,
+                 rate_per_key: float = 10.0, burst_per_key: Optional[float] = None,
+                 max_retries: int = 3, backoff_base: float = 0.1, backoff_max: float = 2.0,
+                 timeout: float = 30.0):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.rate_per_key = rate_per_key
+        self.burst_per_key = burst_per_key
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.sessions: Dict[Tuple[str, str, int], aiohttp.ClientSession] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, HostStats] = {}
+
+    def _host_stats(self, host: str) -> HostStats:
+        stats = self.stats.get(host)
+        if stats is None:
+            stats = self.stats[host] = HostStats()
+        return stats
+
+    def _session(self, url: URL) -> aiohttp.ClientSession:
+        key = (url.scheme, url.host, url.port)
+        session = self.sessions.get(key)
+        if session is None or session.closed:
+            stats = self._host_stats(url.host)
+            trace = aiohttp.TraceConfig()
+
+            async def on_create(session, ctx, params):
+                stats.connections_created += 1
+
+            async def on_reuse(session, ctx, params):
+                stats.connections_reused += 1
+
+            trace.on_connection_create_end.append(on_create)
+            trace.on_connection_reuseconn.append(on_reuse)
+            connector = aiohttp.TCPConnector(limit=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout,
+                                             ttl_dns_cache=300)
+            session = self.sessions[key] = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, trace_configs=[trace])
+        return session
+
+    def bucket(self, api_key: str) -> TokenBucket:
+        bucket = self.buckets.get(api_key)
+        if bucket is None:
+            bucket = self.buckets[api_key] = TokenBucket(self.rate_per_key, self.burst_per_key)
+        return bucket
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def request(self, method: str, url: str, api_key: Optional[str] = None, **kwargs) -> Any:
+        """Send a request and return the decoded JSON body (text if not JSON)"""
+        url = URL(url)
+        session = self._session(url)
+        stats = self._host_stats(url.host)
+        bucket = self.bucket(api_key) if api_key else None
+
+        for attempt in range(self.max_retries + 1):
+            if bucket:
+                await bucket.acquire()  # retries count against the key's rate too
+            started = time.perf_counter()
+            stats.requests += 1
+            try:
+                async with session.request(method, url, **kwargs) as resp:
+                    if resp.status in RETRY_STATUSES and attempt < self.max_retries:
+                        stats.retries += 1
+                        delay = self._backoff(attempt, resp.headers.get("Retry-After"))
+                    else:
+                        resp.raise_for_status()
+                        if resp.content_type == "application/json":
+                            return await resp.json()
+                        return await resp.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    stats.errors += 1
+                    raise
+                stats.retries += 1
+                delay = self._backoff(attempt)
+                logger.debug(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+            except aiohttp.ClientResponseError:
+                stats.errors += 1
+                raise
+            finally:
+                stats.latency.record(time.perf_counter() - started)
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> Any:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> Any:
+        return await self.request("POST", url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": {host: stats.summary() for host, stats in self.stats.items()},
+            "rate_limited_seconds": {key[:8]: b.waited_seconds for key, b in self.buckets.items()},
+        }
+
+    async def close(self):
+        await asyncio.gather(*(s.close() for s in self.sessions.values()))
+        self.sessions.clear()
+
+
+class StubAPIServer:
+    """Local aiohttp server mimicking the chat and (batched) text completions APIs
+
+    ``failure_rate`` of requests get a 503 so retry paths can be exercised.
+    """
+
+    def __init__(self, latency_ms: float = 5.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._runner = None
+        self.url = None
+
+    async def _completions(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        payload = await request.json()
+        await asyncio.sleep(self.latency_ms / 1000)
+        if self._rng.random() < self.failure_rate:
+            return web.json_response({"error": "overloaded"}, status=503)
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": f"Stub analysis: {prompt[:60]}"}}],
+        })
+
+    async def _text_completions(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        payload = await request.json()
+        await asyncio.sleep(self.latency_ms / 1000)
+        if self._rng.random() < self.failure_rate:
+            return web.json_response({"error": "overloaded"}, status=503)
+        prompts = payload.get("prompt", "")
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        return web.json_response({
+            "choices": [{"index": i, "text": f"Stub analysis: {p[:60]}"} for i, p in enumerate(prompts)],
+        })
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        app.router.add_post("/v1/completions", self._text_completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}/v1"
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def _demo(requests: int, agents: int, failure_rate: float):
+    server = StubAPIServer(failure_rate=failure_rate)
+    base = await server.start()
+    pool = HttpClientPool(rate_per_key=1000, backoff_base=0.01)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            pool.post(f"{base}/chat/completions", api_key=f"key-{i % agents}",
+                      json={"messages": [{"role": "user", "content": f"task {i}"}]})
+            for i in range(requests)
+        ))
+    finally:
+        await pool.close()
+        await server.stop()
+    elapsed = time.perf_counter() - started
+    host = next(iter(pool.get_stats()["hosts"].values()))
+    print(f"{requests} requests from {agents} keys in {elapsed:.2f}s "
+          f"({requests / elapsed:,.0f} req/s), {server.requests} hit the server")
+    print(f"  pool hit rate {host['pool_hit_rate']:.1%}, {host['connections_created']} connections, "
+          f"{host['retries']} retries, p50 {host['latency']['p50_us']:.0f}us p99 {host['latency']['p99_us']:.0f}us")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pooled client against a local stub API")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--agents', type=int, default=100)
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(_demo(args.requests, args.agents, args.failure_rate))
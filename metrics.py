@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""Lightweight in-process metrics primitives"""
+
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from settings import env
+
+logger = logging.getLogger(__name__)
+
+
+_BOUNDS_S = [25e-6 * 2 ** i for i in range(20)]
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets (microseconds) with cheap O(log buckets) recording"""
+
+    BOUNDS_US = [25 * 2 ** i for i in range(20)]  # 25us .. ~13s
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        # Kept to a handful of bytecodes: this sits on every instrumented task
+        self.counts[bisect.bisect_left(_BOUNDS_S, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Fold ``other``'s samples into this histogram"""
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def total_us(self) -> float:
+        return self.total * 1e6
+
+    @property
+    def max_us(self) -> float:
+        return self.max * 1e6
+
+    def percentile(self, p: float) -> float:
+        """``p``-th percentile, interpolated linearly within its bucket
+
+        The bucket holding the rank spans its lower bound to its upper
+        bound (or the largest sample, if lower), so samples that share a
+        2x bucket still give distinct p50 and p99.
+        """
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = float(self.BOUNDS_US[i]) if i < len(self.BOUNDS_US) else self.max_us
+            if n and seen + n >= rank:
+                upper = min(upper, self.max_us)
+                lower = min(lower, upper)
+                return lower + (upper - lower) * max(rank - seen, 0) / n
+            seen += n
+            lower = upper
+        return self.max_us
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count if self.count else 0.0,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "max_us": self.max_us,
+            "buckets": {f"le_{b}us": c for b, c in zip(self.BOUNDS_US, self.counts) if c},
+        }
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _NullMetric(LatencyHistogram):
+    """Shared stand-in handed out by a disabled registry; records nothing"""
+    __slots__ = ()
+
+    def record(self, seconds: float):
+        pass
+
+    def inc(self, amount: float = 1.0):
+        pass
+
+    def set(self, value: float):
+        pass
+
+
+_NULL = _NullMetric()
+
+_KINDS = {"counter": Counter, "gauge": Gauge, "histogram": LatencyHistogram}
+
+
+class MetricsRegistry:
+    """Named, labelled counters, gauges and latency histograms
+
+    Look a metric up once and keep the object: recording is then a couple
+    of attribute updates, with no locking (everything runs on one loop).
+    A registry created with ``enabled=False`` hands out a no-op metric so
+    instrumented code needs no branches.
+
+    Each metric name holds at most ``max_series`` label sets; further ones
+    share a single series whose label values are all ``"_other"``, so a
+    label fed from an unbounded set (one per stream, say) cannot grow the
+    registry or the exposition without limit.
+    """
+
+    OVERFLOW = "_other"
+
+    def __init__(self, enabled: bool = True, prefix: str = "wealth_", max_series: int = 1000):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.max_series = max_series
+        self.metrics: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], object] = {}
+        self.series: Dict[str, Dict[Tuple[Tuple[str, str], ...], object]] = {}  # name -> labels -> metric
+        self.kinds: Dict[str, str] = {}
+        self.created = time.time()
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def _get(self, kind: str, name: str, labels: Dict[str, str]):
+        if not self.enabled:
+            return _NULL
+        labels = self._labels(labels)
+        metric = self.metrics.get((name, labels))
+        if metric is None:
+            known = self.kinds.setdefault(name, kind)
+            if known != kind:
+                raise ValueError(f"Metric {name} already registered as a {known}")
+            series = self.series.setdefault(name, {})
+            if len(series) >= self.max_series:
+                overflow = tuple((k, self.OVERFLOW) for k, _ in labels)
+                metric = series.get(overflow)
+                if metric is not None:
+                    return metric
+                logger.warning(f"Metric {name} reached {self.max_series} label sets; "
+                               f"further ones are merged into {self.OVERFLOW}")
+                labels = overflow
+            metric = self.metrics[(name, labels)] = series[labels] = _KINDS[kind]()
+        return metric
+
+    def labelled(self, name: str) -> Dict[Tuple[Tuple[str, str], ...], object]:
+        """Existing series of ``name`` by label set; treat as read-only"""
+        return self.series.get(name, {})
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get("counter", name, labels)
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        return self._get("gauge", name, labels)
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        return self._get("histogram", name, labels)
+
+    def reset(self):
+        self.metrics.clear()
+        self.series.clear()
+        self.kinds.clear()
+        self.created = time.time()
+
+    @staticmethod
+    def _label_str(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+        parts = ['%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view; histograms are summarised, throughput is per second of uptime"""
+        uptime = time.time() - self.created
+        out: Dict[str, Dict] = {"counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), metric in sorted(self.metrics.items()):
+            key = name + self._label_str(labels)
+            if isinstance(metric, LatencyHistogram):
+                summary = metric.summary()
+                summary.pop("buckets")
+                summary["per_second"] = metric.count / uptime if uptime > 0 else 0.0
+                out["histograms"][key] = summary
+            elif isinstance(metric, Counter):
+                out["counters"][key] = metric.value
+            else:
+                out["gauges"][key] = metric.value
+        out["uptime_seconds"] = uptime
+        return out
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (histograms in seconds)"""
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), metric in sorted(self.metrics.items()):
+            full = self.prefix + name
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} {self.kinds[name]}")
+            if isinstance(metric, LatencyHistogram):
+                cumulative = 0
+                for bound, n in zip(metric.BOUNDS_US, metric.counts):
+                    cumulative += n
+                    le = 'le="%g"' % (bound / 1e6)
+                    lines.append(f"{full}_bucket{self._label_str(labels, le)} {cumulative}")
+                inf = 'le="+Inf"'
+                lines.append(f"{full}_bucket{self._label_str(labels, inf)} {metric.count}")
+                lines.append(f"{full}_sum{self._label_str(labels)} {metric.total:.9g}")
+                lines.append(f"{full}_count{self._label_str(labels)} {metric.count}")
+            else:
+                lines.append(f"{full}{self._label_str(labels)} {metric.value:.17g}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the orchestrators unless they are given one
+METRICS = MetricsRegistry(enabled=env("WEALTH_METRICS", "1") != "0")
+METRICS_PORT = int(env("WEALTH_METRICS_PORT", "0"))
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag: how late a ``sleep(interval)`` wakes up"""
+
+    def __init__(self, registry: MetricsRegistry = METRICS, interval: float = 0.1):
+        self.interval = interval
+        self.lag = registry.histogram("event_loop_lag_seconds")
+        self.current = registry.gauge("event_loop_lag_last_seconds")
+        self._task: Optional["asyncio.Task"] = None
+
+    async def _run(self):
+        import asyncio
+
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.lag.record(lag)
+            self.current.set(lag)
+
+    def start(self):
+        import asyncio
+
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        import asyncio
+
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class SamplingProfiler:
+    """Statistical profiler that can be switched on and off at runtime
+
+    A daemon thread snapshots the target thread's Python stack every
+    ``interval`` seconds and counts identical stacks. Nothing is hooked
+    into the profiled code, so the cost while stopped is zero and while
+    running is one stack walk per sample. ``collapsed()`` emits the
+    ``frame;frame;frame count`` format read by flamegraph tools.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Dict[Tuple[str, ...], int] = {}
+        self.total_samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, thread_id: Optional[int] = None):
+        """Start sampling ``thread_id`` (default: the calling thread)"""
+        if self.running:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started ({self.interval * 1000:.0f}ms interval)")
+
+    def stop(self):
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+            logger.info(f"Sampling profiler stopped after {self.total_samples} samples")
+        self._thread = None
+
+    def reset(self):
+        self.samples.clear()
+        self.total_samples = 0
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = tuple(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+            self.total_samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {n}\n"
+                       for stack, n in sorted(self.samples.items(), key=lambda kv: -kv[1]))
+
+    def top(self, n: int = 20) -> List[Dict]:
+        """Functions by self time (share of samples where they were on top)"""
+        leaf: Dict[str, int] = {}
+        for stack, count in self.samples.items():
+            leaf[stack[-1]] = leaf.get(stack[-1], 0) + count
+        total = self.total_samples or 1
+        ranked = sorted(leaf.items(), key=lambda kv: -kv[1])[:n]
+        return [{"frame": frame, "samples": count, "share": count / total} for frame, count in ranked]
+
+
+class MetricsServer:
+    """Minimal local HTTP exporter on the event loop being measured
+
+    Routes::
+
+        GET /metrics          Prometheus text
+        GET /metrics.json     JSON snapshot
+        GET /profile          collapsed stacks of the sampling profiler
+        GET /profile/top      hottest frames as JSON
+        GET /profile/start    start sampling the loop thread
+        GET /profile/stop     stop sampling
+
+    Also runs a :class:`LoopLagMonitor` while serving.
+    """
+
+    def __init__(self, registry: MetricsRegistry = METRICS, profiler: Optional[SamplingProfiler] = None,
+                 host: str = "127.0.0.1", port: int = METRICS_PORT or 9108, lag_interval: float = 0.1):
+        self.registry = registry
+        self.profiler = profiler or SamplingProfiler()
+        self.host = host
+        self.port = port
+        self.lag_monitor = LoopLagMonitor(registry, lag_interval)
+        self.requests = 0
+        self._server = None
+        self._loop_thread: Optional[int] = None
+
+    async def start(self) -> int:
+        import asyncio
+
+        self._loop_thread = threading.get_ident()
+        self._server = await asyncio.start_server(self._on_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.lag_monitor.start()
+        logger.info(f"Metrics exporter on http://{self.host}:{self.port}/metrics")
+        return self.port
+
+    def _route(self, path: str) -> Tuple[str, str, str]:
+        if path == "/metrics":
+            return "200 OK", "text/plain; version=0.0.4", self.registry.prometheus()
+        if path == "/metrics.json":
+            body = self.registry.snapshot()
+            body["profiler"] = {"running": self.profiler.running, "samples": self.profiler.total_samples}
+            return "200 OK", "application/json", json.dumps(body, indent=2)
+        if path == "/profile":
+            return "200 OK", "text/plain", self.profiler.collapsed()
+        if path == "/profile/top":
+            return "200 OK", "application/json", json.dumps(self.profiler.top(), indent=2)
+        if path == "/profile/start":
+            self.profiler.start(self._loop_thread)
+            return "200 OK", "text/plain", "profiler started\n"
+        if path == "/profile/stop":
+            self.profiler.stop()
+            return "200 OK", "text/plain", f"profiler stopped, {self.profiler.total_samples} samples\n"
+        return "404 Not Found", "text/plain", "not found\n"
+
+    async def _on_client(self, reader: "asyncio.StreamReader", writer: "asyncio.StreamWriter"):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?", 1)[0] if len(parts) >= 2 else "/"
+            self.requests += 1
+            status, content_type, body = self._route(path)
+            data = body.encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self.profiler.stop()
+        await self.lag_monitor.stop()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def _overhead(tasks: int, work_us: float, registry: MetricsRegistry) -> float:
+    import asyncio
+
+    from scheduler import TaskScheduler
+
+    class BusyAgent:
+        def __init__(self, name: str):
+            self.name = name
+
+        async def execute_task(self, task):
+            deadline = time.perf_counter() + work_us / 1e6
+            while time.perf_counter() < deadline:
+                pass
+            await asyncio.sleep(0)
+            return task
+
+    scheduler = TaskScheduler([BusyAgent(f"agent-{i}") for i in range(5)], metrics=registry)
+    started = time.perf_counter()
+    await scheduler.run({"id": i} for i in range(tasks))
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Measure instrumentation overhead on the task scheduler")
+    parser.add_argument('--tasks', type=int, default=50000)
+    parser.add_argument('--work-us', type=float, default=100.0, help='CPU time each task spends')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    timings = {"off": [], "on": []}
+    for _ in range(args.repeat):
+        for mode in timings:
+            registry = MetricsRegistry(enabled=mode == "on")
+            timings[mode].append(asyncio.run(_overhead(args.tasks, args.work_us, registry)))
+    off, on = min(timings["off"]), min(timings["on"])
+    print(f"{args.tasks} tasks x {args.work_us:.0f}us: disabled {off:.3f}s, enabled {on:.3f}s, "
+          f"overhead {(on / off - 1) * 100:+.2f}% ({(on - off) / args.tasks * 1e6:.2f}us/task)")
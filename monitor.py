@@ -1,49 +1,159 @@
 #!/usr/bin/env python3
 """Real-time monitoring dashboard"""
 
-import time
-import json
+import sys
+import asyncio
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
+from status_feed import DEFAULT_SOCKET, subscribe
 
-def display_dashboard():
+WIDTH = 70
+Cells = Dict[Tuple[int, int], str]
+
+# Sample data shown until a live feed connects (or with --demo)
+SAMPLE_STREAMS = [
+    ("API Monetization", "Active", 42.50, 33.33),
+    ("Crypto Arbitrage", "Active", 28.75, 26.67),
+    ("Content Generation", "Active", 15.20, 20.00),
+    ("Bounty Hunting", "Active", 8.50, 13.33),
+    ("Affiliate Marketing", "Active", 5.30, 6.67)
+]
+
+
+class Screen:
+    """Keeps the last frame and repaints only cells whose text changed"""
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.cells: Cells = {}
+
+    def clear(self):
+        self.out.write("\033[2J\033[H")
+        self.cells = {}
+
+    def draw(self, cells: Cells):
+        buf = []
+        for (row, col), text in cells.items():
+            old = self.cells.get((row, col))
+            if old != text:
+                pad = " " * max(0, len(old or "") - len(text))
+                buf.append(f"\033[{row};{col}H{text}{pad}")
+        for (row, col), old in self.cells.items():
+            if (row, col) not in cells:
+                buf.append(f"\033[{row};{col}H{' ' * len(old)}")
+        if buf:
+            self.out.write("".join(buf) + f"\033[{max(r for r, _ in cells) + 1};1H")
+            self.out.flush()
+        self.cells = dict(cells)
+
+
+def stream_rows(snapshot: Optional[Dict]) -> Tuple[List[Tuple[str, str, float, float]], str, str]:
+    """(name, status, earned, daily target) rows, the source and what "earned" covers
+
+    Earnings are the last 24 hours when the status carries a ``last_24h``
+    window (a stream missing from it earned nothing), lifetime totals
+    otherwise.
+    """
+    if not snapshot:
+        return SAMPLE_STREAMS, "sample data", "Today"
+    if "streams" in snapshot:
+        today = snapshot.get("last_24h")
+        if today is None:
+            rows = [(s["name"], s["status"].title(), s["current_earnings"], s["monthly_target"] / 30)
+                    for s in snapshot["streams"]]
+            return rows, "live", "Total"
+        rows = [(s["name"], s["status"].title(), today.get(s["name"], 0.0), s["monthly_target"] / 30)
+                for s in snapshot["streams"]]
+        return rows, "live", "Today"
+    rows = [(a["name"], f"{a['tasks']} tasks", a["revenue"], 0.0) for a in snapshot.get("agents", [])]
+    return rows, "live", "Total"
+
+
+def layout(snapshot: Optional[Dict]) -> Cells:
+    """Dashboard cells keyed by (row, column); every field has a fixed width"""
+    rows, source, window = stream_rows(snapshot)
+    cells: Cells = {}
+    line = iter(range(1, 1000))
+
+    def put(text: str, col: int = 1, row: Optional[int] = None):
+        cells[(row if row is not None else next(line), col)] = text
+
+    put("=" * WIDTH)
+    put("  AUTONOMOUS WEALTH ECOSYSTEM - LIVE DASHBOARD")
+    put("=" * WIDTH)
+    next(line)
+    put(f"  Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}   [{source:<11}]")
+    next(line)
+    put("  INCOME STREAMS:")
+    put("  " + "-" * 66)
+    put(f"  {'Stream':<25} {'Status':<12} {window:<15} {'Target'}")
+    put("  " + "-" * 66)
+
+    for name, status, today, target in rows:
+        row = next(line)
+        put(f"  {name[:25]:<25}", 1, row)
+        put(f"{status[:12]:<12}", 29, row)
+        put(f"{'$' + format(today, ',.2f'):<15}", 42, row)
+        put(f"{'$' + format(target, ',.2f'):<12}", 58, row)
+
+    total = sum(r[2] for r in rows)
+    target = sum(r[3] for r in rows)
+    pct = f" ({total / target * 100:.1f}%)" if target and window == "Today" else ""
+    put("  " + "-" * 66)
+    next(line)
+    label = "TOTAL TODAY" if window == "Today" else "TOTAL EARNED"
+    put(f"  {label}: ${total:,.2f} / ${target:,.2f}{pct}")
+    projection = snapshot.get("monthly_projection", target * 30) if snapshot else target * 30
+    put(f"  MONTHLY PROJECTION: ${projection:,.2f}")
+    next(line)
+    put("  Press Ctrl+C to exit")
+    put("=" * WIDTH)
+    return cells
+
+
+def display_dashboard(snapshot: Optional[Dict] = None, screen: Optional[Screen] = None):
     """Display real-time earnings dashboard"""
-    print("\033[2J\033[H")  # Clear screen
-    print("=" * 70)
-    print("  AUTONOMOUS WEALTH ECOSYSTEM - LIVE DASHBOARD")
-    print("=" * 70)
-    print()
-    print(f"  Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
-    print("  INCOME STREAMS:")
-    print("  " + "-" * 66)
-    print(f"  {'Stream':<25} {'Status':<12} {'Today':<15} {'Target'}")
-    print("  " + "-" * 66)
-    
-    # Sample data (replace with actual)
-    streams = [
-        ("API Monetization", "Active", "$42.50", "$33.33"),
-        ("Crypto Arbitrage", "Active", "$28.75", "$26.67"),
-        ("Content Generation", "Active", "$15.20", "$20.00"),
-        ("Bounty Hunting", "Active", "$8.50", "$13.33"),
-        ("Affiliate Marketing", "Active", "$5.30", "$6.67")
-    ]
-    
-    for stream, status, today, target in streams:
-        print(f"  {stream:<25} {status:<12} {today:<15} {target}")
-    
-    print("  " + "-" * 66)
-    print(f"\n  TOTAL TODAY: $100.25 / $100.00 (100.2%)")
-    print(f"  MONTHLY PROJECTION: $3,007.50")
-    print()
-    print("  Press Ctrl+C to exit")
-    print("=" * 70)
+    screen = screen or Screen()
+    if not screen.cells:
+        screen.clear()
+    screen.draw(layout(snapshot))
 
 
-if __name__ == "__main__":
+async def run_dashboard(socket_path: Optional[str], interval: float):
+    """Redraw every ``interval`` seconds from the latest snapshot on the feed"""
+    screen = Screen()
+    latest: Dict = {}
+
+    async def follow():
+        while True:
+            try:
+                async for snapshot in subscribe(socket_path):
+                    latest["snapshot"] = snapshot
+            except (FileNotFoundError, ConnectionError):
+                pass
+            latest.pop("snapshot", None)
+            await asyncio.sleep(1.0)
+
+    feed = asyncio.create_task(follow()) if socket_path else None
     try:
         while True:
-            display_dashboard()
-            time.sleep(5)
+            display_dashboard(latest.get("snapshot"), screen)
+            await asyncio.sleep(interval)
+    finally:
+        if feed:
+            feed.cancel()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Live earnings dashboard")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Status feed socket of a running generator')
+    parser.add_argument('--interval', type=float, default=0.25, help='Refresh interval in seconds')
+    parser.add_argument('--demo', action='store_true', help='Show sample data without connecting')
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_dashboard(None if args.demo else args.socket, args.interval))
     except KeyboardInterrupt:
         print("\nMonitoring stopped.")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Request coalescing, micro-batching and response caching for model calls"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+BatchSender = Callable[[List[Dict], Hashable], Awaitable[List[Any]]]
+
+
+def request_key(request: Dict) -> str:
+    """Stable hash of a JSON-serialisable request"""
+    body = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after ``ttl`` seconds
+
+    With ``path`` set, entries are loaded on start and written back by
+    ``save()`` (atomically, via a temp file). Expiry uses wall-clock time
+    so persisted entries stay valid across restarts.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if expires < time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        self._data[key] = (time.time() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def load(self):
+        now = time.time()
+        with open(self.path, 'r') as f:
+            entries = json.load(f)
+        for key, expires, value in entries[-self.max_entries:]:
+            if expires > now:
+                self._data[key] = (expires, value)
+        logger.info(f"Loaded {len(self._data)} cached responses from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        entries = [[k, exp, v] for k, (exp, v) in self._data.items() if exp > now]
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class RequestCoalescer:
+    """Deduplicates, micro-batches and caches upstream calls
+
+    Identical requests already in flight share one future. Requests with
+    the same ``batch_key`` arriving within ``window_ms`` are sent together
+    through ``send_batch(requests, batch_key)`` (at most ``max_batch`` per
+    call), which must return one response per request in order. The batch
+    key is not part of the cache key, so it can carry routing details such
+    as the API key to bill.
+    """
+
+    def __init__(self, send_batch: BatchSender, window_ms: float = 5.0, max_batch: int = 16,
+                 cache: Optional[TTLCache] = None):
+        self.send_batch = send_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache = cache if cache is not None else TTLCache()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[Hashable, List[tuple]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._sending: Set[asyncio.Task] = set()  # the loop keeps only weak references to tasks
+        self.requests = 0
+        self.deduplicated = 0
+        self.upstream_calls = 0
+        self.batch_sizes: Dict[int, int] = {}
+
+    async def call(self, request: Dict, batch_key: Hashable = None) -> Any:
+        self.requests += 1
+        key = request_key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = self._inflight[key] = loop.create_future()
+        batch = self._pending.setdefault(batch_key, [])
+        batch.append((key, request, future))
+        if len(batch) >= self.max_batch:
+            self._flush(batch_key)
+        elif batch_key not in self._timers:
+            self._timers[batch_key] = loop.call_later(self.window, self._flush, batch_key)
+        return await asyncio.shield(future)
+
+    def _flush(self, batch_key: Hashable):
+        timer = self._timers.pop(batch_key, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(batch_key, None)
+        if batch:
+            task = asyncio.ensure_future(self._send(batch, batch_key))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[tuple], batch_key: Hashable):
+        self.upstream_calls += 1
+        self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+        try:
+            responses = await self.send_batch([request for _, request, _ in batch], batch_key)
+            if len(responses) != len(batch):
+                raise ValueError(f"send_batch returned {len(responses)} responses for {len(batch)} requests")
+        except Exception as e:
+            for key, _, future in batch:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (key, _, future), response in zip(batch, responses):
+            self.cache.put(key, response)
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.set_result(response)
+
+    def stats(self) -> Dict[str, Any]:
+        sent = sum(size * n for size, n in self.batch_sizes.items())
+        return {
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "upstream_calls": self.upstream_calls,
+            "calls_saved": self.requests - self.upstream_calls,
+            "mean_batch_size": sent / self.upstream_calls if self.upstream_calls else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "cache": self.cache.stats(),
+        }
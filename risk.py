@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Portfolio risk limits across income streams
+Volatility and drawdown are kept online per stream (EWMA and running
+peaks), so each cycle costs O(streams) however long the run has been
+"""
+
+import logging
+import math
+from typing import Dict, List, Sequence
+
+from aggregates import MemberArrays, StreamAggregates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPITAL = 10000.0
+DEFAULT_RISK = {
+    "volatility_span": 48,     # cycles; EWMA weight 2 / (span + 1)
+    "var_z": 2.33,             # one-sided 99% VaR multiplier
+    "max_drawdown": 0.2,       # fraction of capital (of the stream's share of it, per stream)
+    "max_stream_share": 0.35,  # largest exposure share one stream may hold with diversification on
+    "cooldown_cycles": 24,     # cycles a gated stream stays paused
+}
+
+
+class RiskEngine:
+    """Sizes streams before a cycle and gates them after it
+
+    Settings come from ``automation`` (``risk_management`` switches the
+    engine on, ``diversification`` caps exposure shares,
+    ``max_risk_per_trade`` is the per-cycle loss budget as a fraction of
+    ``execution.capital``) and the optional ``risk`` section.
+
+    Before a cycle each active stream gets a size in [0, 1]: small enough
+    that its 99% VaR, from the EWMA volatility of its pnl per unit of
+    size, stays within the budget, then cut so no stream holds more than
+    ``max_stream_share`` of the exposure (monthly target x size). After
+    the cycle the pnl updates the statistics; a stream whose drawdown
+    exceeds its share of ``max_drawdown`` is paused for
+    ``cooldown_cycles``, and a portfolio drawdown beyond it pauses every
+    active-type stream. Only streams paused here are resumed here.
+
+    Statistics live in :class:`aggregates.MemberArrays`, so the math is
+    vectorized over the streams of a cycle and NumPy is imported on the
+    first sizing, not at startup.
+    """
+
+    def __init__(self, aggregates: StreamAggregates, config: Dict):
+        self.aggregates = aggregates
+        registry = aggregates.registry
+        self.registry = registry
+        self._active_type = registry.code("type", "active")
+        self.stats = MemberArrays(aggregates, {"cycles": 0, "mean": 0.0, "var": 0.0,
+                                               "equity": 0.0, "peak": 0.0, "scale": 1.0})
+        self.portfolio = {"cycles": 0, "mean": 0.0, "var": 0.0, "equity": 0.0, "peak": 0.0}
+        self.exposure = 0.0
+        self.resized = 0
+        self.gated = 0
+        self._paused: Dict[int, tuple] = {}  # row -> (stream, cycle it may resume at)
+        self.configure(config)
+
+    def configure(self, config: Dict):
+        """(Re)read the limits, e.g. after a config reload"""
+        automation = config.get("automation", {})
+        settings = {**DEFAULT_RISK, **config.get("risk", {})}
+        self.enabled = bool(automation.get("risk_management", False))
+        self.diversification = bool(automation.get("diversification", False))
+        self.max_risk_per_trade = automation.get("max_risk_per_trade", 0.02)
+        self.capital = config.get("execution", {}).get("capital", DEFAULT_CAPITAL)
+        self.alpha = 2.0 / (settings["volatility_span"] + 1)
+        self.var_z = settings["var_z"]
+        self.max_drawdown = settings["max_drawdown"]
+        self.max_stream_share = settings["max_stream_share"]
+        self.cooldown_cycles = settings["cooldown_cycles"]
+
+    def _column(self, field: str, ids):
+        import numpy as np
+
+        column = self.registry.columns[field]
+        return np.frombuffer(column, dtype=column.typecode)[ids]
+
+    def resume_due(self, cycle: int):
+        """Reactivate streams whose cooldown is over, with a fresh drawdown peak"""
+        for index in self.stats.forget_departed():
+            self._paused.pop(index, None)
+        for index, (stream, until) in list(self._paused.items()):
+            if cycle < until:
+                continue
+            del self._paused[index]
+            if index in self.aggregates.members and stream.status == "paused":
+                if index < self.stats.rows:  # no statistics yet after a restore
+                    self.stats.peak[index] = self.stats.equity[index]
+                stream.status = "active"
+                logger.info(f"Risk: resuming {stream.name} after cooldown")
+
+    def paused_until(self) -> Dict[int, int]:
+        """Row -> cycle it may resume at, for each stream paused here"""
+        return {index: until for index, (_, until) in self._paused.items()}
+
+    def hold(self, stream, until: int):
+        """Keep ``stream`` paused until cycle ``until``, e.g. after a restore"""
+        self._paused[stream._id] = (stream, until)
+
+    def size(self, streams: Sequence) -> List[float]:
+        """Size multiplier for each of ``streams`` this cycle"""
+        if not self.enabled or not streams:
+            return [1.0] * len(streams)
+        import numpy as np
+
+        ids = np.fromiter((s._id for s in streams), dtype=np.int64, count=len(streams))
+        stats = self.stats
+        stats.grow(int(ids.max()) + 1)
+
+        vol = np.sqrt(stats.var[ids])
+        with np.errstate(divide="ignore"):
+            scale = np.minimum(1.0, self.capital * self.max_risk_per_trade / (self.var_z * vol))
+        targets = self._column("monthly_target", ids)
+        if self.diversification and len(ids) > 1:
+            exposure = targets * scale
+            total = exposure.sum()
+            if total > 0:
+                cap = max(self.max_stream_share, 1.0 / len(ids))
+                share = exposure / total
+                over = share > cap
+                scale[over] *= cap / share[over]
+
+        stats.scale[ids] = scale
+        self.exposure = float((targets * scale).sum())
+        self.resized = int((scale < 1.0).sum())
+        return scale.tolist()
+
+    def observe(self, streams: Sequence, results: Sequence, cycle: int) -> List:
+        """Fold a cycle's pnl into the statistics; returns the streams gated by it
+
+        ``results`` are the earnings of ``streams`` (exceptions are skipped).
+        """
+        if not self.enabled:
+            return []
+        done = [(s, r) for s, r in zip(streams, results) if not isinstance(r, BaseException)]
+        if not done:
+            return []
+        import numpy as np
+
+        ids = np.fromiter((s._id for s, _ in done), dtype=np.int64, count=len(done))
+        pnl = np.fromiter((r for _, r in done), dtype=np.float64, count=len(done))
+        stats = self.stats
+        stats.grow(int(ids.max()) + 1)
+        scale = stats.scale[ids]
+
+        # EWMA mean/variance of pnl per unit of size, so sizing does not feed back into it
+        raw = np.divide(pnl, scale, out=np.zeros_like(pnl), where=scale > 0)
+        first = stats.cycles[ids] == 0
+        stats.mean[ids[first]] = raw[first]  # start the average at the first observation
+        stats.cycles[ids] += 1
+        diff = raw - stats.mean[ids]
+        incr = self.alpha * diff
+        stats.mean[ids] += incr
+        stats.var[ids] = (1 - self.alpha) * (stats.var[ids] + diff * incr)
+        stats.equity[ids] += pnl
+        stats.peak[ids] = np.maximum(stats.peak[ids], stats.equity[ids])
+
+        p = self.portfolio
+        total = float(pnl.sum())
+        if not p["cycles"]:
+            p["mean"] = total
+        p["cycles"] += 1
+        diff = total - p["mean"]
+        p["mean"] += self.alpha * diff
+        p["var"] = (1 - self.alpha) * (p["var"] + diff * self.alpha * diff)
+        p["equity"] += total
+        p["peak"] = max(p["peak"], p["equity"])
+
+        exposure = self._column("monthly_target", ids) * scale
+        total_exposure = exposure.sum()
+        share = exposure / total_exposure if total_exposure > 0 else np.full(len(ids), 1.0 / len(ids))
+        breach = (stats.peak[ids] - stats.equity[ids]) > self.max_drawdown * self.capital * share
+        if p["peak"] - p["equity"] > self.max_drawdown * self.capital:
+            logger.warning(f"Risk: portfolio drawdown ${p['peak'] - p['equity']:.2f} over limit; "
+                           f"pausing active strategies")
+            breach |= self._column("type", ids) == self._active_type
+            p["peak"] = p["equity"]
+
+        gated = []
+        for i in np.flatnonzero(breach).tolist():
+            stream = done[i][0]
+            if stream.status != "active":
+                continue
+            stream.status = "paused"
+            self.hold(stream, cycle + self.cooldown_cycles)
+            gated.append(stream)
+            logger.warning(f"Risk: pausing {stream.name} for {self.cooldown_cycles} cycles "
+                           f"(drawdown ${stats.peak[stream._id] - stats.equity[stream._id]:.2f})")
+        self.gated += len(gated)
+        return gated
+
+    def summary(self) -> Dict:
+        p = self.portfolio
+        return {
+            "enabled": self.enabled,
+            "exposure": self.exposure,
+            "volatility": math.sqrt(p["var"]),
+            "drawdown": p["peak"] - p["equity"],
+            "resized_streams": self.resized,
+            "paused_streams": sorted(stream.name for stream, _ in self._paused.values()),
+            "gated_total": self.gated,
+        }
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Bounded-concurrency work-queue scheduler for orchestrator agents"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from metrics import METRICS, MetricsRegistry
+
+
+class AgentLoad:
+    """Live load counters for one agent"""
+    __slots__ = ("name", "capacity", "in_flight", "completed", "failed", "busy_seconds", "latency", "failures")
+
+    def __init__(self, name: str, capacity: int, registry: MetricsRegistry = METRICS):
+        self.name = name
+        self.capacity = capacity
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.latency = registry.histogram("agent_task_seconds", agent=name)
+        self.failures = registry.counter("agent_task_failures_total", agent=name)
+
+
+class TaskScheduler:
+    """Pull-based scheduler: each agent owns ``max_per_agent`` workers that
+    pull from one bounded queue, so an idle agent always takes the next task
+    and producers block (backpressure) once ``queue_size`` tasks are waiting.
+    """
+
+    def __init__(self, agents: List[Any], max_per_agent: int = 4, queue_size: Optional[int] = None,
+                 metrics: MetricsRegistry = METRICS):
+        if max_per_agent < 1:
+            raise ValueError("max_per_agent must be >= 1")
+        self.agents = agents
+        self.max_per_agent = max_per_agent
+        self._queue_size = queue_size
+        self.loads: Dict[int, AgentLoad] = {}  # id(agent) -> load; names need not be unique
+        self.peak_queue_depth = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._elapsed = 0.0
+        self.metrics = metrics
+        self.queue_wait = metrics.histogram("scheduler_queue_wait_seconds")
+        self._depth_gauge = metrics.gauge("scheduler_queue_depth")
+
+    @property
+    def queue_size(self) -> int:
+        """Queue bound; defaults to two pending tasks per worker slot"""
+        return self._queue_size or 2 * self.max_per_agent * max(len(self.agents), 1)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def run(self, tasks: Iterable[Dict[str, Any]],
+                  on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+        """Feed ``tasks`` through the agents and return how many completed.
+
+        Tasks are consumed lazily and results are handed to ``on_result`` as
+        they arrive, so memory stays flat regardless of the task count.
+        """
+        if not self.agents:
+            raise RuntimeError("No agents registered")
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        for agent in self.agents:
+            if id(agent) not in self.loads:
+                self.loads[id(agent)] = AgentLoad(agent.name, self.max_per_agent, self.metrics)
+
+        errors: List[BaseException] = []
+        completed = 0
+
+        queue_wait, depth_gauge = self.queue_wait, self._depth_gauge
+
+        async def worker(agent):
+            nonlocal completed
+            load = self.loads[id(agent)]
+            while True:
+                enqueued, task = await self._queue.get()
+                load.in_flight += 1
+                started = time.perf_counter()
+                queue_wait.record(started - enqueued)
+                try:
+                    result = await agent.execute_task(task)
+                except Exception as e:
+                    load.failed += 1
+                    load.failures.inc()
+                    if not errors:
+                        errors.append(e)
+                else:
+                    load.completed += 1
+                    completed += 1
+                    if on_result:
+                        try:
+                            on_result(result)
+                        except Exception as e:
+                            # A failing callback must not kill the worker, or join() never returns
+                            if not errors:
+                                errors.append(e)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    load.busy_seconds += elapsed
+                    load.latency.record(elapsed)
+                    load.in_flight -= 1
+                    self._queue.task_done()
+
+        started = time.perf_counter()
+        workers = [asyncio.create_task(worker(agent))
+                   for agent in self.agents for _ in range(self.max_per_agent)]
+        try:
+            for task in tasks:
+                await self._queue.put((time.perf_counter(), task))
+                depth = self._queue.qsize()
+                depth_gauge.set(depth)
+                if depth > self.peak_queue_depth:
+                    self.peak_queue_depth = depth
+            await self._queue.join()
+            depth_gauge.set(0)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._elapsed += time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+        return completed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, queue wait and per-agent utilization (busy time / slot time) and latency"""
+        slot_time = self._elapsed * self.max_per_agent
+        return {
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "queue_size": self.queue_size,
+            "max_per_agent": self.max_per_agent,
+            "queue_wait_p99_ms": self.queue_wait.percentile(99) / 1000,
+            "agents": [
+                {
+                    "name": load.name,
+                    "in_flight": load.in_flight,
+                    "completed": load.completed,
+                    "failed": load.failed,
+                    "utilization": load.busy_seconds / slot_time if slot_time > 0 else 0.0,
+                    "p50_ms": load.latency.percentile(50) / 1000,
+                    "p99_ms": load.latency.percentile(99) / 1000,
+                }
+                for load in self.loads.values()
+            ],
+        }
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Process-wide settings
+The .env file is read once, on the first lookup, and config files are
+parsed once per path and modification time
+"""
+
+import copy
+import functools
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Looked for in the working directory first, then next to the code
+ENV_FILES = (".env", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+_env_loaded = False
+
+
+def load_env():
+    """Apply the first .env file found to ``os.environ`` (existing variables win)
+
+    python-dotenv is only imported when there is a file to read, and a
+    missing package is reported instead of installed.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    path = next((p for p in ENV_FILES if os.path.isfile(p)), None)
+    if path is None:
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        logger.warning(f"Ignoring {path}: python-dotenv is not installed (pip install python-dotenv)")
+        return
+    load_dotenv(path)
+
+
+def env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """``os.getenv`` with the .env file applied"""
+    if not _env_loaded:
+        load_env()
+    return os.environ.get(name, default)
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_config(path: str, signature: Tuple[int, int, int]) -> Dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def load_config(path: Optional[str], default: Dict, cached: bool = True) -> Dict:
+    """The JSON config at ``path``, or ``default`` if there is none
+
+    Parsed once per (mtime_ns, size, inode); every caller gets its own
+    copy, so changing one never leaks into another. ``cached=False``
+    always re-reads the file, for callers that know it just changed
+    (timestamps can be too coarse to tell two quick edits apart).
+    """
+    if not path:
+        return default
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return default
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if not cached:
+        _parse_config.cache_clear()
+    return copy.deepcopy(_parse_config(path, signature))
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Multi-process sharded orchestration
+Agents are partitioned across worker processes, each running its own event
+loop; tasks and results cross process boundaries in batched messages
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from metrics import METRICS, LatencyHistogram, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Agent attributes mirrored back to the parent after every result batch
+COUNTER_FIELDS = ("tasks_completed", "revenue_generated")
+
+
+def _picklable_state(agent) -> Dict[str, Any]:
+    """Instance attributes that can cross a process boundary
+
+    Attributes named in the agent's ``shard_local`` tuple (connection
+    pools, gateways...) and anything unpicklable stay in the parent.
+    """
+    local = getattr(agent, "shard_local", ())
+    state = {}
+    # Registry views (state_registry.py) have no __dict__ but pickle by value
+    for key, value in (agent.__getstate__() or {}).items():
+        if key in local:
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        state[key] = value
+    return state
+
+
+class ShardContext:
+    """Per-process resources shared by the agents of one shard
+
+    Agents may define ``attach_shard(ctx)`` to pick up resources that could
+    not be pickled from the parent (HTTP pools, model gateways). Resources
+    are closed when the shard stops.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.resources: Dict[str, Any] = {}
+
+    def resource(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name not in self.resources:
+            self.resources[name] = factory()
+        return self.resources[name]
+
+    async def close(self):
+        for resource in reversed(list(self.resources.values())):
+            close = getattr(resource, "close", None)
+            if close:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+
+
+class _ShardWorker:
+    """Event loop side of a shard process"""
+
+    def __init__(self, conn, index: int, specs: List[Tuple[int, type, Dict]], agent_attrs: Dict[str, Any]):
+        self.conn = conn
+        self.ctx = ShardContext(index)
+        self.agents: Dict[int, Any] = {}
+        for agent_id, cls, state in specs:
+            agent = cls.__new__(cls)
+            if hasattr(agent, "__setstate__"):
+                agent.__setstate__(state)
+            else:
+                agent.__dict__.update(state)
+            for key, value in agent_attrs.items():
+                try:
+                    setattr(agent, key, value)
+                except AttributeError:
+                    # Slotted agents: class-level settings such as task_delay
+                    setattr(cls, key, value)
+            attach = getattr(agent, "attach_shard", None)
+            if attach:
+                attach(self.ctx)
+            self.agents[agent_id] = agent
+        self.latency = {agent_id: LatencyHistogram() for agent_id in self.agents}
+        self.outbox: List[Tuple[int, bool, Any]] = []
+        self.touched = set()
+        self.flush_scheduled = False
+        self.running: set = set()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        def read():
+            while True:
+                try:
+                    msg = self.conn.recv()
+                except (EOFError, OSError):
+                    msg = ("stop",)
+                loop.call_soon_threadsafe(inbox.put_nowait, msg)
+                if msg[0] == "stop":
+                    return
+
+        threading.Thread(target=read, name="shard-reader", daemon=True).start()
+        self.conn.send(("ready", self.ctx.index, os.getpid()))
+        while True:
+            msg = await inbox.get()
+            if msg[0] == "tasks":
+                for task_id, agent_id, task in msg[1]:
+                    t = loop.create_task(self._run(task_id, agent_id, task))
+                    self.running.add(t)
+                    t.add_done_callback(self.running.discard)
+            elif msg[0] == "stop":
+                break
+        if self.running:
+            await asyncio.gather(*self.running, return_exceptions=True)
+        self._flush()
+        await self.ctx.close()
+        self.conn.send(("stopped", self.ctx.index))
+
+    async def _run(self, task_id: int, agent_id: int, task: Dict):
+        agent = self.agents[agent_id]
+        started = time.perf_counter()
+        try:
+            result = await agent.execute_task(task)
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(repr(e))
+            self.outbox.append((task_id, False, e))
+        else:
+            self.outbox.append((task_id, True, result))
+        self.latency[agent_id].record(time.perf_counter() - started)
+        self.touched.add(agent_id)
+        if not self.flush_scheduled:
+            # Everything that completes in this loop iteration goes out as one message
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self.flush_scheduled = False
+        if not self.outbox:
+            return
+        counters = {agent_id: tuple(getattr(self.agents[agent_id], f, 0) for f in COUNTER_FIELDS)
+                    for agent_id in self.touched}
+        latency = {agent_id: (self.latency[agent_id].counts, self.latency[agent_id].count,
+                              self.latency[agent_id].total, self.latency[agent_id].max)
+                   for agent_id in self.touched}
+        self.conn.send(("results", self.outbox, counters, latency))
+        self.outbox = []
+        self.touched = set()
+
+
+def _shard_main(conn, index: int, specs: List[Tuple[int, type, Dict]], agent_attrs: Dict[str, Any]):
+    logging.disable(logging.INFO)
+    asyncio.run(_ShardWorker(conn, index, specs, agent_attrs).serve())
+
+
+class _Shard:
+    __slots__ = ("index", "process", "conn", "agents", "pending", "outbox", "sender", "futures", "pid")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.agents: List[int] = []
+        self.pending: List[Tuple[int, int, Dict]] = []
+        self.outbox: Optional[asyncio.Queue] = None
+        self.sender: Optional[asyncio.Task] = None
+        self.futures: Dict[int, asyncio.Future] = {}
+        self.pid = None
+
+
+class ShardedAgent:
+    """Parent-side view of an agent living in a shard
+
+    Attribute reads fall through to the original agent object, whose
+    counters are refreshed from the shard after every result batch, so
+    orchestrator code reading ``tasks_completed`` or ``revenue_generated``
+    sees the same numbers as in single-process mode.
+    """
+
+    def __init__(self, agent, pool: "ShardPool", agent_id: int):
+        self._agent = agent
+        self._pool = pool
+        self._agent_id = agent_id
+
+    def __getattr__(self, name):
+        return getattr(self._agent, name)
+
+    async def execute_task(self, task: Dict) -> Dict:
+        return await self._pool.submit(self._agent_id, task)
+
+
+class ShardPool:
+    """Worker processes hosting partitioned agents
+
+    ``partition="spread"`` deals the agents of every specialty round-robin
+    across shards (best balance); ``partition="specialty"`` keeps each
+    specialty on one shard, so CPU-heavy specialties don't share a core
+    with light ones. Agents are keyed by the id :meth:`add_agent` returns,
+    not by name: two agents may share a name.
+    """
+
+    def __init__(self, shards: Optional[int] = None, partition: str = "spread",
+                 agent_attrs: Optional[Dict[str, Any]] = None, metrics: MetricsRegistry = METRICS):
+        if partition not in ("spread", "specialty"):
+            raise ValueError(f"Unknown partition: {partition}")
+        self.shards = [_Shard(i) for i in range(shards or os.cpu_count() or 1)]
+        self.partition = partition
+        self.agent_attrs = agent_attrs or {}
+        self.metrics = metrics
+        self.agents: Dict[int, Any] = {}
+        self.shard_of: Dict[int, _Shard] = {}
+        self.by_specialty: Dict[str, itertools.cycle] = {}
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.tasks_submitted = 0
+        self._ids = itertools.count()
+        self._agent_ids = itertools.count()
+        self._ready: Dict[int, asyncio.Future] = {}
+        self._started = False
+
+    def add_agent(self, agent) -> int:
+        """Host ``agent`` in a shard; returns the id to submit its tasks under"""
+        if self._started:
+            raise RuntimeError("Agents must be registered before the shards start")
+        agent_id = next(self._agent_ids)
+        self.agents[agent_id] = agent
+        return agent_id
+
+    def agent_id(self, name: str) -> int:
+        """The id of the only agent called ``name``"""
+        ids = [i for i, agent in self.agents.items() if agent.name == name]
+        if len(ids) != 1:
+            raise KeyError(f"{len(ids)} agents named {name!r}")
+        return ids[0]
+
+    def _assign(self):
+        groups: Dict[str, List[Any]] = {}
+        for agent_id, agent in self.agents.items():
+            groups.setdefault(getattr(agent, "specialty", ""), []).append(agent_id)
+        if self.partition == "spread":
+            ordered = [i for group in groups.values() for i in group]
+            for n, agent_id in enumerate(ordered):
+                self.shards[n % len(self.shards)].agents.append(agent_id)
+        else:
+            for group in sorted(groups.values(), key=len, reverse=True):
+                shard = min(self.shards, key=lambda s: len(s.agents))
+                shard.agents.extend(group)
+        for shard in self.shards:
+            for agent_id in shard.agents:
+                self.shard_of[agent_id] = shard
+        for specialty, group in groups.items():
+            self.by_specialty[specialty] = itertools.cycle(group)
+        self.shards = [s for s in self.shards if s.agents]
+
+    async def start(self):
+        """Spawn one process per non-empty shard and wait until all are ready"""
+        if self._started:
+            return
+        self._started = True
+        self._assign()
+        loop = asyncio.get_running_loop()
+        ctx = multiprocessing.get_context("spawn")
+        for shard in self.shards:
+            parent_conn, child_conn = ctx.Pipe()
+            specs = [(i, type(self.agents[i]), _picklable_state(self.agents[i])) for i in shard.agents]
+            shard.process = ctx.Process(target=_shard_main, name=f"shard-{shard.index}",
+                                        args=(child_conn, shard.index, specs, self.agent_attrs), daemon=True)
+            shard.process.start()
+            child_conn.close()
+            shard.conn = parent_conn
+            shard.outbox = asyncio.Queue()
+            shard.sender = loop.create_task(self._send_loop(shard))
+            self._ready[shard.index] = loop.create_future()
+            loop.add_reader(parent_conn.fileno(), self._on_readable, shard)
+        await asyncio.gather(*self._ready.values())
+        logger.info(f"Started {len(self.shards)} shards for {len(self.agents)} agents")
+
+    def submit(self, agent_id: int, task: Dict) -> asyncio.Future:
+        """Queue ``task`` for agent ``agent_id``; batched with everything else submitted this tick"""
+        shard = self.shard_of[agent_id]
+        if shard.conn is None:
+            raise RuntimeError(f"Shard {shard.index} is not running")
+        loop = asyncio.get_running_loop()
+        task_id = next(self._ids)
+        future = shard.futures[task_id] = loop.create_future()
+        if not shard.pending:
+            loop.call_soon(self._flush, shard)
+        shard.pending.append((task_id, agent_id, task))
+        self.tasks_submitted += 1
+        return future
+
+    def submit_to_specialty(self, specialty: str, task: Dict) -> asyncio.Future:
+        """Route ``task`` to the next agent (round-robin) with ``specialty``"""
+        agents = self.by_specialty.get(specialty)
+        if agents is None:
+            raise KeyError(f"No agent with specialty {specialty}")
+        return self.submit(next(agents), task)
+
+    def _flush(self, shard: _Shard):
+        if shard.pending:
+            shard.outbox.put_nowait(("tasks", shard.pending))
+            shard.pending = []
+
+    async def _send_loop(self, shard: _Shard):
+        loop = asyncio.get_running_loop()
+        while True:
+            msg = await shard.outbox.get()
+            # Pipe writes can block when the child is busy; keep them off the loop
+            await loop.run_in_executor(None, shard.conn.send, msg)
+            self.messages_sent += 1
+            if msg[0] == "stop":
+                return
+
+    def _on_readable(self, shard: _Shard):
+        try:
+            while shard.conn is not None and shard.conn.poll():
+                self._handle(shard, shard.conn.recv())
+        except (EOFError, OSError):
+            self._shard_lost(shard)
+
+    def _handle(self, shard: _Shard, msg):
+        self.messages_received += 1
+        kind = msg[0]
+        if kind == "results":
+            _, results, counters, latency = msg
+            for agent_id, values in counters.items():
+                agent = self.agents[agent_id]
+                for field, value in zip(COUNTER_FIELDS, values):
+                    setattr(agent, field, value)
+            for agent_id, (counts, count, total, peak) in latency.items():
+                hist = self.metrics.histogram("shard_agent_task_seconds", agent=self.agents[agent_id].name,
+                                              agent_id=str(agent_id), shard=str(shard.index))
+                hist.counts[:] = counts
+                hist.count, hist.total, hist.max = count, total, peak
+            for task_id, ok, value in results:
+                future = shard.futures.pop(task_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        elif kind == "ready":
+            shard.pid = msg[2]
+            self._ready[shard.index].set_result(None)
+        elif kind == "stopped":
+            self._detach(shard)
+
+    def _detach(self, shard: _Shard):
+        if shard.conn is not None:
+            asyncio.get_running_loop().remove_reader(shard.conn.fileno())
+            shard.conn.close()
+            shard.conn = None
+
+    def _shard_lost(self, shard: _Shard):
+        self._detach(shard)
+        error = RuntimeError(f"Shard {shard.index} exited")
+        ready = self._ready.get(shard.index)
+        if ready and not ready.done():
+            ready.set_exception(error)
+        for future in shard.futures.values():
+            if not future.done():
+                future.set_exception(error)
+        shard.futures.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "shards": [{"index": s.index, "pid": s.pid, "agents": len(s.agents), "in_flight": len(s.futures)}
+                       for s in self.shards],
+            "partition": self.partition,
+            "tasks_submitted": self.tasks_submitted,
+            "messages_sent": self.messages_sent,
+            "messages_received": self.messages_received,
+            "tasks_per_message": self.tasks_submitted / self.messages_sent if self.messages_sent else 0.0,
+        }
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        for shard in self.shards:
+            if shard.conn is not None:
+                self._flush(shard)
+                shard.outbox.put_nowait(("stop",))
+        senders = [s.sender for s in self.shards if s.sender]
+        await asyncio.gather(*senders, return_exceptions=True)
+        for shard in self.shards:
+            if shard.process is not None:
+                await loop.run_in_executor(None, shard.process.join, 10)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+            self._on_readable(shard)
+            self._detach(shard)
+
+
+class ShardedOrchestrator:
+    """Runs an existing orchestrator with its agents spread over shard processes
+
+    The wrapped orchestrator is handed :class:`ShardedAgent` views, so its
+    own ``process_tasks``/``run_income_stream``/``get_status``/
+    ``generate_report`` run unchanged in the parent::
+
+        orch = ShardedOrchestrator(MobileOrchestrator(), shards=4)
+        orch.register_agent(MobileAIAgent("ContentEngine", "content_generation"))
+        await orch.start()
+        await orch.process_tasks(1000)
+        status = orch.get_status()
+        await orch.close()
+    """
+
+    def __init__(self, orchestrator, shards: Optional[int] = None, partition: str = "spread",
+                 agent_attrs: Optional[Dict[str, Any]] = None, metrics: MetricsRegistry = METRICS):
+        self.orchestrator = orchestrator
+        self.pool = ShardPool(shards, partition, agent_attrs, metrics)
+
+    def __getattr__(self, name):
+        return getattr(self.orchestrator, name)
+
+    def register_agent(self, agent):
+        agent_id = self.pool.add_agent(agent)
+        self.orchestrator.register_agent(ShardedAgent(agent, self.pool, agent_id))
+
+    async def start(self):
+        await self.pool.start()
+
+    async def execute(self, task: Dict, agent: Optional[Union[int, str]] = None,
+                      specialty: Optional[str] = None) -> Dict:
+        """Run one task on an agent (id, or a name only one agent has), or the next agent with ``specialty``"""
+        if agent is not None:
+            agent_id = self.pool.agent_id(agent) if isinstance(agent, str) else agent
+            return await self.pool.submit(agent_id, task)
+        return await self.pool.submit_to_specialty(specialty or task.get("type", ""), task)
+
+    def get_status(self) -> Dict:
+        status = self.orchestrator.get_status()
+        status["sharding"] = self.pool.get_stats()
+        return status
+
+    def generate_report(self, *args, **kwargs) -> Dict:
+        report = self.orchestrator.generate_report(*args, **kwargs)
+        report["sharding"] = self.pool.get_stats()
+        return report
+
+    async def close(self):
+        await self.pool.close()
+        close = getattr(self.orchestrator, "close", None)
+        if close:
+            await close()
+
+
+class BusyAgent:
+    """Agent whose tasks burn ``work_ms`` of CPU, for exercising shards"""
+
+    def __init__(self, name: str, specialty: str, work_ms: float = 2.0):
+        self.name = name
+        self.specialty = specialty
+        self.work_ms = work_ms
+        self.tasks_completed = 0
+        self.revenue_generated = 0.0
+
+    async def execute_task(self, task: Dict) -> Dict:
+        deadline = time.perf_counter() + self.work_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        await asyncio.sleep(0)
+        self.tasks_completed += 1
+        self.revenue_generated += 1.0
+        return {"agent": self.name, "status": "completed", "revenue": 1.0,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+async def _demo(agents: int, tasks: int, shards: List[int], work_ms: float):
+    import contextlib
+    import io
+    from system_core import MobileOrchestrator
+
+    for count in shards:
+        orch = MobileOrchestrator(max_per_agent=2)
+        if count:
+            orch = ShardedOrchestrator(orch, shards=count, metrics=MetricsRegistry())
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(agents):
+                orch.register_agent(BusyAgent(f"agent-{i}", ("content", "data")[i % 2], work_ms))
+        if count:
+            await orch.start()
+        started = time.perf_counter()
+        await orch.process_tasks(tasks, collect=False)
+        elapsed = time.perf_counter() - started
+        status = orch.get_status()
+        assert status["tasks_completed"] == sum(a["tasks"] for a in status["agents"]) == tasks
+        label = f"{count} shards" if count else "in-process"
+        extra = ""
+        if count:
+            extra = f", {status['sharding']['tasks_per_message']:.1f} tasks/message"
+            await orch.close()
+        print(f"{label:>12}: {tasks / elapsed:8,.0f} tasks/s{extra}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare in-process and sharded CPU-bound throughput")
+    parser.add_argument('--agents', type=int, default=16)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--work-ms', type=float, default=2.0)
+    parser.add_argument('--shards', type=int, nargs='+', default=[0, 1, os.cpu_count() or 1],
+                        help='Shard counts to compare (0 = in-process)')
+    args = parser.parse_args()
+    asyncio.run(_demo(args.agents, args.tasks, args.shards, args.work_ms))
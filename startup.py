@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup profiling
+Boots an entry point in a fresh interpreter under ``python -X importtime``
+and reports where the time goes, module by module
+"""
+
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+BOOT_BUDGET_MS = 100.0
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """Rows of ``-X importtime`` output, in the order the imports finished"""
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2,
+            })
+    return rows
+
+
+def profile_startup(module: str, boot: str = "pass") -> Dict:
+    """Import ``module`` and run the ``boot`` statement in a child interpreter
+
+    Returns the per-module import rows plus wall time split into imports,
+    boot and everything else (interpreter start-up and exit). A first,
+    unmeasured import writes any stale bytecode, so edited sources (or
+    ``PYTHONDONTWRITEBYTECODE`` in the environment) are not timed as
+    recompiles.
+    """
+    code = (f"import sys, time; sys.path.insert(0, {_ROOT!r}); started = time.perf_counter()\n"
+            f"import {module}\n"
+            f"imported = time.perf_counter()\n"
+            f"{boot}\n"
+            f"print('BOOT', imported - started, time.perf_counter() - imported)")
+    warm_env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {_ROOT!r}); import {module}"],
+                   capture_output=True, env=warm_env)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(f"Booting {module} failed:\n{result.stderr[-2000:]}")
+    timings = next(line for line in result.stdout.splitlines() if line.startswith("BOOT ")).split()
+    return {
+        "module": module,
+        "wall_ms": wall * 1000,
+        "import_ms": float(timings[1]) * 1000,
+        "boot_ms": float(timings[2]) * 1000,
+        "imports": parse_importtime(result.stderr),
+    }
+
+
+def print_profile(module: str, boot: str = "pass", top: int = 15):
+    """``--startup-profile``: print the slowest imports and the boot budget"""
+    profile = profile_startup(module, boot)
+    imports = profile["imports"]
+    total = profile["import_ms"] + profile["boot_ms"]
+    verdict = "within" if total <= BOOT_BUDGET_MS else "OVER"
+    print(f"\nStartup profile: {module} ({len(imports)} modules imported)")
+    print(f"  imports {profile['import_ms']:.1f} ms + boot {profile['boot_ms']:.1f} ms = {total:.1f} ms "
+          f"({verdict} the {BOOT_BUDGET_MS:.0f} ms budget); process wall {profile['wall_ms']:.1f} ms")
+
+    print(f"\n  Imported by {module} (cumulative ms):")
+    # A module's imports are listed just before it, back to the previous top-level line
+    end = next(i for i, row in enumerate(imports) if row["depth"] == 0 and row["module"] == module)
+    start = max((i for i, row in enumerate(imports[:end]) if row["depth"] == 0), default=-1) + 1
+    direct = [row for row in imports[start:end] if row["depth"] == 1]
+    for row in sorted(direct, key=lambda r: r["cumulative_ms"], reverse=True)[:top]:
+        print(f"    {row['cumulative_ms']:8.1f}  {row['module']}")
+
+    print(f"\n  Slowest modules (self ms / cumulative ms):")
+    for row in sorted(imports, key=lambda r: r["self_ms"], reverse=True)[:top]:
+        print(f"    {row['self_ms']:8.1f} {row['cumulative_ms']:8.1f}  {row['module']}")
+    print()
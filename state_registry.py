@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Columnar state for agents and income streams
+Counters live in typed arrays indexed by id; agent and stream objects are
+thin views over one row, so millions of them cost tens of bytes each
+"""
+
+import gc
+import logging
+import weakref
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NO_TIME = -(2 ** 63)
+
+# Column kinds: 'int' and 'time' are int64 arrays, 'float' float64, 'code' a
+# uint8 index into a small table of repeated strings, 'str' a plain list
+_TYPECODES = {"int": "q", "float": "d", "code": "B", "time": "q"}
+_DEFAULTS = {"int": 0, "float": 0.0, "code": "", "time": None, "str": ""}
+
+
+def to_micros(value) -> int:
+    """Naive datetime (or its isoformat string) -> microseconds since 1970, exactly"""
+    if value is None:
+        return _NO_TIME
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_micros(micros: int) -> Optional[str]:
+    if micros == _NO_TIME:
+        return None
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class StateRegistry:
+    """Rows of fixed fields stored column-wise
+
+    Rows are allocated on view construction and released (and reused) when
+    the view is garbage collected, so the columns never grow past the peak
+    number of live objects. Columns are only ever appended to or assigned
+    in place, never replaced, so views can hold on to them.
+
+    Watchers registered with :meth:`watch` hear about every write made
+    through a view property; bulk writes straight into the column buffers
+    (``cycle_engine``) bypass them.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, str]):
+        self.name = name
+        self.kinds = dict(fields)
+        self.columns: Dict[str, Any] = {}
+        self.tables: Dict[str, List[str]] = {}
+        self.codes: Dict[str, Dict[str, int]] = {}
+        for field, kind in self.kinds.items():
+            if kind == "str":
+                self.columns[field] = []
+            else:
+                self.columns[field] = array(_TYPECODES[kind])
+            if kind == "code":
+                self.tables[field] = []
+                self.codes[field] = {}
+        self._layout = [(self.columns[f], self._encoder(f)) for f in self.kinds]
+        self._str_fields = [f for f, kind in self.kinds.items() if kind == "str"]
+        self._free: List[int] = []
+        self._size = 0
+        # Per field, weak references to callbacks; lists are mutated in place
+        # because the view properties hold on to them
+        self.watchers: Dict[str, list] = {field: [] for field in self.kinds}
+
+    def __len__(self) -> int:
+        return self._size - len(self._free)
+
+    def code(self, field: str, value: str) -> int:
+        codes = self.codes[field]
+        code = codes.get(value)
+        if code is None:
+            if len(codes) >= 256:
+                raise ValueError(f"More than 256 distinct values for {self.name}.{field}")
+            code = codes[value] = len(self.tables[field])
+            self.tables[field].append(value)
+        return code
+
+    def _encoder(self, field: str):
+        kind = self.kinds[field]
+        if kind == "code":
+            codes = self.codes[field]
+            return lambda value: codes[value] if value in codes else self.code(field, value)
+        if kind == "time":
+            return to_micros
+        return None
+
+    def allocate(self, values: Sequence) -> int:
+        """Store one row (``values`` in field order) and return its index"""
+        if self._free:
+            index = self._free.pop()
+            for (column, encode), value in zip(self._layout, values):
+                column[index] = encode(value) if encode else value
+            return index
+        for (column, encode), value in zip(self._layout, values):
+            column.append(encode(value) if encode else value)
+        self._size += 1
+        return self._size - 1
+
+    def extend(self, columns: Dict[str, Any], count: int) -> range:
+        """Append ``count`` rows given column-wise in stored form (codes, microseconds)
+
+        Array columns accept anything with ``tobytes`` in the column's
+        typecode (NumPy arrays), so bulk loads skip per-row encoding.
+        """
+        start = self._size
+        for field, kind in self.kinds.items():
+            values = columns[field]
+            if kind == "str":
+                self.columns[field].extend(values)
+            elif hasattr(values, "tobytes"):
+                self.columns[field].frombytes(values.tobytes())
+            else:
+                self.columns[field].extend(values)
+            if len(self.columns[field]) != start + count:
+                raise ValueError(f"Column {self.name}.{field} has the wrong number of rows")
+        self._size += count
+        return range(start, start + count)
+
+    def release(self, index: int):
+        for field in self._str_fields:
+            # Drop string references so released rows don't pin memory
+            self.columns[field][index] = ""
+        self._free.append(index)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        return {field: self.value(field, index) for field in self.kinds}
+
+    def value(self, field: str, index: int):
+        kind = self.kinds[field]
+        raw = self.columns[field][index]
+        if kind == "code":
+            return self.tables[field][raw]
+        if kind == "time":
+            return from_micros(raw)
+        return raw
+
+    def records(self, indices: Sequence[int], fields: Dict[str, str]) -> List[Dict[str, Any]]:
+        """One dict per index, built column by column (``{output key: field}``)"""
+        keys = list(fields)
+        columns = []
+        for field in fields.values():
+            column = self.columns[field]
+            kind = self.kinds[field]
+            if kind == "code":
+                table = self.tables[field]
+                columns.append([table[column[i]] for i in indices])
+            elif kind == "time":
+                columns.append([from_micros(column[i]) for i in indices])
+            else:
+                columns.append([column[i] for i in indices])
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def watch(self, callback: Callable[[int, str, Any, Any], None], fields: Optional[Iterable[str]] = None):
+        """Call ``callback(index, field, old, new)`` after a view writes one of ``fields``
+
+        ``old`` and ``new`` are the stored values (codes for 'code' fields,
+        microseconds for 'time' fields). Bound methods are held weakly, so a
+        watcher goes away with its owner.
+        """
+        # (weak owner, function) pairs: cheaper to call than weakref.WeakMethod
+        func = getattr(callback, "__func__", None)
+        entry = (weakref.ref(callback.__self__), func) if func is not None else (None, callback)
+        for field in fields or self.kinds:
+            self.watchers[field].append(entry)
+
+    def unwatch(self, callback: Callable):
+        owner = getattr(callback, "__self__", None)
+        func = getattr(callback, "__func__", callback)
+        for entries in self.watchers.values():
+            entries[:] = [(ref, f) for ref, f in entries
+                          if not (f is func and (ref is None or ref() is owner))]
+
+    def _notify(self, watchers: list, index: int, field: str, old, new):
+        dead = None
+        for ref, func in watchers:
+            if ref is None:
+                func(index, field, old, new)
+                continue
+            owner = ref()
+            if owner is None:
+                dead = (ref, func)
+            else:
+                func(owner, index, field, old, new)
+        if dead:
+            watchers.remove(dead)
+
+    def nbytes(self) -> int:
+        """Bytes held by the columns (strings excluded)"""
+        return sum(c.itemsize * len(c) if isinstance(c, array) else 8 * len(c) for c in self.columns.values())
+
+
+def _property(registry: StateRegistry, field: str) -> property:
+    column = registry.columns[field]
+    kind = registry.kinds[field]
+    watchers = registry.watchers[field]
+    notify = registry._notify
+    if kind in ("int", "float", "str"):
+        def get(self):
+            return column[self._id]
+
+        encode = None
+    elif kind == "code":
+        table = registry.tables[field]
+        encode = registry._encoder(field)
+
+        def get(self):
+            return table[column[self._id]]
+    else:
+        def get(self):
+            return from_micros(column[self._id])
+
+        encode = to_micros
+
+    def set(self, value):
+        if encode is not None:
+            value = encode(value)
+        index = self._id
+        if watchers:
+            old = column[index]
+            column[index] = value
+            notify(watchers, index, field, old, value)
+        else:
+            column[index] = value
+    return property(get, set)
+
+
+class RegistryView:
+    """Base for objects whose fields live in a :class:`StateRegistry`
+
+    Subclasses set ``registry`` and get one property per registry field;
+    the instance itself holds only its row index. Any other per-object
+    attributes must be declared in ``__slots__``. Views pickle by value and
+    take a fresh row on unpickling.
+    """
+
+    __slots__ = ("_id",)
+    registry: StateRegistry = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("registry") is not None:
+            for field in cls.registry.kinds:
+                setattr(cls, field, _property(cls.registry, field))
+
+    def _register(self, *values):
+        self._id = self.registry.allocate(values)
+
+    @classmethod
+    def _views(cls, indices: Iterable[int]) -> List["RegistryView"]:
+        """Views on rows that already hold their values (bulk loads), skipping ``__init__``"""
+        new = cls.__new__
+        views = []
+        # Millions of fresh objects would otherwise trigger repeated full GC passes
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for index in indices:
+                view = new(cls)
+                view._id = index
+                views.append(view)
+        finally:
+            if collecting:
+                gc.enable()
+        return views
+
+    def __del__(self):
+        try:
+            self.registry.release(self._id)
+        except AttributeError:
+            pass
+
+    def _extra_slots(self) -> List[str]:
+        return [s for c in type(self).__mro__ for s in c.__dict__.get("__slots__", ()) if s != "_id"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.registry.row(self._id)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.to_dict()
+        for slot in self._extra_slots():
+            if hasattr(self, slot):
+                state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        kinds = self.registry.kinds
+        self._register(*(state.get(f, _DEFAULTS[k]) for f, k in kinds.items()))
+        for slot in self._extra_slots():
+            if slot in state:
+                setattr(self, slot, state[slot])
+
+    def same_state(self, other) -> bool:
+        """Whether ``other`` is the same type and holds the same values
+
+        ``==`` and ``hash`` stay identity-based: two streams with equal
+        fields are still two streams (sets, dict keys, ``list.remove``).
+        """
+        return type(other) is type(self) and self.__getstate__() == other.__getstate__()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+def shared_registry(objects: Sequence) -> Optional[StateRegistry]:
+    """The registry behind ``objects`` if they are all views on the same one"""
+    if not objects or not isinstance(objects[0], RegistryView):
+        return None
+    registry = objects[0].registry
+    view_types = {t for t in map(type, objects)}
+    if all(issubclass(t, RegistryView) and t.registry is registry for t in view_types):
+        return registry
+    return None
+
+
+def snapshot(objects: Iterable, fields: Dict[str, str]) -> List[Dict[str, Any]]:
+    """``[{key: obj.<field>}]`` for each object
+
+    When every object is a view on the same registry the dicts are built
+    straight from the columns; anything else (proxies, plain objects)
+    falls back to attribute access.
+    """
+    objects = objects if isinstance(objects, list) else list(objects)
+    registry = shared_registry(objects)
+    if registry is not None:
+        return registry.records([o._id for o in objects], fields)
+    return [{key: getattr(o, field) for key, field in fields.items()} for o in objects]
+
+
+# Process-wide registries used by the agent and stream classes
+AGENTS = StateRegistry("agents", {
+    "name": "str",
+    "specialty": "code",
+    "tasks_completed": "int",
+    "revenue_generated": "float",
+})
+
+STREAMS = StateRegistry("streams", {
+    "name": "str",
+    "type": "code",
+    "status": "code",
+    "monthly_target": "float",
+    "current_earnings": "float",
+    "last_updated": "time",
+    "agents": "int",
+})
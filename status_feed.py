@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Local status feed over a Unix socket
+Publishers push status snapshots as NDJSON; dashboards subscribe
+"""
+
+import json
+import logging
+import os
+import stat
+from typing import AsyncIterator, Dict, Optional, Set
+
+from settings import env
+
+logger = logging.getLogger(__name__)
+
+# Per-user runtime dir when there is one, else the repo's data/ dir (never a shared /tmp)
+DEFAULT_SOCKET = env("WEALTH_STATUS_SOCKET") or os.path.join(
+    env("XDG_RUNTIME_DIR") or "data", "ai-wealth-status.sock")
+
+
+class StatusPublisher:
+    """Fan-out of the latest status snapshot to any number of subscribers
+
+    ``publish`` never awaits: snapshots are serialised once and written to
+    each subscriber's transport, and a subscriber whose send buffer is
+    above ``max_buffer`` simply misses that snapshot (it catches up on the
+    next one). With no subscribers, publishing only keeps a reference.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, max_buffer: int = 256 * 1024):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.clients: Set["asyncio.StreamWriter"] = set()
+        self.published = 0
+        self.dropped = 0
+        self._latest: Optional[Dict] = None
+        self._server = None
+
+    async def start(self):
+        """Listen on ``path``; refuses to take over a socket another publisher is serving"""
+        import asyncio
+
+        if os.path.lexists(self.path):
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise RuntimeError(f"Status feed path {self.path} exists and is not a socket")
+            try:
+                _, writer = await asyncio.open_unix_connection(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)  # left behind by a publisher that is gone
+            else:
+                writer.close()
+                raise RuntimeError(f"Status feed {self.path} is served by a running publisher; "
+                                   f"pick another --status-socket or pass '' to disable it")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._on_client, self.path)
+        logger.info(f"Status feed listening on {self.path}")
+
+    async def _on_client(self, reader: "asyncio.StreamReader", writer: "asyncio.StreamWriter"):
+        import asyncio
+
+        self.clients.add(writer)
+        if self._latest is not None:
+            writer.write(self._encode(self._latest))
+        try:
+            # Subscribers never send anything; EOF means they went away
+            await reader.read()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _encode(snapshot: Dict) -> bytes:
+        return (json.dumps(snapshot, separators=(",", ":"), default=str) + "\n").encode()
+
+    def publish(self, snapshot: Dict):
+        self._latest = snapshot
+        self.published += 1
+        if not self.clients:
+            return
+        data = self._encode(snapshot)
+        for writer in list(self.clients):
+            if writer.is_closing():
+                self.clients.discard(writer)
+            elif writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+            else:
+                writer.write(data)
+
+    async def close(self):
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+async def subscribe(path: str = DEFAULT_SOCKET) -> AsyncIterator[Dict]:
+    """Yield snapshots from a publisher until it disconnects"""
+    import asyncio
+
+    reader, writer = await asyncio.open_unix_connection(path, limit=16 * 1024 * 1024)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield json.loads(line)
+    finally:
+        writer.close()
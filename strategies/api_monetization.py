@@ -4,16 +4,44 @@
 import logging
 from typing import Dict
 
+from strategies.metering import PricingTiers, UsageMeter
+from strategies.quota import QuotaEngine, quota_middleware
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_USAGE_LOG = "data/metering/usage.ndjson"
+
 
 class APIMonetization:
     def __init__(self, config: Dict):
         self.config = config
-        self.api_endpoints = []
-        
+        settings = config.get("api_monetization", {})
+        self.api_endpoints = list(settings.get("endpoints", []))
+        self.pricing = PricingTiers.from_config(settings.get("pricing"))
+        self.meter = UsageMeter(
+            settings.get("usage_log", DEFAULT_USAGE_LOG) or None,
+            bucket_seconds=settings.get("bucket_seconds", 60),
+            flush_interval=settings.get("flush_interval", 5.0),
+        )
+        self.quotas = QuotaEngine.from_config(config)
+
+    def record_call(self, key: str, endpoint: str, units: float = 1):
+        """Meter one billable call (hot path, call from the serving loop)"""
+        self.meter.record(key, endpoint, units)
+
+    def middleware(self, plan_for=None):
+        """aiohttp middleware enforcing quotas and metering every allowed call"""
+        return quota_middleware(self.quotas, plan_for=plan_for, meter=self.meter)
+
     async def generate_income(self) -> float:
         """Generate income from API usage"""
         logger.info("Processing API monetization...")
-        # Implementation here
-        return 0.0
+        self.meter.start()
+        # Bill from the flushed per-bucket counters, never from raw events
+        await self.meter.flush()
+        revenue = await self.meter.bill(self.pricing)
+        logger.info(f"Billed ${revenue:.2f} of API usage ({self.meter.events} calls metered)")
+        return revenue
+
+    async def close(self):
+        await self.meter.close()
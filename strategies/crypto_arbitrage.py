@@ -3,25 +3,343 @@
 
 import asyncio
 import logging
-from typing import Dict, List
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from strategies.exchanges import CcxtAdapter, ExchangeAdapter
+from strategies.execution import HttpVenue, pipeline_from_config
+from strategies.orderbook import OrderBookStore
 
 logger = logging.getLogger(__name__)
 
 
+class OrderBookMatrix:
+    """Top-of-book prices and sizes held in (symbol x exchange) arrays
+
+    Missing books are stored as bid 0 / ask +inf so they can never form a
+    profitable pair, which keeps ``find_spreads`` free of masking logic.
+    """
+
+    def __init__(self, symbols: Sequence[str], exchanges: Sequence[str], fees: Sequence[float]):
+        self.symbols = list(symbols)
+        self.exchanges = list(exchanges)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.exchange_index = {e: i for i, e in enumerate(self.exchanges)}
+        self.fees = np.asarray(fees, dtype=np.float64)
+        shape = (len(self.symbols), len(self.exchanges))
+        self.bid_px = np.zeros(shape)
+        self.bid_qty = np.zeros(shape)
+        self.ask_px = np.full(shape, np.inf)
+        self.ask_qty = np.zeros(shape)
+
+    def update(self, exchange: str, symbol: str, book: Optional[Dict]):
+        """Store the best bid/ask of ``book`` (``None`` clears the slot)"""
+        s = self.symbol_index[symbol]
+        e = self.exchange_index[exchange]
+        bids = book.get("bids") if book else None
+        asks = book.get("asks") if book else None
+        self.bid_px[s, e], self.bid_qty[s, e] = (bids[0][0], bids[0][1]) if bids else (0.0, 0.0)
+        self.ask_px[s, e], self.ask_qty[s, e] = (asks[0][0], asks[0][1]) if asks else (np.inf, 0.0)
+
+    def set_top(self, exchange: str, symbol: str, bid, ask):
+        """Store a ``(price, qty)`` best bid/ask pair (``None`` for an empty side)"""
+        s = self.symbol_index[symbol]
+        e = self.exchange_index[exchange]
+        self.bid_px[s, e], self.bid_qty[s, e] = bid if bid else (0.0, 0.0)
+        self.ask_px[s, e], self.ask_qty[s, e] = ask if ask else (np.inf, 0.0)
+
+    def find_spreads(self, min_profit: float = 0.0) -> List[Dict]:
+        """Cross-exchange opportunities net of taker fees, best first
+
+        Evaluates every (symbol, buy exchange, sell exchange) triple in one
+        broadcast: buying at the ask on one venue and selling at the bid on
+        another, each leg paying that venue's taker fee.
+        """
+        buy_cost = self.ask_px * (1 + self.fees)
+        sell_value = self.bid_px * (1 - self.fees)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            net = sell_value[:, None, :] / buy_cost[:, :, None] - 1
+        diag = np.arange(len(self.exchanges))
+        net[:, diag, diag] = -np.inf
+
+        s, b, x = np.nonzero(net > min_profit)
+        return self._describe(s, b, x, net[s, b, x])
+
+    def spreads_for(self, symbol: str, exchange: str, min_profit: float = 0.0) -> List[Dict]:
+        """Re-check only the pairs touching one (symbol, exchange) book
+
+        O(exchanges): buying on ``exchange`` against every other venue's bid,
+        and buying on every other venue against ``exchange``'s bid.
+        """
+        s = self.symbol_index[symbol]
+        e = self.exchange_index[exchange]
+        buy_cost = self.ask_px[s] * (1 + self.fees)
+        sell_value = self.bid_px[s] * (1 - self.fees)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            as_buyer = sell_value / buy_cost[e] - 1
+            as_seller = sell_value[e] / buy_cost - 1
+        as_buyer[e] = as_seller[e] = -np.inf
+
+        sells = np.nonzero(as_buyer > min_profit)[0]
+        buys = np.nonzero(as_seller > min_profit)[0]
+        n = len(sells) + len(buys)
+        if not n:
+            return []
+        symbols = np.full(n, s)
+        buy_idx = np.concatenate([np.full(len(sells), e), buys])
+        sell_idx = np.concatenate([sells, np.full(len(buys), e)])
+        profit = np.concatenate([as_buyer[sells], as_seller[buys]])
+        return self._describe(symbols, buy_idx, sell_idx, profit)
+
+    def _describe(self, s: np.ndarray, b: np.ndarray, x: np.ndarray, profit: np.ndarray) -> List[Dict]:
+        """Opportunity dicts for index arrays (symbol, buy venue, sell venue), best first"""
+        if not len(s):
+            return []
+        buy_cost = self.ask_px[s, b] * (1 + self.fees[b])
+        sell_value = self.bid_px[s, x] * (1 - self.fees[x])
+        qty = np.minimum(self.ask_qty[s, b], self.bid_qty[s, x])
+        expected = qty * (sell_value - buy_cost)
+        order = np.argsort(-profit)
+
+        return [
+            {
+                "symbol": self.symbols[s[i]],
+                "buy_exchange": self.exchanges[b[i]],
+                "sell_exchange": self.exchanges[x[i]],
+                "buy_price": float(self.ask_px[s[i], b[i]]),
+                "sell_price": float(self.bid_px[s[i], x[i]]),
+                "quantity": float(qty[i]),
+                "net_profit_pct": float(profit[i]) * 100,
+                "expected_profit": float(expected[i]),
+                "buy_fee": float(self.fees[b[i]]),
+                "sell_fee": float(self.fees[x[i]]),
+            }
+            for i in order
+        ]
+
+
 class CryptoArbitrage:
-    def __init__(self, config: Dict):
+    risk_scale = 1.0  # position multiplier from the portfolio risk engine
+    agents = None  # agent slots from the allocator: trades in flight at once (None = no limit, 0 = none)
+
+    def __init__(self, config: Dict, exchanges: Optional[List[ExchangeAdapter]] = None):
         self.config = config
-        self.exchanges = []
+        arb_config = config.get("arbitrage", {})
+        self.symbols: List[str] = list(arb_config.get("symbols", []))
+        self.min_profit = arb_config.get("min_profit", 0.0)
+        self.depth = arb_config.get("depth", 5)
+        self.exchanges: List[ExchangeAdapter] = exchanges if exchanges is not None else self._build_exchanges(arb_config)
         self.opportunities = []
-        
+        self.books: Optional[OrderBookMatrix] = None
+        self.last_scan_seconds = 0.0
+        self.store = OrderBookStore()
+        self.signal_latency = deque(maxlen=100000)
+        self.pipeline = None
+
+    def _build_exchanges(self, arb_config: Dict) -> List[ExchangeAdapter]:
+        """Create ccxt adapters for the exchange ids listed in the config"""
+        keys = self.config.get("api_keys", {})
+        return [
+            CcxtAdapter(name, keys.get("exchange_key"), keys.get("exchange_secret"))
+            for name in arb_config.get("exchanges", [])
+        ]
+
+    def _ensure_books(self) -> OrderBookMatrix:
+        names = [e.name for e in self.exchanges]
+        if self.books is None or self.books.exchanges != names or self.books.symbols != self.symbols:
+            self.books = OrderBookMatrix(self.symbols, names, [e.taker_fee for e in self.exchanges])
+        return self.books
+
     async def scan_opportunities(self) -> List[Dict]:
         """Scan exchanges for arbitrage opportunities"""
         logger.info("Scanning for arbitrage opportunities...")
-        # Implementation here
-        return []
-    
+        if not self.exchanges or not self.symbols:
+            return []
+
+        started = time.perf_counter()
+        books = self._ensure_books()
+        results = await asyncio.gather(
+            *(e.fetch_order_books(self.symbols, self.depth) for e in self.exchanges)
+        )
+        for exchange, fetched in zip(self.exchanges, results):
+            for symbol in self.symbols:
+                books.update(exchange.name, symbol, fetched.get(symbol))
+
+        self.opportunities = books.find_spreads(self.min_profit)
+        detected_at = time.perf_counter()
+        for opportunity in self.opportunities:
+            opportunity["detected_at"] = detected_at
+        self.last_scan_seconds = time.perf_counter() - started
+        logger.info(f"Found {len(self.opportunities)} opportunities in {self.last_scan_seconds * 1000:.1f}ms")
+        return self.opportunities
+
+    async def stream_opportunities(self, updates: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        """Consume order-book updates and yield opportunities as they appear
+
+        Only updates that move a top-of-book trigger a re-check, and only the
+        pairs involving that book are evaluated. Each opportunity carries
+        ``latency_us``, the time from the update's ``received`` stamp (or its
+        arrival here) to the signal.
+        """
+        books = self._ensure_books()
+        async for update in updates:
+            received = update.get("received") or time.perf_counter()
+            exchange, symbol = update["exchange"], update["symbol"]
+            if exchange not in books.exchange_index or symbol not in books.symbol_index:
+                continue
+            if not self.store.apply(update):
+                continue
+            bid, ask = self.store.get(exchange, symbol).top()
+            books.set_top(exchange, symbol, bid, ask)
+            for opportunity in books.spreads_for(symbol, exchange, self.min_profit):
+                latency = (time.perf_counter() - received) * 1e6
+                self.signal_latency.append(latency)
+                opportunity["latency_us"] = latency
+                opportunity["detected_at"] = received
+                yield opportunity
+
+    def latency_summary(self) -> Dict:
+        """Tick-to-signal latency percentiles in microseconds"""
+        if not self.signal_latency:
+            return {"count": 0}
+        values = np.fromiter(self.signal_latency, dtype=np.float64)
+        p50, p99 = np.percentile(values, [50, 99])
+        return {"count": len(values), "p50_us": float(p50), "p99_us": float(p99), "max_us": float(values.max())}
+
+    def _ensure_pipeline(self):
+        """Execution pipeline over the venues in ``execution.venues`` ({name: url})"""
+        if self.pipeline is None:
+            venues = {name: HttpVenue(name, url)
+                      for name, url in self.config.get("execution", {}).get("venues", {}).items()}
+            self.pipeline = pipeline_from_config(self.config, venues)
+            self.pipeline.prepare(self.symbols)
+        return self.pipeline
+
     async def execute_trade(self, opportunity: Dict) -> Dict:
         """Execute arbitrage trade"""
-        logger.info(f"Executing trade: {opportunity}")
-        # Implementation here
-        return {"status": "success", "profit": 0}
+        logger.info(f"Executing trade: {opportunity['symbol']} "
+                    f"{opportunity['buy_exchange']} -> {opportunity['sell_exchange']}")
+        pipeline = self._ensure_pipeline()
+        pipeline.risk_scale = self.risk_scale
+        return await pipeline.execute(opportunity)
+
+    def allocate_liquidity(self, opportunities: List[Dict]) -> List[Dict]:
+        """Give each opportunity its own slice of the visible books, best first
+
+        Opportunities sharing a (symbol, venue) book would otherwise each size
+        against the same top-of-book quantity. Each one gets what its risk
+        cap and the still-unclaimed ask and bid allow; ones left with nothing
+        are dropped. The results can be fired concurrently.
+        """
+        books = self._ensure_books()
+        pipeline = self._ensure_pipeline()
+        pipeline.risk_scale = self.risk_scale
+        claimed: Dict[tuple, float] = {}
+        allocated = []
+        for opportunity in sorted(opportunities, key=lambda o: o["net_profit_pct"], reverse=True):
+            s = books.symbol_index[opportunity["symbol"]]
+            ask = ("ask", s, books.exchange_index[opportunity["buy_exchange"]])
+            bid = ("bid", s, books.exchange_index[opportunity["sell_exchange"]])
+            available = min(books.ask_qty[ask[1:]] - claimed.get(ask, 0.0),
+                            books.bid_qty[bid[1:]] - claimed.get(bid, 0.0))
+            qty = min(pipeline.size(opportunity), available)
+            if qty <= 0:
+                continue
+            claimed[ask] = claimed.get(ask, 0.0) + qty
+            claimed[bid] = claimed.get(bid, 0.0) + qty
+            allocated.append({**opportunity, "quantity": float(qty)})
+        return allocated
+
+    async def generate_income(self) -> float:
+        """Scan once and, when execution venues are configured, trade what was found"""
+        if self.agents == 0:
+            return 0.0
+        opportunities = await self.scan_opportunities()
+        if not opportunities or not self.config.get("execution", {}).get("venues"):
+            return 0.0
+        trades = self.allocate_liquidity(opportunities)
+        if self.agents is None:
+            results = await asyncio.gather(*(self.execute_trade(o) for o in trades))
+        else:
+            semaphore = asyncio.Semaphore(self.agents)
+
+            async def execute(opportunity):
+                async with semaphore:
+                    return await self.execute_trade(opportunity)
+
+            results = await asyncio.gather(*(execute(o) for o in trades))
+        return sum(r["profit"] for r in results)
+
+    async def close(self):
+        await asyncio.gather(*(e.close() for e in self.exchanges))
+        if self.pipeline:
+            await asyncio.gather(*(v.close() for v in self.pipeline.venues.values()))
+
+
+async def _benchmark(n_symbols: int, n_exchanges: int, rounds: int, snapshot_path: Optional[str]):
+    from strategies.exchanges import load_fake_exchanges, synthetic_snapshots
+
+    snapshots = snapshot_path or synthetic_snapshots(n_symbols, n_exchanges)
+    exchanges = load_fake_exchanges(snapshots)
+    symbols = sorted({s for e in exchanges for s in e.books})
+    arb = CryptoArbitrage({"arbitrage": {"symbols": symbols}}, exchanges=exchanges)
+
+    timings = []
+    for _ in range(rounds):
+        await arb.scan_opportunities()
+        timings.append(arb.last_scan_seconds * 1000)
+    timings.sort()
+    print(f"{len(symbols)} symbols x {len(exchanges)} exchanges, {rounds} scans")
+    print(f"  p50 {timings[len(timings) // 2]:.1f}ms  max {timings[-1]:.1f}ms  "
+          f"opportunities {len(arb.opportunities)}")
+
+
+async def _benchmark_replay(update_path: str):
+    import json
+    from strategies.orderbook import replay_updates
+
+    names, symbols = set(), set()
+    with open(update_path, 'r') as f:
+        for line in f:
+            update = json.loads(line)
+            names.add(update["exchange"])
+            symbols.add(update["symbol"])
+    exchanges = [ExchangeAdapter(name) for name in sorted(names)]
+    arb = CryptoArbitrage({"arbitrage": {"symbols": sorted(symbols)}}, exchanges=exchanges)
+
+    started = time.perf_counter()
+    signals = 0
+    async for _ in arb.stream_opportunities(replay_updates(update_path)):
+        signals += 1
+    elapsed = time.perf_counter() - started
+    updates = arb.store.updates_applied
+    summary = arb.latency_summary()
+    print(f"{updates} updates, {signals} signals in {elapsed:.2f}s ({updates / elapsed:,.0f} updates/s)")
+    if summary["count"]:
+        print(f"  tick-to-signal p50 {summary['p50_us']:.0f}us  p99 {summary['p99_us']:.0f}us")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline arbitrage scan benchmark")
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--exchanges', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--snapshots', help='Recorded snapshot file (default: synthetic)')
+    parser.add_argument('--replay', help='Recorded update file: measure tick-to-signal latency instead')
+    parser.add_argument('--record-updates', type=int, metavar='N',
+                        help='With --replay, first record N synthetic deltas to that file')
+    args = parser.parse_args()
+    if args.replay:
+        if args.record_updates:
+            from strategies.exchanges import synthetic_snapshots
+            from strategies.orderbook import record_updates, synthetic_updates
+            snapshots = synthetic_snapshots(args.symbols, args.exchanges)
+            record_updates(synthetic_updates(snapshots, args.record_updates), args.replay)
+        asyncio.run(_benchmark_replay(args.replay))
+    else:
+        asyncio.run(_benchmark(args.symbols, args.exchanges, args.rounds, args.snapshots))
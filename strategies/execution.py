@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""Latency-budgeted two-leg order execution for arbitrage trades"""
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("detect", "build", "send", "ack")
+UNWIND_TIMEOUT = 5.0  # seconds an unwind order may take before its quantity is kept as a position
+
+
+class OrderBuilder:
+    """Builds and signs order payloads for one venue
+
+    :meth:`prepare` serializes the static fields of a (symbol, side) order
+    and feeds them to the HMAC ahead of time, so once an opportunity is
+    detected only the price, quantity, id and timestamp are formatted and
+    hashed. Unprepared pairs are prepared on first use.
+    """
+
+    def __init__(self, venue: str, api_key: Optional[str], secret: Optional[str]):
+        self.venue = venue
+        self._template = {"venue": venue, "type": "limit", "time_in_force": "IOC", "api_key": api_key}
+        self._mac = hmac.new((secret or "").encode(), digestmod=hashlib.sha256)
+        self._id_json = json.dumps(f"{venue}-")[:-1]  # JSON string of the id prefix, left open
+        self._ids = itertools.count(1)
+        self._prepared: Dict[tuple, tuple] = {}  # (symbol, side) -> (body prefix, HMAC over it)
+
+    def prepare(self, symbol: str, side: str) -> tuple:
+        static = dict(self._template, symbol=symbol, side=side)
+        prefix = json.dumps(static, separators=(",", ":"), sort_keys=True)[:-1] + ","
+        mac = self._mac.copy()
+        mac.update(prefix.encode())
+        self._prepared[symbol, side] = prepared = (prefix, mac)
+        return prepared
+
+    def build(self, symbol: str, side: str, price: float, qty: float) -> Dict:
+        prefix, mac = self._prepared.get((symbol, side)) or self.prepare(symbol, side)
+        n = next(self._ids)
+        tail = (f'"client_order_id":{self._id_json}{n}","price":{float(price)!r},'
+                f'"qty":{float(qty)!r},"ts":{time.time()!r}}}')
+        mac = mac.copy()
+        mac.update(tail.encode())
+        return {"body": prefix + tail, "signature": mac.hexdigest(), "client_order_id": f"{self.venue}-{n}"}
+
+
+class HttpVenue:
+    """Order entry over HTTP (the local mock exchange speaks this protocol)"""
+
+    def __init__(self, name: str, base_url: str, session=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self._session = session
+
+    async def _get_session(self):
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def submit(self, order: Dict) -> Dict:
+        session = await self._get_session()
+        async with session.post(f"{self.base_url}/{self.name}/orders", data=order["body"],
+                                headers={"X-Signature": order["signature"],
+                                         "Content-Type": "application/json"}) as resp:
+            return await resp.json()
+
+    async def cancel(self, client_order_id: str) -> Dict:
+        session = await self._get_session()
+        async with session.delete(f"{self.base_url}/{self.name}/orders/{client_order_id}") as resp:
+            return await resp.json()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class ExecutionPipeline:
+    """Sizes, builds and fires both legs of an opportunity concurrently
+
+    Position size is capped locally at ``capital * max_risk_per_trade``
+    (no balance round trip), times ``risk_scale`` from the portfolio risk
+    engine; ``capital`` is adjusted by realised profit.
+    Legs not acknowledged within ``latency_budget_ms`` of detection are
+    cancelled. The "detect" stage runs from the opportunity's
+    ``detected_at`` (the book update for streamed signals, the end of the
+    scan otherwise) to the pipeline.
+
+    When the legs fill different quantities (one rejected, timed out or
+    short), the excess is unwound with an opposite order on the venue
+    that filled it and its realised pnl counts in the trade's profit;
+    whatever the unwind does not fill stays in ``positions``.
+    """
+
+    def __init__(self, venues: Dict[str, HttpVenue], builders: Dict[str, OrderBuilder],
+                 capital: float, max_risk_per_trade: float = 0.02, latency_budget_ms: float = 50.0):
+        self.venues = venues
+        self.builders = builders
+        self.capital = capital
+        self.max_risk_per_trade = max_risk_per_trade
+        self.risk_scale = 1.0
+        self.latency_budget = latency_budget_ms / 1000
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.stats = {"executed": 0, "partial": 0, "timeout": 0, "rejected": 0, "unwound": 0}
+        self.positions: Dict[tuple, float] = {}  # (venue, symbol) -> open quantity, short < 0
+
+    def prepare(self, symbols: List[str]):
+        """Pre-build the static part of both legs' payloads for ``symbols`` on every venue"""
+        for builder in self.builders.values():
+            for symbol in symbols:
+                for side in ("buy", "sell"):
+                    builder.prepare(symbol, side)
+
+    def size(self, opportunity: Dict) -> float:
+        """Quantity allowed by the per-trade risk cap and the visible liquidity"""
+        max_notional = self.capital * self.max_risk_per_trade * self.risk_scale
+        return max(0.0, min(opportunity["quantity"], max_notional / opportunity["buy_price"]))
+
+    async def execute(self, opportunity: Dict) -> Dict:
+        entered = time.perf_counter()
+        detected_at = opportunity.get("detected_at", entered)
+        self.histograms["detect"].record(max(entered - detected_at, 0))
+
+        buy, sell = opportunity["buy_exchange"], opportunity["sell_exchange"]
+        if buy not in self.venues or sell not in self.venues:
+            self.stats["rejected"] += 1
+            return {"status": "rejected", "reason": "unknown venue", "profit": 0}
+        qty = self.size(opportunity)
+        if qty <= 0:
+            self.stats["rejected"] += 1
+            return {"status": "rejected", "reason": "risk limit", "profit": 0}
+
+        started = time.perf_counter()
+        legs = [
+            (buy, self.builders[buy].build(opportunity["symbol"], "buy", opportunity["buy_price"], qty)),
+            (sell, self.builders[sell].build(opportunity["symbol"], "sell", opportunity["sell_price"], qty)),
+        ]
+        built = time.perf_counter()
+        self.histograms["build"].record(built - started)
+
+        remaining = self.latency_budget - (built - detected_at)
+        sent_epoch = time.time()
+        tasks = [asyncio.create_task(self.venues[v].submit(order)) for v, order in legs]
+        acked_at = {}
+        for task in tasks:
+            task.add_done_callback(lambda t: acked_at.setdefault(t, time.time()))
+        done, pending = await asyncio.wait(tasks, timeout=max(remaining, 0))
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(
+                *(self.venues[v].cancel(order["client_order_id"])
+                  for (v, order), task in zip(legs, tasks) if task in pending),
+                return_exceptions=True)
+
+        acks = []
+        for (venue, order), task in zip(legs, tasks):
+            ack = None
+            if task in done and not task.exception():
+                ack = task.result()
+                received = ack.get("received_at")
+                if received:
+                    self.histograms["send"].record(max(received - sent_epoch, 0))
+                    self.histograms["ack"].record(max(acked_at[task] - received, 0))
+                else:
+                    self.histograms["ack"].record(acked_at[task] - sent_epoch)
+            acks.append(ack)
+
+        filled = [a for a in acks if a and a.get("status") == "filled"]
+        buy_ack, sell_ack = acks
+        bought = float(buy_ack["filled_qty"]) if buy_ack and buy_ack.get("status") == "filled" else 0.0
+        sold = float(sell_ack["filled_qty"]) if sell_ack and sell_ack.get("status") == "filled" else 0.0
+        buy_fee, sell_fee = opportunity.get("buy_fee", 0), opportunity.get("sell_fee", 0)
+        matched = min(bought, sold)
+        profit = 0.0
+        if matched:
+            profit = matched * (sell_ack["price"] * (1 - sell_fee) - buy_ack["price"] * (1 + buy_fee))
+        result = {"profit": 0.0, "qty": matched, "acks": acks}
+        if bought > sold:
+            # Long the excess on the buy venue: sell it back there
+            result["unwind"] = await self._unwind(buy, opportunity["symbol"], "sell", bought - sold,
+                                                  buy_ack["price"], buy_fee)
+        elif sold > bought:
+            result["unwind"] = await self._unwind(sell, opportunity["symbol"], "buy", sold - bought,
+                                                  sell_ack["price"], sell_fee)
+        if "unwind" in result:
+            profit += result["unwind"]["profit"]
+        self.capital += profit
+        result["profit"] = profit
+
+        status = "success" if len(filled) == 2 else "partial" if filled else "timeout"
+        self.stats["executed" if status == "success" else status] += 1
+        if status != "success":
+            logger.warning(f"Trade {status} on {opportunity['symbol']}: {len(filled)}/2 legs filled")
+        result["status"] = status
+        return result
+
+    async def _unwind(self, venue: str, symbol: str, side: str, qty: float, entry_price: float,
+                      fee: float) -> Dict:
+        """Close ``qty`` opened at ``entry_price`` on ``venue`` with an opposite IOC order
+
+        Returns the filled quantity, its realised pnl (both sides' fees
+        included) and what is left open, which is added to ``positions``.
+        """
+        order = self.builders[venue].build(symbol, side, entry_price, qty)
+        unwound, profit = 0.0, 0.0
+        try:
+            ack = await asyncio.wait_for(self.venues[venue].submit(order), UNWIND_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Unwind of {qty} {symbol} on {venue} failed: {e!r}")
+            ack = None
+        if ack and ack.get("status") == "filled":
+            unwound = min(float(ack["filled_qty"]), qty)
+            if side == "sell":  # closing a long bought at entry_price
+                profit = unwound * (ack["price"] * (1 - fee) - entry_price * (1 + fee))
+            else:  # closing a short sold at entry_price
+                profit = unwound * (entry_price * (1 - fee) - ack["price"] * (1 + fee))
+            self.stats["unwound"] += 1
+        left = qty - unwound
+        if left > 0:
+            key = (venue, symbol)
+            self.positions[key] = self.positions.get(key, 0.0) + (left if side == "sell" else -left)
+            logger.warning(f"{left} {symbol} left open on {venue} after unwinding")
+        return {"venue": venue, "side": side, "qty": unwound, "profit": profit, "open": left}
+
+    def latency_report(self) -> Dict:
+        return {stage: h.summary() for stage, h in self.histograms.items()}
+
+
+class MockExchangeServer:
+    """Local aiohttp exchange stub with per-venue ack latency
+
+    ``POST /{venue}/orders`` fills IOC orders in full after the venue's
+    latency; ``DELETE /{venue}/orders/{client_order_id}`` cancels. When a
+    ``secret`` is given, the ``X-Signature`` header is verified.
+    """
+
+    def __init__(self, latency_ms: Optional[Dict[str, float]] = None, default_latency_ms: float = 1.0,
+                 secret: Optional[str] = None):
+        self.latency_ms = latency_ms or {}
+        self.default_latency_ms = default_latency_ms
+        self.secret = secret
+        self.orders: Dict[str, Dict] = {}
+        self.cancelled: List[str] = []
+        self._runner = None
+        self.url = None
+
+    async def _submit(self, request):
+        from aiohttp import web
+
+        body = await request.read()
+        received_at = time.time()
+        if self.secret is not None:
+            expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, request.headers.get("X-Signature", "")):
+                return web.json_response({"status": "rejected", "reason": "bad signature"}, status=401)
+        order = json.loads(body)
+        venue = request.match_info["venue"]
+        await asyncio.sleep(self.latency_ms.get(venue, self.default_latency_ms) / 1000)
+        self.orders[order["client_order_id"]] = order
+        return web.json_response({
+            "status": "filled", "client_order_id": order["client_order_id"],
+            "filled_qty": order["qty"], "price": order["price"], "received_at": received_at,
+        })
+
+    async def _cancel(self, request):
+        from aiohttp import web
+
+        client_order_id = request.match_info["order_id"]
+        self.cancelled.append(client_order_id)
+        return web.json_response({"status": "cancelled", "client_order_id": client_order_id})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/{venue}/orders", self._submit)
+        app.router.add_delete("/{venue}/orders/{order_id}", self._cancel)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def pipeline_from_config(config: Dict, venues: Dict[str, HttpVenue]) -> ExecutionPipeline:
+    """Build a pipeline using ``automation.max_risk_per_trade`` and ``execution`` settings"""
+    keys = config.get("api_keys", {})
+    execution = config.get("execution", {})
+    builders = {name: OrderBuilder(name, keys.get("exchange_key"), keys.get("exchange_secret"))
+                for name in venues}
+    return ExecutionPipeline(
+        venues, builders,
+        capital=execution.get("capital", 10000.0),
+        max_risk_per_trade=config.get("automation", {}).get("max_risk_per_trade", 0.02),
+        latency_budget_ms=execution.get("latency_budget_ms", 50.0),
+    )
+
+
+async def _demo(trades: int, latency_ms: float, slow_venue_ms: float, budget_ms: float):
+    secret = "mock-secret"
+    server = MockExchangeServer({"exchange1": slow_venue_ms}, default_latency_ms=latency_ms, secret=secret)
+    url = await server.start()
+    venues = {name: HttpVenue(name, url) for name in ("exchange0", "exchange1", "exchange2")}
+    config = {"api_keys": {"exchange_key": "mock", "exchange_secret": secret},
+              "automation": {"max_risk_per_trade": 0.02},
+              "execution": {"latency_budget_ms": budget_ms}}
+    pipeline = pipeline_from_config(config, venues)
+    pipeline.prepare(["BTC/USDT"])
+    pairs = [("exchange0", "exchange2"), ("exchange2", "exchange0"), ("exchange0", "exchange1")]
+    try:
+        for i in range(trades):
+            buy, sell = pairs[i % len(pairs)]
+            await pipeline.execute({
+                "symbol": "BTC/USDT", "buy_exchange": buy, "sell_exchange": sell,
+                "buy_price": 100.0, "sell_price": 100.5, "quantity": 5.0,
+                "detected_at": time.perf_counter(),
+            })
+    finally:
+        for venue in venues.values():
+            await venue.close()
+        await server.stop()
+
+    print(f"{trades} trades: {pipeline.stats}  capital ${pipeline.capital:.2f}  "
+          f"open positions {pipeline.positions or 'none'}")
+    for stage, summary in pipeline.latency_report().items():
+        print(f"  {stage:<6} n={summary['count']:<6} p50 {summary['p50_us']:>8.0f}us  "
+              f"p99 {summary['p99_us']:>8.0f}us  max {summary['max_us']:>8.0f}us")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Execution pipeline against a local mock exchange")
+    parser.add_argument('--trades', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='Mock ack latency')
+    parser.add_argument('--slow-venue-ms', type=float, default=80.0, help='Ack latency of exchange1')
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(_demo(args.trades, args.latency_ms, args.slow_venue_ms, args.budget_ms))
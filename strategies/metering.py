@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Usage metering for monetized APIs
+
+Per-call events are folded into per key/endpoint/time-bucket counters as
+they arrive, flushed to an append-only log in the background and billed
+from those buckets with tiered pricing.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from event_log import EventLogReader, EventLogWriter, list_segments, remove_segments
+
+logger = logging.getLogger(__name__)
+
+# Buckets per usage log line: [key, endpoint, bucket, calls, units] rows
+USAGE_ROWS_PER_RECORD = 10000
+
+# Monthly per-key volume tiers: (units up to, price per unit); None = no limit
+DEFAULT_TIERS = [(10000, 0.0), (1000000, 0.001), (None, 0.0005)]
+
+
+class PricingTiers:
+    """Graduated pricing: each unit is charged at the rate of the tier it falls in"""
+
+    def __init__(self, tiers: Sequence[Tuple[Optional[float], float]] = DEFAULT_TIERS):
+        self.tiers = sorted(tiers, key=lambda t: float("inf") if t[0] is None else t[0])
+        if self.tiers and self.tiers[-1][0] is not None:
+            raise ValueError("The last pricing tier must be unbounded (up_to: null)")
+
+    @classmethod
+    def from_config(cls, tiers: Optional[List[Dict]]) -> "PricingTiers":
+        """``[{"up_to": 10000, "price": 0.0}, ..., {"up_to": null, "price": 0.0005}]``"""
+        if not tiers:
+            return cls()
+        return cls([(t.get("up_to"), t["price"]) for t in tiers])
+
+    def cost(self, units: float) -> float:
+        """Price of the first ``units`` units of a period"""
+        total = 0.0
+        floor = 0
+        for up_to, price in self.tiers:
+            if up_to is None or units <= up_to:
+                return total + (units - floor) * price
+            total += (up_to - floor) * price
+            floor = up_to
+        return total
+
+    def charge(self, before: float, added: float) -> float:
+        """Price of ``added`` units on top of ``before`` already billed this period"""
+        return self.cost(before + added) - self.cost(before)
+
+
+class UsageMeter:
+    """In-memory usage counters with durable, batched flushes
+
+    ``record`` is the hot path: one dict update on the caller's thread and
+    no locks, so it must only be called from the event loop thread (or one
+    ingest thread). ``flush`` swaps the open counters for an empty dict and
+    appends the old ones to the usage log from a worker thread; only
+    flushed (durable) usage is handed to ``bill``. On start-up the log is
+    replayed, so nothing is billed twice or lost across restarts.
+
+    Tier positions are kept for the newest billed period only: once a
+    later period has been billed, earlier ones are dropped (usage arriving
+    for them after that starts again from the first tier).
+    """
+
+    def __init__(self, log_path: Optional[str] = None, bucket_seconds: int = 60,
+                 flush_interval: float = 5.0):
+        self.log_path = log_path
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.events = 0
+        self.revenue = 0.0
+        # (key, endpoint, bucket) -> [calls, units]
+        self._open: Dict[Tuple[str, str, int], List] = {}
+        self._unbilled: Dict[Tuple[str, str, int], List] = {}
+        # (key, "YYYY-MM") -> units billed so far, for the tier position
+        self.period_units: Dict[Tuple[str, str], float] = {}
+        self.current_period: Optional[str] = None  # newest period billed
+        self._periods: Dict[int, str] = {}
+        self._writer: Optional[EventLogWriter] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        if log_path:
+            if list_segments(log_path):
+                self._replay()
+            self._writer = EventLogWriter(log_path)
+
+    def record(self, key: str, endpoint: str, units: float = 1, ts: Optional[float] = None):
+        bucket_key = (key, endpoint, int((ts or time.time()) // self.bucket_seconds))
+        counts = self._open.get(bucket_key)
+        if counts is None:
+            self._open[bucket_key] = [1, units]
+        else:
+            counts[0] += 1
+            counts[1] += units
+        self.events += 1
+
+    def record_many(self, events: Iterable[Tuple]):
+        """``(key, endpoint, units, ts)`` tuples"""
+        record = self.record
+        for event in events:
+            record(*event)
+
+    @staticmethod
+    def _merge(into: Dict, batch: Dict):
+        for bucket_key, (calls, units) in batch.items():
+            counts = into.get(bucket_key)
+            if counts is None:
+                into[bucket_key] = [calls, units]
+            else:
+                counts[0] += calls
+                counts[1] += units
+
+    def _write(self, batch: Dict):
+        rows = [(key, endpoint, bucket, calls, units) for (key, endpoint, bucket), (calls, units) in batch.items()]
+        for i in range(0, len(rows), USAGE_ROWS_PER_RECORD):
+            self._writer.append({"type": "usage", "rows": rows[i:i + USAGE_ROWS_PER_RECORD]})
+        self._writer.flush(sync=True)
+
+    async def _in_writer(self, write, *args):
+        """Run a blocking log write in the executor, one at a time"""
+        while self._flushing is not None:
+            try:
+                await self._flushing
+            except Exception:
+                pass  # reported to the caller that started it
+        self._flushing = asyncio.get_running_loop().run_in_executor(None, write, *args)
+        try:
+            await self._flushing
+        finally:
+            self._flushing = None
+
+    def _write_billed(self, revenue: float):
+        self._writer.append({"type": "billed", "revenue": revenue, "ts": time.time()})
+        self._writer.flush(sync=True)
+
+    async def flush(self) -> int:
+        """Persist the open counters; returns the number of buckets written"""
+        if self._flushing is not None:
+            await self._flushing
+        batch, self._open = self._open, {}
+        if not batch:
+            return 0
+        if self._writer is not None:
+            try:
+                await self._in_writer(self._write, batch)
+            except Exception:
+                # Keep the usage for the next attempt rather than dropping it
+                self._merge(self._open, batch)
+                raise
+        self._merge(self._unbilled, batch)
+        return len(batch)
+
+    def period(self, bucket: int) -> str:
+        period = self._periods.get(bucket)
+        if period is None:
+            period = self._periods[bucket] = time.strftime("%Y-%m", time.gmtime(bucket * self.bucket_seconds))
+        return period
+
+    def _period_usage(self, buckets: Dict) -> Dict[Tuple[str, str], float]:
+        """Units per (key, period) in ``buckets``"""
+        usage: Dict[Tuple[str, str], float] = {}
+        period = self.period
+        for (key, _, bucket), (_, units) in buckets.items():
+            period_key = (key, period(bucket))
+            usage[period_key] = usage.get(period_key, 0) + units
+        return usage
+
+    def _add_billed(self, usage: Dict[Tuple[str, str], float]):
+        for period_key, units in usage.items():
+            self.period_units[period_key] = self.period_units.get(period_key, 0) + units
+        newest = max((period for _, period in usage), default=None)
+        if newest is not None and (self.current_period is None or newest > self.current_period):
+            # A new period: the old tier positions will not be needed again
+            self.current_period = newest
+            self.period_units = {k: v for k, v in self.period_units.items() if k[1] >= newest}
+            self._periods.clear()
+
+    async def bill(self, pricing: PricingTiers) -> float:
+        """Charge all flushed, unbilled usage and return the revenue
+
+        The "billed" marker is synced to the log from the executor, like
+        :meth:`flush`, so the loop never waits on the disk.
+        """
+        usage = self._period_usage(self._unbilled)
+        self._unbilled = {}
+
+        revenue = 0.0
+        for period_key, units in usage.items():
+            revenue += pricing.charge(self.period_units.get(period_key, 0), units)
+        self._add_billed(usage)
+        self.revenue += revenue
+        if self._writer is not None and usage:
+            await self._in_writer(self._write_billed, revenue)
+        return revenue
+
+    def _replay(self):
+        """Rebuild unbilled buckets and per-period tier positions from the log"""
+        pending: Dict = {}
+        for record in EventLogReader(self.log_path).read():
+            if record.get("type") == "usage":
+                self._merge(pending, {(key, endpoint, bucket): (calls, units)
+                                      for key, endpoint, bucket, calls, units in record["rows"]})
+            elif record.get("type") == "billed":
+                self._add_billed(self._period_usage(pending))
+                self.revenue += record["revenue"]
+                pending = {}
+        self._unbilled = pending
+        logger.info(f"Usage log replayed: {len(pending)} unbilled buckets, ${self.revenue:.2f} billed")
+
+    def start(self):
+        """Flush every ``flush_interval`` seconds on the running loop"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Usage flush failed: {e}")
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def stats(self) -> Dict:
+        return {
+            "events": self.events,
+            "open_buckets": len(self._open),
+            "unbilled_buckets": len(self._unbilled),
+            "keys_this_period": sum(1 for _, period in self.period_units if period == self.current_period),
+            "revenue": self.revenue,
+        }
+
+
+def _load_test(events: int, keys: int, endpoints: int, rate: float, bucket_seconds: int,
+               log_path: Optional[str]):
+    import random
+
+    rng = random.Random(7)
+    key_names = [f"key-{i}" for i in range(keys)]
+    endpoint_names = [f"/v1/endpoint{i}" for i in range(endpoints)]
+    start = time.time()
+    # Pre-built so the measured loop is ingest only
+    stream = [(rng.choice(key_names), rng.choice(endpoint_names), 1, start + i / rate) for i in range(events)]
+
+    if log_path:
+        remove_segments(log_path)
+    meter = UsageMeter(log_path, bucket_seconds=bucket_seconds)
+    record = meter.record
+    started = time.perf_counter()
+    for key, endpoint, units, ts in stream:
+        record(key, endpoint, units, ts)
+    ingest = time.perf_counter() - started
+    buckets = len(meter._open)
+
+    started = time.perf_counter()
+    asyncio.run(meter.flush())
+    flush = time.perf_counter() - started
+    started = time.perf_counter()
+    revenue = asyncio.run(meter.bill(PricingTiers()))
+    bill = time.perf_counter() - started
+    asyncio.run(meter.close())
+
+    print(f"{events:,} events over {keys:,} keys x {endpoints} endpoints "
+          f"({rate:,.0f} events per traffic second, {bucket_seconds}s buckets)")
+    print(f"  ingest {events / ingest:,.0f} events/s ({ingest / events * 1e9:.0f}ns/event)")
+    print(f"  {buckets:,} buckets, flush {flush * 1000:.0f}ms, bill {bill * 1000:.1f}ms, revenue ${revenue:,.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Metering load generator")
+    parser.add_argument('--events', type=int, default=2000000)
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--endpoints', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=100000, help='Event timestamps per second of traffic')
+    parser.add_argument('--bucket-seconds', type=int, default=60)
+    parser.add_argument('--log', default='', help='Usage log to flush to (default: in-memory only)')
+    args = parser.parse_args()
+    _load_test(args.events, args.keys, args.endpoints, args.rate, args.bucket_seconds, args.log or None)
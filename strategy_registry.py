@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Strategy plugin registry
+Finds income strategies under strategies/ lazily and runs each one on its
+own executor with its own timeout
+"""
+
+import importlib
+import inspect
+import logging
+import pkgutil
+from typing import Dict, List, Optional
+
+from metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+PACKAGE = "strategies"
+# Support code for the strategies, never strategies themselves
+HELPER_MODULES = ("exchanges", "orderbook", "execution", "metering", "quota")
+EXECUTORS = ("asyncio", "process")
+DEFAULT_TIMEOUT = 30.0
+# Config sections the generator owns; strategies may read any other one
+CORE_SECTIONS = ("strategies", "targets", "automation", "plugins", "risk", "allocator")
+
+
+def strategy_class(module) -> Optional[type]:
+    """The class in ``module`` that defines ``generate_income``, if any"""
+    for value in vars(module).values():
+        if (inspect.isclass(value) and value.__module__ == module.__name__
+                and callable(getattr(value, "generate_income", None))):
+            return value
+    return None
+
+
+# Per worker process: strategy instances and the loop their coroutines run on
+_worker_instances: Dict[str, object] = {}
+_worker_loop: Optional["asyncio.AbstractEventLoop"] = None
+
+
+def _generate_in_worker(module_name: str, class_name: str, config: Dict, risk_scale: float = 1.0,
+                        agents: Optional[int] = None) -> float:
+    """Process-pool entry point; the instance lives as long as the worker"""
+    global _worker_loop
+    instance = _worker_instances.get(class_name)
+    if instance is None:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        instance = _worker_instances[class_name] = cls(config)
+    if hasattr(instance, "risk_scale"):
+        instance.risk_scale = risk_scale
+    if hasattr(instance, "agents"):
+        instance.agents = agents
+    result = instance.generate_income()
+    if inspect.isawaitable(result):
+        if _worker_loop is None:
+            import asyncio
+            _worker_loop = asyncio.new_event_loop()
+        result = _worker_loop.run_until_complete(result)
+    return float(result)
+
+
+class StrategyRunner:
+    """Runs one strategy's ``generate_income`` on its executor
+
+    ``asyncio`` strategies are awaited on the caller's loop. ``process``
+    strategies get a single-worker process pool of their own, so their
+    state stays in one place and CPU-bound work never blocks the loop.
+    A call that overruns ``timeout`` raises ``asyncio.TimeoutError``; a
+    process call cannot be interrupted, so later calls fail fast until it
+    has finished.
+
+    ``risk_scale`` (set by the caller before each call) is handed to
+    strategies that define a ``risk_scale`` attribute, which size their
+    positions by it; others ignore it. ``agents``, the stream's agent
+    slots from the allocator, is handed over the same way and bounds how
+    much work such a strategy keeps in flight (None = no limit, 0 = no
+    new work).
+    """
+
+    def __init__(self, key: str, cls: type, config: Dict, executor: str = "asyncio",
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, metrics: MetricsRegistry = METRICS):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r} for strategy {key} (expected one of {EXECUTORS})")
+        self.key = key
+        self.cls = cls
+        self.config = config
+        self.executor = executor
+        self.timeout = timeout
+        self.instance = None
+        self.risk_scale = 1.0
+        self.agents: Optional[int] = None
+        self._pool = None  # concurrent.futures.ProcessPoolExecutor, created on the first call
+        self._running = None
+        self._latency = metrics.histogram("strategy_seconds", strategy=key)
+        self._timeouts = metrics.counter("strategy_timeouts_total", strategy=key)
+
+    async def _call(self) -> float:
+        import asyncio
+
+        if self.executor == "asyncio":
+            if self.instance is None:
+                self.instance = self.cls(self.config)
+            if hasattr(self.instance, "risk_scale"):
+                self.instance.risk_scale = self.risk_scale
+            if hasattr(self.instance, "agents"):
+                self.instance.agents = self.agents
+            result = self.instance.generate_income()
+            if inspect.isawaitable(result):
+                result = await result
+            return float(result)
+
+        if self._running is not None and not self._running.done():
+            raise RuntimeError(f"Strategy {self.key} is still running its previous call")
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._running = self._pool.submit(_generate_in_worker, self.cls.__module__, self.cls.__name__, self.config,
+                                          self.risk_scale, self.agents)
+        # shield: on timeout only our wait is cancelled, the worker call runs on
+        return await asyncio.shield(asyncio.wrap_future(self._running))
+
+    async def generate_income(self) -> float:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            return await asyncio.wait_for(self._call(), self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts.inc()
+            logger.warning(f"Strategy {self.key} timed out after {self.timeout}s")
+            raise
+        finally:
+            self._latency.record(loop.time() - started)
+
+    async def close(self):
+        if self.instance is not None and hasattr(self.instance, "close"):
+            await self.instance.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class StrategyRegistry:
+    """Strategy plugins keyed by module name (``api_monetization``, ...)
+
+    Nothing under ``strategies/`` is imported until a key is first asked
+    for. Only keys listed in the config's ``plugins`` section are bound;
+    each entry may set ``executor`` (``asyncio``/``process``) and
+    ``timeout`` in seconds, falling back to the class attributes of the
+    same names and then to asyncio with a 30s timeout.
+    """
+
+    def __init__(self, config: Dict, metrics: MetricsRegistry = METRICS):
+        self.config = config
+        self.metrics = metrics
+        self._classes: Dict[str, Optional[type]] = {}
+        self._runners: Dict[str, Optional[StrategyRunner]] = {}
+
+    def available(self) -> List[str]:
+        """Strategy module names, found without importing them"""
+        package = importlib.import_module(PACKAGE)
+        return sorted(m.name for m in pkgutil.iter_modules(package.__path__)
+                      if not m.ispkg and m.name not in HELPER_MODULES)
+
+    def get(self, key: str) -> Optional[type]:
+        """Import ``strategies.<key>`` on first use and return its strategy class"""
+        if key not in self._classes:
+            cls = None
+            if key not in HELPER_MODULES:
+                try:
+                    cls = strategy_class(importlib.import_module(f"{PACKAGE}.{key}"))
+                except ModuleNotFoundError as e:
+                    if e.name != f"{PACKAGE}.{key}":
+                        raise
+            self._classes[key] = cls
+            if cls:
+                logger.info(f"Loaded strategy {key}: {cls.__name__}")
+        return self._classes[key]
+
+    def runner(self, key: str) -> Optional[StrategyRunner]:
+        """Runner for ``key`` if it is enabled in ``plugins`` and has a strategy class"""
+        if key not in self._runners:
+            options = self.config.get("plugins", {}).get(key)
+            cls = self.get(key) if options is not None else None
+            if options is not None and cls is None:
+                logger.warning(f"No strategy class for plugin {key}; using the built-in simulation")
+            self._runners[key] = StrategyRunner(
+                key, cls, self.config,
+                executor=options.get("executor", getattr(cls, "executor", "asyncio")),
+                timeout=options.get("timeout", getattr(cls, "timeout", DEFAULT_TIMEOUT)),
+                metrics=self.metrics,
+            ) if cls else None
+        return self._runners[key]
+
+    async def reconfigure(self, config: Dict) -> List[str]:
+        """Switch to ``config``, closing the runners it invalidates
+
+        A runner is rebuilt on its next use when its ``plugins`` entry
+        changed, or any section a strategy might read did. Other runners,
+        and the connections they hold, are kept. Returns the keys dropped.
+        """
+        import asyncio
+
+        old, self.config = self.config, config
+        shared_changed = any(old.get(section) != config.get(section)
+                             for section in old.keys() | config.keys() if section not in CORE_SECTIONS)
+        stale = [key for key in self._runners
+                 if shared_changed or old.get("plugins", {}).get(key) != config.get("plugins", {}).get(key)]
+        runners = [self._runners.pop(key) for key in stale]
+        await asyncio.gather(*(r.close() for r in runners if r), return_exceptions=True)
+        return stale
+
+    async def close(self):
+        import asyncio
+
+        runners = [r for r in self._runners.values() if r]
+        await asyncio.gather(*(r.close() for r in runners), return_exceptions=True)
@@ -3,43 +3,63 @@
 import json, asyncio, random
 from datetime import datetime
 from typing import Dict, List, Any
+from scheduler import TaskScheduler
+from event_log import EventLogWriter, rebuild_report
+from metrics import METRICS, METRICS_PORT, MetricsServer
+from settings import env
+from state_registry import AGENTS, RegistryView, snapshot
 
-class MobileAIAgent:
+class MobileAIAgent(RegistryView):
+    """Agent whose name and counters live in the shared AGENTS registry"""
+    __slots__ = ()
+    registry = AGENTS
+    task_delay = 0.05  # Simulated work per task; benchmark.py sets 0
+    
     def __init__(self, name: str, specialty: str):
-        self.name = name
-        self.specialty = specialty
-        self.tasks_completed = 0
-        self.revenue_generated = 0.0
+        self._register(name, specialty, 0, 0.0)
     
     async def execute_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        await asyncio.sleep(0.05)
+        await asyncio.sleep(self.task_delay)
         self.tasks_completed += 1
         revenue = random.uniform(10, 100)
         self.revenue_generated += revenue
         return {"agent": self.name, "status": "completed", "revenue": revenue, "timestamp": datetime.now().isoformat()}
 
 class MobileOrchestrator:
-    def __init__(self):
+    def __init__(self, max_per_agent: int = 4, queue_size: int = None, event_log: EventLogWriter = None,
+                 publisher=None, metrics=METRICS):
         self.agents: List[MobileAIAgent] = []
         self.total_revenue = 0.0
         self.tasks_completed = 0
+        self.event_log = event_log
+        self.publisher = publisher  # Optional status_feed.StatusPublisher, started by the caller
+        self.scheduler = TaskScheduler(self.agents, max_per_agent=max_per_agent, queue_size=queue_size, metrics=metrics)
     
     def register_agent(self, agent: MobileAIAgent):
         self.agents.append(agent)
         print(f"✓ Registered: {agent.name}")
     
-    async def process_tasks(self, num: int = 20):
-        tasks = [random.choice(self.agents).execute_task({"id": i}) for i in range(num)]
-        results = await asyncio.gather(*tasks)
-        self.total_revenue += sum(r["revenue"] for r in results)
-        self.tasks_completed += len(results)
+    async def process_tasks(self, num: int = 20, collect: bool = True):
+        """Run ``num`` tasks through the scheduler; pass ``collect=False`` to keep memory flat"""
+        results = []
+        def on_result(r):
+            self.total_revenue += r["revenue"]
+            self.tasks_completed += 1
+            if self.event_log:
+                self.event_log.append({"type": "task", "source": r["agent"], "amount": r["revenue"], "ts": r["timestamp"]})
+            if collect:
+                results.append(r)
+        await self.scheduler.run(({"id": i} for i in range(num)), on_result)
+        if self.publisher:
+            self.publisher.publish(self.get_status())
         return results
     
     def get_status(self):
         return {
             "total_revenue": self.total_revenue,
             "tasks_completed": self.tasks_completed,
-            "agents": [{"name": a.name, "tasks": a.tasks_completed, "revenue": a.revenue_generated} for a in self.agents]
+            "agents": snapshot(self.agents, {"name": "name", "tasks": "tasks_completed", "revenue": "revenue_generated"}),
+            "scheduler": self.scheduler.get_stats()
         }
 
 async def main():
@@ -48,7 +68,15 @@ async def main():
     print("=" * 60)
     print()
     
-    orch = MobileOrchestrator()
+    event_log = EventLogWriter(f"logs/results-{datetime.now():%Y%m%d-%H%M%S}.ndjson")
+    orch = MobileOrchestrator(event_log=event_log)
+    shards = int(env("WEALTH_SHARDS", "0"))
+    if shards:
+        from sharding import ShardedOrchestrator
+        orch = ShardedOrchestrator(orch, shards=shards)
+    exporter = MetricsServer() if METRICS_PORT else None
+    if exporter:
+        await exporter.start()
     print("📱 Initializing AI Agents...")
     
     for name, spec in [
@@ -60,25 +88,29 @@ async def main():
     ]:
         orch.register_agent(MobileAIAgent(name, spec))
     
-    print("
-💰 Running Revenue Generation Simulation...
-")
+    if shards:
+        await orch.start()
+    
+    print("\n💰 Running Revenue Generation Simulation...\n")
     
     for i in range(1, 6):
-        await orch.process_tasks(20)
+        await orch.process_tasks(20, collect=False)
         print(f"  Round {i}/5: Revenue = ${orch.total_revenue:.2f}")
     
-    print("
-" + "=" * 60)
+    print("\n" + "=" * 60)
     print("📊 FINAL REPORT")
     print("=" * 60)
     
+    if shards:
+        await orch.close()
+    event_log.close()
+    if exporter:
+        await exporter.close()
     status = orch.get_status()
-    print(f"
-💵 Total Revenue: ${status['total_revenue']:.2f}")
+    status["event_log"] = rebuild_report(event_log.base_path)
+    print(f"\n💵 Total Revenue: ${status['total_revenue']:.2f}")
     print(f"✅ Tasks Completed: {status['tasks_completed']}")
-    print(f"
-🤖 Agent Performance:")
+    print(f"\n🤖 Agent Performance:")
     
     for agent in status['agents']:
         print(f"  • {agent['name']}: {agent['tasks']} tasks, ${agent['revenue']:.2f}")
@@ -86,10 +118,13 @@ async def main():
     with open('results.json', 'w') as f:
         json.dump(status, f, indent=2)
     
-    print("
-✅ Results saved to results.json")
-    print("🎯 System ready for deployment!
-")
+    print("\n✅ Results saved to results.json")
+    print("🎯 System ready for deployment!\n")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import sys
+    if "--startup-profile" in sys.argv[1:]:
+        from startup import print_profile
+        print_profile("system_core", "system_core.MobileOrchestrator()")
+    else:
+        asyncio.run(main())
@@ -1,38 +1,85 @@
 #!/usr/bin/env python3
 """AI Wealth Ecosystem - Enhanced with Real APIs"""
-import os
 import json
 import asyncio
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
 
-# Install if missing: pip install aiohttp python-dotenv
-try:
-    import aiohttp
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    print("Installing required packages...")
-    os.system("pip install aiohttp python-dotenv")
-    import aiohttp
-    from dotenv import load_dotenv
-    load_dotenv()
+from request_coalescer import RequestCoalescer, TTLCache
+from event_log import EventLogReader, EventLogWriter, ReportAccumulator
+from metrics import METRICS, METRICS_PORT, MetricsRegistry, MetricsServer
+from settings import env
+from state_registry import AGENTS, RegistryView, snapshot
 
-class RealAIAgent:
-    """Agent with actual API integration capability"""
-    def __init__(self, name: str, specialty: str, api_key: str = None):
-        self.name = name
-        self.specialty = specialty
-        self.api_key = api_key or os.getenv('OPENAI_API_KEY', 'demo_mode')
-        self.tasks_completed = 0
-        self.revenue_generated = 0.0
+if TYPE_CHECKING:
+    from http_client import HttpClientPool  # imports aiohttp; loaded on first live call
+
+class ModelGateway:
+    """Shared completions client: dedupes identical prompts, micro-batches
+    prompts billed to the same key into one request, and caches responses"""
+    def __init__(self, http: "HttpClientPool", window_ms: float = 5.0, max_batch: int = 16,
+                 cache_size: int = 10000, cache_ttl: float = 300.0, cache_path: str = None):
+        self.http = http
+        self.api_base = env('OPENAI_API_BASE', 'https://api.openai.com/v1')
+        self.model = env('OPENAI_MODEL', 'gpt-3.5-turbo-instruct')
+        cache = TTLCache(cache_size, cache_ttl, cache_path or env('MODEL_CACHE_PATH'))
+        self.coalescer = RequestCoalescer(self._send_batch, window_ms, max_batch, cache)
+    
+    async def complete(self, prompt: str, api_key: str, max_tokens: int = 256) -> str:
+        request = {"model": self.model, "prompt": prompt, "max_tokens": max_tokens}
+        return await self.coalescer.call(request, batch_key=(api_key, self.model, max_tokens))
+    
+    async def _send_batch(self, requests: List[Dict], batch_key) -> List[str]:
+        api_key, model, max_tokens = batch_key
+        response = await self.http.post(
+            f"{self.api_base}/completions",
+            api_key=api_key,
+            headers={"Authorization": f"Bearer {api_key}"},
+            json={"model": model, "prompt": [r["prompt"] for r in requests], "max_tokens": max_tokens}
+        )
+        choices = sorted(response["choices"], key=lambda c: c["index"])
+        return [c["text"].strip() for c in choices]
+    
+    def stats(self) -> Dict:
+        return self.coalescer.stats()
+    
+    def close(self):
+        self.coalescer.cache.save()
+
+class RealAIAgent(RegistryView):
+    """Agent with actual API integration capability
+    
+    Name and counters live in the shared AGENTS registry; only the API
+    settings are per-object.
+    """
+    __slots__ = ("api_key", "mode", "gateway")
+    registry = AGENTS
+    task_delay = 0.1  # Simulated work per task; benchmark.py sets 0
+    
+    shard_local = ("gateway",)  # Not copied into shard processes; see attach_shard
+    
+    def __init__(self, name: str, specialty: str, api_key: str = None, gateway: ModelGateway = None):
+        self._register(name, specialty, 0, 0.0)
+        self.api_key = api_key or env('OPENAI_API_KEY', 'demo_mode')
         self.mode = "live" if api_key else "simulation"
+        self.gateway = gateway
+    
+    def attach_shard(self, ctx):
+        """Give a copy of this agent running in a shard process its own pooled client"""
+        if self.mode == "live":
+            from http_client import HttpClientPool
+            http = ctx.resource("http", HttpClientPool)
+            self.gateway = ctx.resource("gateway", lambda: ModelGateway(http))
     
     async def analyze_market(self) -> Dict:
         """Market analysis using AI"""
         if self.mode == "live":
-            # Real API call would go here
-            analysis = "Real market data analysis"
+            try:
+                analysis = await self.gateway.complete(
+                    f"Identify one short-term {self.specialty} revenue opportunity.", self.api_key)
+            except Exception as e:
+                analysis = f"Live analysis unavailable: {e}"
         else:
             analysis = "Simulated market opportunity detected"
         
@@ -44,7 +91,7 @@ class RealAIAgent:
     
     async def execute_task(self, task: Dict) -> Dict:
         """Execute task with real or simulated AI"""
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(self.task_delay)
         
         self.tasks_completed += 1
         
@@ -77,38 +124,95 @@ class RealAIAgent:
 
 class EnhancedOrchestrator:
     """Enhanced orchestrator with real-time capabilities"""
-    def __init__(self):
+    def __init__(self, event_log: EventLogWriter = None, metrics: MetricsRegistry = METRICS):
         self.agents: List[RealAIAgent] = []
+        self.metrics = metrics
+        self.event_log = event_log
+        self._log_reader = EventLogReader(event_log.base_path) if event_log else None
+        self._log_summary = ReportAccumulator()
         self.total_revenue = 0.0
         self.session_start = datetime.now()
-        self.api_enabled = bool(os.getenv('OPENAI_API_KEY'))
+        self.api_enabled = bool(env('OPENAI_API_KEY'))
+        # Created for the first live agent, so simulation runs never load aiohttp
+        self._http = None
+        self._gateway = None
+    
+    @property
+    def http(self) -> "HttpClientPool":
+        if self._http is None:
+            from http_client import HttpClientPool
+            self._http = HttpClientPool()
+        return self._http
+    
+    @property
+    def gateway(self) -> ModelGateway:
+        if self._gateway is None:
+            self._gateway = ModelGateway(self.http)
+        return self._gateway
     
     def register_agent(self, agent: RealAIAgent):
+        if agent.gateway is None and agent.mode == "live":
+            agent.gateway = self.gateway
         self.agents.append(agent)
         mode_indicator = "🟢 LIVE" if agent.mode == "live" else "🟡 SIM"
         print(f"  {mode_indicator} {agent.name} ({agent.specialty})")
     
-    async def run_income_stream(self, stream_name: str, duration: int = 5):
-        """Simulate a specific income stream"""
-        print(f"
-💰 Running: {stream_name}")
+    async def run_income_stream(self, stream_name: str, duration: int = 5, max_in_flight: int = 1024) -> Dict:
+        """Simulate a specific income stream: ``duration`` tasks per agent
         
-        tasks = []
-        for i in range(duration):
-            for agent in self.agents:
-                task = {"type": agent.specialty, "stream": stream_name, "id": i}
-                tasks.append(agent.execute_task(task))
+        Each result goes to the event log as it completes and is then
+        dropped; tasks are created lazily with at most ``max_in_flight``
+        pending, so memory does not grow with ``duration``. Returns the
+        stream's task count and revenue.
+        """
+        print(f"\n💰 Running: {stream_name}")
         
-        results = await asyncio.gather(*tasks)
-        stream_revenue = sum(r["revenue"] for r in results)
-        self.total_revenue += stream_revenue
+        pending = ((agent, {"type": agent.specialty, "stream": stream_name, "id": i})
+                   for i in range(duration) for agent in self.agents)
+        totals = {"stream": stream_name, "tasks": 0, "revenue": 0.0}
         
-        print(f"   Generated: ${stream_revenue:.2f}")
-        return results
+        async def worker():
+            for agent, task in pending:
+                r = await self._timed_task(agent, task)
+                totals["tasks"] += 1
+                totals["revenue"] += r["revenue"]
+                if self.event_log:
+                    self.event_log.append({"type": "task", "source": r["agent"], "stream": stream_name,
+                                           "amount": r["revenue"], "ts": r["timestamp"]})
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(max_in_flight, duration * len(self.agents)))))
+        self.total_revenue += totals["revenue"]
+        self.metrics.histogram("income_stream_seconds", stream=stream_name).record(time.perf_counter() - started)
+        self.metrics.counter("stream_revenue_total", stream=stream_name).inc(totals["revenue"])
+        
+        print(f"   Generated: ${totals['revenue']:.2f}")
+        return totals
     
-    def generate_report(self):
-        """Generate comprehensive performance report"""
+    async def _timed_task(self, agent: RealAIAgent, task: Dict) -> Dict:
+        latency = self.metrics.histogram("agent_task_seconds", agent=agent.name)
+        started = time.perf_counter()
+        try:
+            return await agent.execute_task(task)
+        finally:
+            latency.record(time.perf_counter() - started)
+    
+    def project_revenue(self, paths: int = 20000, seed: int = None, workers: int = None) -> Dict:
+        """Monte Carlo P5/P50/P95 revenue bands from observed agent throughput"""
+        from projections import MonteCarloProjector, models_from_agents
+        
+        session_duration = (datetime.now() - self.session_start).total_seconds()
+        models = models_from_agents(self.agents, session_duration)
+        return MonteCarloProjector(models, workers=workers).run(paths, seed=seed)
+    
+    def generate_report(self, projection_paths: int = 0, seed: int = None):
+        """Generate comprehensive performance report
+
+        Monte Carlo projections are opt-in: pass ``projection_paths`` (the
+        demo's ``--projection-paths``) to include P5/P50/P95 bands.
+        """
         session_duration = (datetime.now() - self.session_start).total_seconds()
+        bands = self.project_revenue(projection_paths, seed=seed) if projection_paths else {}
         
         report = {
             "summary": {
@@ -116,45 +220,69 @@ class EnhancedOrchestrator:
                 "session_duration_seconds": session_duration,
                 "revenue_per_second": self.total_revenue / session_duration if session_duration > 0 else 0,
                 "api_mode": "LIVE" if self.api_enabled else "SIMULATION",
-                "projected_daily": self.total_revenue * (86400 / session_duration) if session_duration > 0 else 0,
-                "projected_monthly": self.total_revenue * (86400 / session_duration) * 30 if session_duration > 0 else 0,
-                "projected_annual": self.total_revenue * (86400 / session_duration) * 365 if session_duration > 0 else 0
+                "projected_daily": bands.get("daily", {}).get("p50", 0),
+                "projected_monthly": bands.get("monthly", {}).get("p50", 0),
+                "projected_annual": bands.get("annual", {}).get("p50", 0)
             },
-            "agents": [
-                {
-                    "name": agent.name,
-                    "specialty": agent.specialty,
-                    "tasks_completed": agent.tasks_completed,
-                    "revenue_generated": agent.revenue_generated,
-                    "mode": agent.mode
-                }
-                for agent in self.agents
-            ]
+            "projections": bands,
+            "http": self._http.get_stats() if self._http else {},
+            "model_calls": self._gateway.stats() if self._gateway else {},
+            "metrics": self.metrics.snapshot(),
+            "event_log": self._read_event_log(),
+            "agents": snapshot(self.agents, {
+                "name": "name",
+                "specialty": "specialty",
+                "tasks_completed": "tasks_completed",
+                "revenue_generated": "revenue_generated"
+            })
         }
+        for entry, agent in zip(report["agents"], self.agents):
+            latency = self.metrics.histogram("agent_task_seconds", agent=entry["name"])
+            entry["mode"] = agent.mode
+            entry["p50_ms"] = latency.percentile(50) / 1000
+            entry["p99_ms"] = latency.percentile(99) / 1000
         
         return report
+    
+    def _read_event_log(self) -> Dict:
+        """Fold records appended since the last report into the running summary"""
+        if not self.event_log:
+            return {}
+        self.event_log.flush()
+        return self._log_summary.update(self._log_reader).summary()
+    
+    async def close(self):
+        """Persist the response cache and release pooled HTTP connections"""
+        if self._gateway:
+            self._gateway.close()
+        if self._http:
+            await self._http.close()
+        if self.event_log:
+            self.event_log.close()
 
-async def main():
-    print("
-" + "=" * 70)
+async def main(projection_paths: int = 0):
+    print("\n" + "=" * 70)
     print("🚀 AI WEALTH GENERATION ECOSYSTEM - ENHANCED EDITION")
     print("=" * 70)
     
     # Check API status
-    api_key = os.getenv('OPENAI_API_KEY')
+    api_key = env('OPENAI_API_KEY')
     if api_key and api_key != 'your_openai_key_here':
-        print("
-✅ LIVE MODE: Real API integration active")
+        print("\n✅ LIVE MODE: Real API integration active")
     else:
-        print("
-🟡 SIMULATION MODE: Using demo data (add API keys for live mode)")
+        print("\n🟡 SIMULATION MODE: Using demo data (add API keys for live mode)")
     
     # Initialize system
-    orch = EnhancedOrchestrator()
+    orch = EnhancedOrchestrator(event_log=EventLogWriter(f"logs/enhanced-{datetime.now():%Y%m%d-%H%M%S}.ndjson"))
+    shards = int(env('WEALTH_SHARDS', '0'))
+    if shards:
+        from sharding import ShardedOrchestrator
+        orch = ShardedOrchestrator(orch, shards=shards)
+    exporter = MetricsServer() if METRICS_PORT else None
+    if exporter:
+        await exporter.start()
     
-    print("
-📱 Initializing Enhanced AI Agents:
-")
+    print("\n📱 Initializing Enhanced AI Agents:\n")
     
     agents_config = [
         ("MarketAnalyzer-AI", "market_analysis"),
@@ -167,8 +295,10 @@ async def main():
     for name, specialty in agents_config:
         orch.register_agent(RealAIAgent(name, specialty))
     
-    print("
-" + "=" * 70)
+    if shards:
+        await orch.start()
+    
+    print("\n" + "=" * 70)
     print("💸 RUNNING 5 INCOME STREAMS")
     print("=" * 70)
     
@@ -185,25 +315,26 @@ async def main():
         await orch.run_income_stream(stream, duration=3)
     
     # Generate report
-    print("
-" + "=" * 70)
+    print("\n" + "=" * 70)
     print("📊 PERFORMANCE REPORT")
     print("=" * 70)
     
-    report = orch.generate_report()
+    report = orch.generate_report(projection_paths)
+    await orch.close()
+    if exporter:
+        await exporter.close()
     
-    print(f"
-💵 Financial Summary:")
+    print(f"\n💵 Financial Summary:")
     print(f"   Total Revenue: ${report['summary']['total_revenue']:.2f}")
     print(f"   Revenue/Second: ${report['summary']['revenue_per_second']:.2f}")
-    print(f"
-📈 Projections:")
-    print(f"   Daily: ${report['summary']['projected_daily']:.2f}")
-    print(f"   Monthly: ${report['summary']['projected_monthly']:.2f}")
-    print(f"   Annual: ${report['summary']['projected_annual']:.2f}")
-    
-    print(f"
-🤖 Agent Performance:")
+    if report['projections']:
+        print(f"\n📈 Projections:")
+        for horizon in ("daily", "monthly", "annual"):
+            band = report['projections'].get(horizon)
+            if band:
+                print(f"   {horizon.title()}: ${band['p50']:.2f} (P5 ${band['p5']:.2f} – P95 ${band['p95']:.2f})")
+    
+    print(f"\n🤖 Agent Performance:")
     for agent in report['agents']:
         print(f"   • {agent['name']}: {agent['tasks_completed']} tasks, ${agent['revenue_generated']:.2f}")
     
@@ -211,15 +342,24 @@ async def main():
     with open('enhanced_report.json', 'w') as f:
         json.dump(report, f, indent=2)
     
-    print(f"
-💾 Detailed report saved: enhanced_report.json")
+    print(f"\n💾 Detailed report saved: enhanced_report.json")
     print(f"📊 Session duration: {report['summary']['session_duration_seconds']:.1f} seconds")
     
-    print("
-" + "=" * 70)
+    print("\n" + "=" * 70)
     print("✅ SYSTEM OPERATIONAL - Revenue generation active!")
-    print("=" * 70 + "
-")
+    print("=" * 70 + "\n")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AI Wealth Ecosystem - Enhanced Edition")
+    parser.add_argument('--projection-paths', type=int, default=0,
+                        help='Monte Carlo paths for the revenue projections in the report (0 to skip)')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='Report import time per module for an orchestrator boot and exit')
+    args = parser.parse_args()
+    if args.startup_profile:
+        from startup import print_profile
+        print_profile("system_enhanced", "system_enhanced.EnhancedOrchestrator()")
+    else:
+        asyncio.run(main(args.projection_paths))
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from allocator import apportion, solve_split
+
+
+def test_split_is_proportional_when_no_bound_binds():
+    weights = np.array([1.0, 2.0, 3.0, 4.0])
+    split, lam = solve_split(weights, np.zeros(4), np.full(4, 100.0), 100.0)
+
+    assert split == pytest.approx([10.0, 20.0, 30.0, 40.0])
+    assert lam == pytest.approx(0.1)
+
+
+def test_split_respects_bounds_and_budget():
+    weights = np.array([100.0, 1.0, 1.0, 1.0, 0.0])
+    low, high = np.full(5, 5.0), np.full(5, 35.0)
+    split, _ = solve_split(weights, low, high, 100.0)
+
+    assert split.sum() == pytest.approx(100.0)
+    assert (split >= low - 1e-9).all() and (split <= high + 1e-9).all()
+    assert split[0] == pytest.approx(35.0)
+    assert split[4] == pytest.approx(5.0)
+    assert split[1] == pytest.approx(split[2]) == pytest.approx(split[3])
+
+
+def test_warm_start_gives_the_same_split():
+    rng = np.random.default_rng(3)
+    weights = rng.random(200)
+    low, high = np.full(200, 0.1), np.full(200, 2.0)
+    cold, lam = solve_split(weights, low, high, 100.0)
+    warm, _ = solve_split(weights * 1.01, low, high, 100.0, lam)
+
+    assert warm.sum() == pytest.approx(100.0)
+    assert warm == pytest.approx(solve_split(weights * 1.01, low, high, 100.0)[0])
+    assert cold.sum() == pytest.approx(100.0)
+
+
+def test_zero_weights_split_evenly():
+    split, _ = solve_split(np.zeros(4), np.zeros(4), np.full(4, 100.0), 40.0)
+    assert split == pytest.approx([10.0] * 4)
+
+
+def test_apportion_uses_every_slot():
+    units = apportion(np.array([1.0, 1.0, 1.0]), 10)
+    assert units.sum() == 10
+    assert sorted(units.tolist()) == [3, 3, 4]
+
+
+def test_apportion_gives_every_stream_a_slot_while_there_are_enough():
+    units = apportion(np.array([1000.0, 1.0, 1.0, 1.0]), 20)
+    assert units.tolist() == [17, 1, 1, 1]
+
+
+def test_apportion_with_fewer_slots_than_streams():
+    units = apportion(np.array([5.0, 1.0, 3.0, 1.0]), 2)
+    assert units.tolist() == [1, 0, 1, 0]
+
+
+def test_apportion_without_slots_or_shares():
+    assert apportion(np.array([1.0, 2.0]), 0).tolist() == [0, 0]
+    assert apportion(np.zeros(3), 5).tolist() == [0, 0, 0]
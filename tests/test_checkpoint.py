@@ -0,0 +1,99 @@
+import asyncio
+import os
+
+import pytest
+
+from clock import SimulatedClock
+from wealth_generator import IncomeStream, WealthGenerator
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.example.json")
+
+
+async def _cycles(generator, count, totals=None):
+    """The loop body of ``WealthGenerator.run``, minus config reloads and status output"""
+    for _ in range(count):
+        generator.cycle_count += 1
+        await generator.run_income_cycle()
+        if generator.checkpoints:
+            await generator.checkpoints.checkpoint()
+        if totals is not None:
+            totals[generator.cycle_count] = generator.total_earnings
+        await generator.clock.sleep(3600)
+
+
+async def _run_and_kill(directory, count, totals=None):
+    """Run ``count`` cycles and stop without the final snapshot, as a crash would"""
+    generator = WealthGenerator(CONFIG, clock=SimulatedClock(), checkpoint_dir=str(directory))
+    generator.initialize_streams()
+    await _cycles(generator, count, totals)
+    await generator.checkpoints._pending  # what was written before the kill
+    await generator.strategies.close()
+
+
+async def _resume(directory, count=0):
+    generator = WealthGenerator(CONFIG, clock=SimulatedClock(), checkpoint_dir=str(directory))
+    assert generator.checkpoints.restore(IncomeStream)
+    resumed_at = generator.cycle_count
+    await _cycles(generator, count)
+    await generator.checkpoints.close()
+    await generator.strategies.close()
+    return generator, resumed_at
+
+
+async def _uninterrupted(count):
+    generator = WealthGenerator(CONFIG, clock=SimulatedClock())
+    generator.initialize_streams()
+    await _cycles(generator, count)
+    await generator.strategies.close()
+    return generator
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the example config meters into data/
+    return tmp_path / "checkpoints"
+
+
+def test_kill_and_restore_matches_uninterrupted_run(checkpoint_dir):
+    asyncio.run(_run_and_kill(checkpoint_dir, 31))
+    resumed, resumed_at = asyncio.run(_resume(checkpoint_dir, 31))
+    straight = asyncio.run(_uninterrupted(62))
+
+    assert resumed_at == 31
+    assert resumed.cycle_count == straight.cycle_count == 62
+    assert resumed.total_earnings == straight.total_earnings
+    assert resumed.total_earnings == pytest.approx(183.83, abs=0.005)
+    assert [s.current_earnings for s in resumed.income_streams] == \
+           [s.current_earnings for s in straight.income_streams]
+
+
+def _newest_wal(directory):
+    return os.path.join(directory, max(p for p in os.listdir(directory) if p.startswith("wal-")))
+
+
+def test_torn_wal_tail_is_dropped(checkpoint_dir):
+    totals = {}
+    asyncio.run(_run_and_kill(checkpoint_dir, 31, totals))
+    wal = _newest_wal(checkpoint_dir)
+    intact = os.path.getsize(wal)
+    with open(wal, 'ab') as f:
+        f.write(b"\x40\x00\x00\x00\x12\x34")  # half a frame header
+
+    resumed, resumed_at = asyncio.run(_resume(checkpoint_dir))
+
+    assert resumed_at == 31
+    assert resumed.total_earnings == totals[31]
+    assert os.path.getsize(wal) == intact
+
+
+def test_torn_last_frame_resumes_from_the_one_before(checkpoint_dir):
+    totals = {}
+    asyncio.run(_run_and_kill(checkpoint_dir, 31, totals))
+    wal = _newest_wal(checkpoint_dir)
+    with open(wal, 'r+b') as f:
+        f.truncate(os.path.getsize(wal) - 3)
+
+    resumed, resumed_at = asyncio.run(_resume(checkpoint_dir))
+
+    assert resumed_at == 30
+    assert resumed.total_earnings == totals[30]
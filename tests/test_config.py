@@ -0,0 +1,65 @@
+import copy
+import json
+import os
+
+import pytest
+
+from config_watcher import changed_sections, validate_config
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.example.json")
+
+
+@pytest.fixture
+def config():
+    with open(EXAMPLE) as f:
+        return json.load(f)
+
+
+def test_example_config_is_valid(config):
+    assert validate_config(config) == []
+
+
+def test_minimal_config_is_valid():
+    assert validate_config({"strategies": {}}) == []
+
+
+@pytest.mark.parametrize("edit,message", [
+    (lambda c: c.pop("strategies"), "strategies section is missing"),
+    (lambda c: c.update(targets=[1, 2]), "targets must be an object"),
+    (lambda c: c["strategies"].update(api_monetization="yes"), "strategies.api_monetization must be true or false"),
+    (lambda c: c["targets"].update(monthly=-1), "targets.monthly must be a non-negative number"),
+    (lambda c: c["targets"].update(monthly=True), "targets.monthly must be a non-negative number"),
+    (lambda c: c["automation"].update(auto_reinvest="on"), "automation.auto_reinvest must be a boolean or a number"),
+    (lambda c: c["automation"].update(max_risk_per_trade=1.5), "automation.max_risk_per_trade must be in (0, 1]"),
+    (lambda c: c["risk"].update(var_z=0), "risk.var_z must be a positive number"),
+    (lambda c: c["allocator"].update(agent_slots=False), "allocator.agent_slots must be a positive number"),
+    (lambda c: c["plugins"].update(crypto_arbitrage="process"), "plugins.crypto_arbitrage must be an object"),
+    (lambda c: c["plugins"]["crypto_arbitrage"].update(executor="thread"),
+     "plugins.crypto_arbitrage.executor must be one of"),
+    (lambda c: c["plugins"]["crypto_arbitrage"].update(timeout=0),
+     "plugins.crypto_arbitrage.timeout must be a positive number or null"),
+])
+def test_invalid_values_are_reported(config, edit, message):
+    edit(config)
+    errors = validate_config(config)
+    assert any(e.startswith(message) for e in errors), errors
+
+
+def test_null_plugin_timeout_is_allowed(config):
+    config["plugins"]["crypto_arbitrage"]["timeout"] = None
+    assert validate_config(config) == []
+
+
+def test_non_object_config():
+    assert validate_config([]) == ["config must be a JSON object"]
+
+
+def test_changed_sections(config):
+    new = copy.deepcopy(config)
+    assert changed_sections(config, new) == set()
+
+    new["targets"]["monthly"] = 6000
+    new["allocator"]["step"] = 0.25
+    del new["notifications"]
+    new["extra"] = {}
+    assert changed_sections(config, new) == {"targets", "allocator", "notifications", "extra"}
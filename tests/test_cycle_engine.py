@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import numpy as np
+
+from clock import SimulatedClock
+from cycle_engine import BatchCycleEngine
+from wealth_generator import WealthGenerator
+
+STRATEGIES = ["api_monetization", "crypto_arbitrage", "content_generation", "bounty_hunting", "affiliate_marketing"]
+
+
+def _generator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "strategies": {key: True for key in STRATEGIES},
+        "targets": {"monthly": 3000},
+        "automation": {"auto_reinvest": False, "risk_management": False, "diversification": False},
+        "plugins": {},
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    generator = WealthGenerator(str(tmp_path / "config.json"), clock=SimulatedClock())
+    generator.initialize_streams()
+    return generator
+
+
+async def _run_cycles(generator, cycles):
+    for _ in range(cycles):
+        await generator.run_income_cycle()
+    await generator.strategies.close()
+
+
+def test_batch_matches_looped_cycles_bit_for_bit(tmp_path, monkeypatch):
+    looped = _generator(tmp_path, monkeypatch)
+    asyncio.run(_run_cycles(looped, 50))
+    batched = _generator(tmp_path, monkeypatch)
+    batched.simulate_cycles(50)
+
+    assert batched.total_earnings == looped.total_earnings
+    assert [s.current_earnings for s in batched.income_streams] == \
+           [s.current_earnings for s in looped.income_streams]
+
+
+def test_chunking_does_not_change_results():
+    targets = np.array([300.0, 250.0, 900.0, 120.0])
+    kwargs = dict(targets=targets, active_type=[True, False, True, False], enabled=[True, True, False, True])
+    whole = BatchCycleEngine(**kwargs)
+    chunked = BatchCycleEngine(chunk_cycles=7, **kwargs)
+    history = whole.advance(100, record=True)
+    chunked_history = chunked.advance(100, record=True)
+
+    assert chunked.total_earnings == whole.total_earnings
+    assert np.array_equal(chunked.earnings, whole.earnings)
+    assert np.array_equal(chunked_history, history)
+    assert history.shape == (100, 3)
+    assert whole.earnings[2] == 0.0  # disabled streams do not move
+
+
+def test_simulate_cycles_runs_without_risk_and_allocator(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    generator = WealthGenerator(clock=SimulatedClock())
+    generator.initialize_streams()
+    assert generator.risk.enabled and generator.allocator.enabled
+
+    with caplog.at_level("WARNING"):
+        generator.simulate_cycles(24)
+
+    assert "without the risk engine and the allocator" in caplog.text
+    assert generator.total_earnings > 0
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from event_log import list_segments
+from strategies.metering import PricingTiers, UsageMeter
+
+TIERS = PricingTiers([(100, 0.0), (1000, 0.01), (None, 0.001)])
+# Mid-month timestamps, so every bucket falls in the same billing period
+JUNE = 1781524800.0  # 2026-06-15T12:00:00Z
+
+
+def test_cost_is_graduated():
+    assert TIERS.cost(0) == 0.0
+    assert TIERS.cost(100) == 0.0
+    assert TIERS.cost(600) == pytest.approx(5.0)
+    assert TIERS.cost(2000) == pytest.approx(9.0 + 1.0)
+
+
+@pytest.mark.parametrize("before,added,expected", [
+    (0, 50, 0.0),
+    (50, 100, 0.5),                  # 50 free, 50 at 0.01
+    (900, 200, 1.0 + 0.1),           # 100 at 0.01, 100 at 0.001
+    (0, 2000, 10.0),                 # all three tiers at once
+    (1500, 500, 0.5),
+])
+def test_charge_across_tier_boundaries(before, added, expected):
+    assert TIERS.charge(before, added) == pytest.approx(expected)
+
+
+def test_charge_in_pieces_equals_charge_at_once():
+    pieces = [37, 250, 13, 700, 1000]
+    billed, total = 0, 0.0
+    for units in pieces:
+        total += TIERS.charge(billed, units)
+        billed += units
+    assert total == pytest.approx(TIERS.cost(sum(pieces)))
+
+
+def test_tiers_must_end_unbounded():
+    with pytest.raises(ValueError):
+        PricingTiers([(100, 0.0), (1000, 0.01)])
+    assert PricingTiers.from_config([{"up_to": None, "price": 0.5}]).cost(4) == 2.0
+
+
+def _events(count, key="k", start=JUNE):
+    return [(key, "/v1/data", 1, start + i) for i in range(count)]
+
+
+async def _meter_session(log_path, events, bill=True):
+    meter = UsageMeter(log_path, bucket_seconds=60)
+    meter.record_many(events)
+    await meter.flush()
+    revenue = await meter.bill(TIERS) if bill else None
+    await meter.close()
+    return meter, revenue
+
+
+def test_usage_meter_bills_flushed_usage_only():
+    async def scenario():
+        meter = UsageMeter(None, bucket_seconds=60)
+        meter.record_many(_events(150))
+        assert await meter.bill(TIERS) == 0.0  # nothing flushed yet
+        assert await meter.flush() == 3  # 150 seconds -> three buckets
+        return await meter.bill(TIERS)
+
+    assert asyncio.run(scenario()) == pytest.approx(0.5)
+
+
+def test_replay_keeps_tier_position_across_restarts(tmp_path):
+    log_path = str(tmp_path / "usage.ndjson")
+    _, first = asyncio.run(_meter_session(log_path, _events(150)))
+    meter, second = asyncio.run(_meter_session(log_path, _events(100, start=JUNE + 1000)))
+
+    assert first == pytest.approx(0.5)
+    assert second == pytest.approx(1.0)  # continues from 150 units, not from the free tier
+    assert meter.revenue == pytest.approx(1.5)
+    assert list_segments(log_path)
+
+
+def test_replay_bills_usage_flushed_before_a_restart(tmp_path):
+    log_path = str(tmp_path / "usage.ndjson")
+    asyncio.run(_meter_session(log_path, _events(150), bill=False))
+
+    async def restart():
+        meter = UsageMeter(log_path, bucket_seconds=60)
+        revenue = await meter.bill(TIERS)
+        again = await meter.bill(TIERS)
+        await meter.close()
+        return revenue, again
+
+    revenue, again = asyncio.run(restart())
+    assert revenue == pytest.approx(0.5)
+    assert again == 0.0
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from strategies.quota import QuotaEngine, RateLimiter
+
+
+def test_rate_limiter_allows_the_burst_then_spaces_calls():
+    limiter = RateLimiter(rate=2.0, burst=3)
+    now = time.monotonic()
+
+    assert [limiter.check("k", now=now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("k", now=now) == pytest.approx(0.5)
+    assert limiter.check("k", now=now + 0.5) == 0.0
+    assert limiter.check("k", now=now + 0.5) == pytest.approx(0.5)
+
+
+def test_rate_limiter_keys_are_independent_and_refill():
+    limiter = RateLimiter(rate=1.0, burst=2)
+    now = time.monotonic()
+    limiter.check("a", now=now)
+    limiter.check("a", now=now)
+
+    assert limiter.check("a", now=now) > 0
+    assert limiter.check("b", now=now) == 0.0
+    assert limiter.check("a", now=now + 2.0) == 0.0
+
+
+def test_rate_limiter_denied_calls_take_nothing():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    now = time.monotonic()
+    limiter.check("k", now=now)
+    for _ in range(5):
+        assert limiter.check("k", now=now + 0.5) == pytest.approx(0.5)
+    assert limiter.check("k", now=now + 1.0) == 0.0
+
+
+def test_rate_limiter_forgets_idle_keys_without_changing_decisions():
+    limiter = RateLimiter(rate=1.0, burst=2, idle_seconds=10.0)
+    now = time.monotonic()
+    limiter.check("k", now=now)
+    limiter.check("k", now=now + 20.0)
+    limiter.check("other", now=now + 40.0)
+
+    assert len(limiter) == 1
+    assert limiter.check("k", now=now + 40.0) == 0.0
+
+
+def test_rate_limiter_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+    with pytest.raises(ValueError):
+        RateLimiter(rate=1.0, burst=0)
+
+
+def test_quota_denies_until_the_next_period():
+    engine = QuotaEngine({"free": {"quota": 3}}, period_seconds=100.0)
+    now = time.monotonic()
+    wall = now + engine._wall_offset
+    period_end = (wall // 100.0 + 1) * 100.0
+
+    assert [engine.check("k", now=now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert engine.check("k", now=now) == pytest.approx(period_end - wall)
+    assert engine.check("other", now=now) == 0.0
+    assert engine.check("k", now=now + (period_end - wall)) == 0.0
+    assert (engine.allowed, engine.denied) == (5, 1)
+
+
+def test_quota_is_not_spent_by_rate_limited_calls():
+    engine = QuotaEngine({"free": {"rate": 1.0, "burst": 1, "quota": 2}})
+    now = time.monotonic()
+
+    assert engine.check("k", now=now) == 0.0
+    assert engine.check("k", now=now) > 0  # rate limited, quota untouched
+    assert engine.check("k", now=now + 1.0) == 0.0
+    assert engine.used["free"]["k"] == 2
+
+
+def test_unknown_plans_fall_back_to_the_default():
+    engine = QuotaEngine({"free": {"quota": 1}, "pro": {"quota": 100}}, default_plan="free")
+    now = time.monotonic()
+
+    assert engine.check("k", plan="enterprise", now=now) == 0.0
+    assert engine.check("k", plan="enterprise", now=now) > 0
+    assert engine.check("k", plan="pro", now=now) == 0.0
+
+
+def test_quota_engine_from_config():
+    engine = QuotaEngine.from_config({"quotas": {"default_plan": "pro", "plans": {"pro": {"rate": 5.0}}}})
+    assert engine.default_plan == "pro"
+    assert engine.stats()["rate_keys"] == {"pro": 0}
+    with pytest.raises(ValueError):
+        QuotaEngine({"pro": {}}, default_plan="free")
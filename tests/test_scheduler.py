@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from metrics import MetricsRegistry
+from scheduler import TaskScheduler
+
+
+class Agent:
+    def __init__(self, name, delay=0.0, fail_on=None):
+        self.name = name
+        self.delay = delay
+        self.fail_on = fail_on
+        self.done = []
+
+    async def execute_task(self, task):
+        await asyncio.sleep(self.delay)
+        if task["id"] == self.fail_on:
+            raise RuntimeError(f"task {task['id']} failed")
+        self.done.append(task["id"])
+        return {"agent": self.name, "id": task["id"]}
+
+
+def test_every_task_runs_once():
+    agents = [Agent("a"), Agent("b"), Agent("c")]
+    scheduler = TaskScheduler(agents, max_per_agent=2, metrics=MetricsRegistry())
+    results = []
+
+    completed = asyncio.run(scheduler.run(({"id": i} for i in range(500)), on_result=results.append))
+
+    assert completed == 500
+    assert sorted(r["id"] for r in results) == list(range(500))
+    assert sum(len(a.done) for a in agents) == 500
+    stats = scheduler.get_stats()
+    assert [s["completed"] for s in stats["agents"]] == [len(a.done) for a in agents]
+
+
+def test_producer_blocks_once_the_queue_is_full():
+    pulled = []
+
+    def tasks():
+        for i in range(200):
+            pulled.append(i)
+            yield {"id": i}
+
+    agent = Agent("slow", delay=0.001)
+    scheduler = TaskScheduler([agent], max_per_agent=2, queue_size=5, metrics=MetricsRegistry())
+
+    async def watch():
+        run = asyncio.create_task(scheduler.run(tasks()))
+        await asyncio.sleep(0.01)
+        ahead = len(pulled) - len(agent.done)
+        await run
+        return ahead
+
+    ahead = asyncio.run(watch())
+    # Queued plus the ones workers hold plus the one the producer is waiting to put
+    assert ahead <= 5 + 2 + 1
+    assert scheduler.peak_queue_depth <= 5
+    assert len(agent.done) == 200
+
+
+def test_first_error_is_raised_after_the_rest_finish():
+    agents = [Agent("a", fail_on=7), Agent("b", fail_on=7)]
+    scheduler = TaskScheduler(agents, max_per_agent=1, metrics=MetricsRegistry())
+
+    with pytest.raises(RuntimeError, match="task 7 failed"):
+        asyncio.run(scheduler.run({"id": i} for i in range(20)))
+
+    stats = scheduler.get_stats()
+    assert sum(s["failed"] for s in stats["agents"]) == 1
+    assert sum(s["completed"] for s in stats["agents"]) == 19
+
+
+def test_failing_callback_does_not_hang_the_run():
+    scheduler = TaskScheduler([Agent("a")], max_per_agent=2, metrics=MetricsRegistry())
+
+    def on_result(result):
+        raise ValueError("bad callback")
+
+    with pytest.raises(ValueError, match="bad callback"):
+        asyncio.run(asyncio.wait_for(scheduler.run(({"id": i} for i in range(10)), on_result), 5))
+
+
+def test_no_agents():
+    with pytest.raises(RuntimeError):
+        asyncio.run(TaskScheduler([], metrics=MetricsRegistry()).run([{"id": 1}]))
+    with pytest.raises(ValueError):
+        TaskScheduler([Agent("a")], max_per_agent=0)
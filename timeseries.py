@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Embedded columnar time-series store for stream earnings
+Memory-mapped append-only chunks of (timestamp, stream_id, amount) with
+per-chunk minute/hour/day rollups for fast range aggregates
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+COLUMNS = (("ts", np.float64), ("sid", np.uint32), ("amount", np.float64))
+ROLLUP_FIELDS = ("bucket", "sid", "sum", "count", "min", "max")
+
+
+def _rollup(ts: np.ndarray, sid: np.ndarray, amount: np.ndarray, seconds: int) -> Dict[str, np.ndarray]:
+    """Group rows by (bucket, stream) and reduce to sum/count/min/max"""
+    if not len(ts):
+        return {f: np.empty(0) for f in ROLLUP_FIELDS}
+    bucket = np.floor(ts / seconds).astype(np.int64)
+    key = bucket * (1 << 32) + sid.astype(np.int64)
+    order = np.argsort(key, kind="stable")
+    key, amount = key[order], amount[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return {
+        "bucket": key[starts] >> 32,
+        "sid": (key[starts] & 0xFFFFFFFF).astype(np.uint32),
+        "sum": np.add.reduceat(amount, starts),
+        "count": np.diff(np.r_[starts, len(key)]),
+        "min": np.minimum.reduceat(amount, starts),
+        "max": np.maximum.reduceat(amount, starts),
+    }
+
+
+def _merge_rollups(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Combine two rollups of the same resolution, keeping (bucket, stream) order"""
+    key = np.concatenate([a["bucket"], b["bucket"]]).astype(np.int64) * (1 << 32) + \
+        np.concatenate([a["sid"], b["sid"]]).astype(np.int64)
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    merged = {"bucket": key[starts] >> 32, "sid": (key[starts] & 0xFFFFFFFF).astype(np.uint32)}
+    for f, reduce in (("sum", np.add), ("count", np.add), ("min", np.minimum), ("max", np.maximum)):
+        merged[f] = reduce.reduceat(np.concatenate([a[f], b[f]])[order], starts)
+    return merged
+
+
+class Chunk:
+    """Fixed-capacity column files for one slice of the series
+
+    Rollups of the open chunk are kept up to date as rows arrive: the new
+    rows are rolled up on their own and merged into the buckets they
+    touch, in growable buffers, so a query never re-reads raw points.
+    """
+
+    def __init__(self, directory: str, index: int, capacity: int, rows: int = 0,
+                 sealed: bool = False, min_ts: Optional[float] = None, max_ts: Optional[float] = None):
+        self.directory = directory
+        self.index = index
+        self.capacity = capacity
+        self.rows = rows
+        self.sealed = sealed
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self._columns: Optional[Dict[str, np.memmap]] = None
+        self._rollups: Dict[str, Dict[str, np.ndarray]] = {}
+        self._open_rollups: Dict[str, Tuple[Dict[str, np.ndarray], int]] = {}  # resolution -> (buffers, groups)
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"chunk-{self.index:06d}.{suffix}")
+
+    @property
+    def columns(self) -> Dict[str, np.memmap]:
+        if self._columns is None:
+            self._columns = {}
+            for name, dtype in COLUMNS:
+                path = self._path(name)
+                mode = "r" if self.sealed else ("r+" if os.path.exists(path) else "w+")
+                self._columns[name] = np.memmap(path, dtype=dtype, mode=mode, shape=(self.capacity,))
+        return self._columns
+
+    def append(self, ts: np.ndarray, sid: np.ndarray, amount: np.ndarray) -> int:
+        """Write as many rows as fit; returns how many were taken"""
+        n = min(len(ts), self.capacity - self.rows)
+        if n <= 0:
+            return 0
+        cols = self.columns
+        end = self.rows + n
+        cols["ts"][self.rows:end] = ts[:n]
+        cols["sid"][self.rows:end] = sid[:n]
+        cols["amount"][self.rows:end] = amount[:n]
+        lo, hi = float(ts[:n].min()), float(ts[:n].max())
+        self.min_ts = lo if self.min_ts is None else min(self.min_ts, lo)
+        self.max_ts = hi if self.max_ts is None else max(self.max_ts, hi)
+        self.rows = end
+        self._rollups.clear()
+        for resolution in list(self._open_rollups):
+            self._extend_rollup(resolution, _rollup(ts[:n], sid[:n], amount[:n], RESOLUTIONS[resolution]))
+        return n
+
+    def _extend_rollup(self, resolution: str, new: Dict[str, np.ndarray]):
+        """Merge a rollup of freshly appended rows into the open chunk's rollup"""
+        if not len(new["bucket"]):
+            return
+        buffers, groups = self._open_rollups[resolution]
+        # Rows arrive roughly in time order, so only the trailing buckets are touched
+        start = int(np.searchsorted(buffers["bucket"][:groups], new["bucket"][0]))
+        tail = _merge_rollups({f: buffers[f][start:groups] for f in ROLLUP_FIELDS}, new)
+        end = start + len(tail["bucket"])
+        if end > len(buffers["bucket"]):
+            size = max(end, 2 * len(buffers["bucket"]))
+            for f in ROLLUP_FIELDS:
+                grown = np.empty(size, dtype=buffers[f].dtype)
+                grown[:groups] = buffers[f][:groups]
+                buffers[f] = grown
+        for f in ROLLUP_FIELDS:
+            buffers[f][start:end] = tail[f]
+        self._open_rollups[resolution] = (buffers, end)
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        cols = self.columns
+        return cols["ts"][:self.rows], cols["sid"][:self.rows], cols["amount"][:self.rows]
+
+    def rollup(self, resolution: str) -> Dict[str, np.ndarray]:
+        cached = self._rollups.get(resolution)
+        if cached is not None:
+            return cached
+        if not self.sealed:
+            if resolution not in self._open_rollups:
+                built = _rollup(*self.view(), RESOLUTIONS[resolution])
+                dtypes = {"bucket": np.int64, "sid": np.uint32, "count": np.int64}
+                self._open_rollups[resolution] = (
+                    {f: np.asarray(built[f], dtype=dtypes.get(f, np.float64)) for f in ROLLUP_FIELDS},
+                    len(built["bucket"]))
+            buffers, groups = self._open_rollups[resolution]
+            cached = self._rollups[resolution] = {f: buffers[f][:groups] for f in ROLLUP_FIELDS}
+            return cached
+        path = self._path(f"rollup-{resolution}.npz")
+        if os.path.exists(path):
+            with np.load(path) as data:
+                cached = {f: data[f] for f in ROLLUP_FIELDS}
+        else:
+            cached = _rollup(*self.view(), RESOLUTIONS[resolution])
+            np.savez(path, **cached)
+        self._rollups[resolution] = cached
+        return cached
+
+    def seal(self):
+        """Flush columns, precompute rollups and reopen read-only"""
+        for col in self.columns.values():
+            col.flush()
+        self._columns = None
+        self.sealed = True
+        self._rollups.clear()
+        self._open_rollups.clear()
+        for resolution in RESOLUTIONS:
+            self.rollup(resolution)
+
+    def flush(self):
+        if self._columns is not None and not self.sealed:
+            for col in self._columns.values():
+                col.flush()
+
+    def meta(self) -> Dict:
+        return {"index": self.index, "rows": self.rows, "sealed": self.sealed,
+                "min_ts": self.min_ts, "max_ts": self.max_ts}
+
+
+class TimeSeriesStore:
+    """Append-only (timestamp, stream_id, amount) store with rollup queries
+
+    Rows go into memory-mapped column files of ``chunk_rows`` rows. Full
+    chunks are sealed with minute/hour/day rollups saved next to them, so
+    aggregates read rollups instead of raw rows; the open chunk's rollups
+    are built on first use and then extended as rows are appended.
+    Timestamps are epoch seconds.
+    """
+
+    def __init__(self, directory: str, chunk_rows: int = 1 << 20):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.stream_ids: Dict[str, int] = {}
+        self.chunks: List[Chunk] = []
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(self._meta_path):
+            self._load_meta()
+        self._pending: List[Tuple[float, int, float]] = []
+
+    def _load_meta(self):
+        with open(self._meta_path, 'r') as f:
+            meta = json.load(f)
+        self.chunk_rows = meta["chunk_rows"]
+        self.stream_ids = meta["stream_ids"]
+        self.chunks = [Chunk(self.directory, c["index"], self.chunk_rows, c["rows"], c["sealed"],
+                             c["min_ts"], c["max_ts"]) for c in meta["chunks"]]
+
+    def _save_meta(self):
+        meta = {"chunk_rows": self.chunk_rows, "stream_ids": self.stream_ids,
+                "chunks": [c.meta() for c in self.chunks]}
+        tmp = f"{self._meta_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def stream_id(self, name: str) -> int:
+        sid = self.stream_ids.get(name)
+        if sid is None:
+            sid = self.stream_ids[name] = len(self.stream_ids)
+        return sid
+
+    def __len__(self):
+        return sum(c.rows for c in self.chunks) + len(self._pending)
+
+    def append(self, ts: float, stream: str, amount: float):
+        """Buffer one point; buffered points are written in batches"""
+        self._pending.append((ts, self.stream_id(stream), amount))
+        if len(self._pending) >= 4096:
+            self._write_pending()
+
+    def append_many(self, ts, sid, amount):
+        """Vectorized append of parallel arrays (``sid`` from ``stream_id``)"""
+        self._write_pending()
+        ts = np.asarray(ts, dtype=np.float64)
+        sid = np.asarray(sid, dtype=np.uint32)
+        amount = np.asarray(amount, dtype=np.float64)
+        while len(ts):
+            chunk = self.chunks[-1] if self.chunks and not self.chunks[-1].sealed else None
+            if chunk is None:
+                chunk = Chunk(self.directory, len(self.chunks) + 1, self.chunk_rows)
+                self.chunks.append(chunk)
+            n = chunk.append(ts, sid, amount)
+            if chunk.rows >= chunk.capacity:
+                chunk.seal()
+                self._save_meta()
+            ts, sid, amount = ts[n:], sid[n:], amount[n:]
+
+    def _write_pending(self):
+        if self._pending:
+            ts, sid, amount = zip(*self._pending)
+            self._pending = []
+            self.append_many(ts, sid, amount)
+
+    def flush(self):
+        self._write_pending()
+        for chunk in self.chunks:
+            chunk.flush()
+        self._save_meta()
+
+    def close(self):
+        self.flush()
+
+    def clear(self):
+        """Drop every point, deleting only the chunk and meta files this store writes"""
+        self._pending = []
+        self.chunks = []
+        self.stream_ids = {}
+        pattern = re.compile(r"(chunk-\d{6}\.\w+|meta\.json(\.tmp)?)$")
+        for name in os.listdir(self.directory):
+            if pattern.match(name):
+                os.remove(os.path.join(self.directory, name))
+
+    def _overlapping(self, start: Optional[float], end: Optional[float]):
+        for chunk in self.chunks:
+            if not chunk.rows:
+                continue
+            if start is not None and chunk.max_ts < start:
+                continue
+            if end is not None and chunk.min_ts >= end:
+                continue
+            yield chunk
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              stream: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Raw points with ``start <= ts < end`` (optionally for one stream)"""
+        self._write_pending()
+        sid = self.stream_ids.get(stream) if stream is not None else None
+        parts = []
+        for chunk in self._overlapping(start, end):
+            ts, sids, amount = chunk.view()
+            mask = np.ones(len(ts), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts < end
+            if sid is not None:
+                mask &= sids == sid
+            parts.append((ts[mask], sids[mask], amount[mask]))
+        if not parts:
+            return {"ts": np.empty(0), "sid": np.empty(0, dtype=np.uint32), "amount": np.empty(0)}
+        return {name: np.concatenate([p[i] for p in parts]) for i, (name, _) in enumerate(COLUMNS)}
+
+    def aggregate(self, resolution: str = "day", start: Optional[float] = None,
+                  end: Optional[float] = None, stream: Optional[str] = None,
+                  by_stream: bool = False) -> Dict[str, np.ndarray]:
+        """Per-bucket sum/count/min/max from rollups
+
+        Covers whole buckets whose start lies in ``[floor(start), end)``.
+        Returns parallel arrays keyed by ``bucket_start`` (epoch seconds),
+        plus ``stream`` names when ``by_stream`` is set.
+        """
+        self._write_pending()
+        seconds = RESOLUTIONS[resolution]
+        lo = int(np.floor(start / seconds)) if start is not None else None
+        hi = int(np.ceil(end / seconds)) if end is not None else None
+        sid = self.stream_ids.get(stream) if stream is not None else None
+        if stream is not None and sid is None:
+            return self._empty_aggregate(by_stream)
+
+        parts = []
+        for chunk in self._overlapping(lo * seconds if lo is not None else None,
+                                       hi * seconds if hi is not None else None):
+            r = chunk.rollup(resolution)
+            # Rollups are sorted by bucket, so the range is a slice
+            first = int(np.searchsorted(r["bucket"], lo)) if lo is not None else 0
+            last = int(np.searchsorted(r["bucket"], hi)) if hi is not None else len(r["bucket"])
+            r = {f: r[f][first:last] for f in ROLLUP_FIELDS}
+            if sid is not None:
+                mask = r["sid"] == sid
+                r = {f: r[f][mask] for f in ROLLUP_FIELDS}
+            parts.append(r)
+        if not parts:
+            return self._empty_aggregate(by_stream)
+
+        merged = {f: np.concatenate([p[f] for p in parts]) for f in ROLLUP_FIELDS}
+        key = merged["bucket"] * (1 << 32) + (merged["sid"].astype(np.int64) if by_stream else 0)
+        keys, inverse = np.unique(key, return_inverse=True)
+        sums = np.zeros(len(keys))
+        counts = np.zeros(len(keys), dtype=np.int64)
+        mins = np.full(len(keys), np.inf)
+        maxs = np.full(len(keys), -np.inf)
+        np.add.at(sums, inverse, merged["sum"])
+        np.add.at(counts, inverse, merged["count"])
+        np.minimum.at(mins, inverse, merged["min"])
+        np.maximum.at(maxs, inverse, merged["max"])
+
+        result = {"bucket_start": (keys >> 32) * seconds, "sum": sums, "count": counts, "min": mins, "max": maxs}
+        if by_stream:
+            names = {v: k for k, v in self.stream_ids.items()}
+            result["stream"] = np.array([names[int(s)] for s in keys & 0xFFFFFFFF], dtype=object)
+        return result
+
+    @staticmethod
+    def _empty_aggregate(by_stream: bool) -> Dict[str, np.ndarray]:
+        result = {"bucket_start": np.empty(0, dtype=np.int64), "sum": np.empty(0),
+                  "count": np.empty(0, dtype=np.int64), "min": np.empty(0), "max": np.empty(0)}
+        if by_stream:
+            result["stream"] = np.empty(0, dtype=object)
+        return result
+
+    def totals(self, start: Optional[float] = None, end: Optional[float] = None,
+               resolution: str = "day") -> Dict[str, float]:
+        """Sum per stream over whole ``resolution`` buckets in the range"""
+        agg = self.aggregate(resolution, start, end, by_stream=True)
+        totals: Dict[str, float] = {}
+        for name, amount in zip(agg["stream"], agg["sum"]):
+            totals[name] = totals.get(name, 0.0) + float(amount)
+        return totals
+
+
+def _benchmark(points: int, streams: int, directory: str):
+    import shutil
+    import time
+
+    shutil.rmtree(directory, ignore_errors=True)
+    store = TimeSeriesStore(directory)
+    for i in range(streams):
+        store.stream_id(f"stream-{i}")
+    rng = np.random.default_rng(0)
+    batch = 1 << 22
+    t0 = 1.7e9
+    span = 365 * 86400
+    started = time.perf_counter()
+    written = 0
+    while written < points:
+        n = min(batch, points - written)
+        ts = t0 + (written + np.arange(n)) * (span / points)
+        store.append_many(ts, rng.integers(0, streams, n), rng.uniform(0, 10, n))
+        written += n
+    store.flush()
+    print(f"appended {points:,} points in {time.perf_counter() - started:.1f}s")
+
+    reopened = TimeSeriesStore(directory)
+    for _ in range(2):
+        started = time.perf_counter()
+        daily = reopened.aggregate("day", by_stream=True)
+        elapsed = (time.perf_counter() - started) * 1000
+    print(f"daily aggregate over {len(reopened):,} points: {len(daily['sum'])} rows in {elapsed:.1f}ms")
+    started = time.perf_counter()
+    week = reopened.aggregate("hour", t0 + 100 * 86400, t0 + 107 * 86400, stream="stream-0")
+    print(f"one stream, one week hourly: {len(week['sum'])} rows in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time-series store benchmark")
+    parser.add_argument('--points', type=int, default=10_000_000)
+    parser.add_argument('--streams', type=int, default=5)
+    parser.add_argument('--dir', default='data/timeseries-bench')
+    args = parser.parse_args()
+    _benchmark(args.points, args.streams, args.dir)
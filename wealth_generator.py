@@ -11,8 +11,18 @@ import json
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
-import asyncio
+
+from clock import WallClock, SimulatedClock
+from event_log import EventLogReader, EventLogWriter, ReportAccumulator
+from status_feed import DEFAULT_SOCKET, StatusPublisher
+from metrics import METRICS, METRICS_PORT, MetricsRegistry, MetricsServer
+from settings import load_config
+from state_registry import STREAMS, RegistryView, snapshot
+from aggregates import StreamAggregates
+from risk import RiskEngine
+from allocator import UNALLOCATED, Allocator
+from strategy_registry import StrategyRegistry
+from config_watcher import ConfigWatcher, changed_sections, validate_config
 
 # Configure logging
 logging.basicConfig(
@@ -22,25 +32,71 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class IncomeStream:
-    """Represents a single income stream"""
-    name: str
-    type: str
-    status: str
-    monthly_target: float
-    current_earnings: float
-    last_updated: str
+STREAM_FIELDS = {field: field for field in STREAMS.kinds}
+
+# Streams the generator can run, keyed in config by _stream_key(name)
+STREAM_CATALOG = [
+    {"name": "API Monetization", "type": "passive", "target": 1000},
+    {"name": "Crypto Arbitrage", "type": "active", "target": 800},
+    {"name": "Content Generation", "type": "passive", "target": 600},
+    {"name": "Bounty Hunting", "type": "active", "target": 400},
+    {"name": "Affiliate Marketing", "type": "passive", "target": 200}
+]
+# targets.monthly at which streams get the catalog targets; others scale them
+CATALOG_MONTHLY = sum(spec["target"] for spec in STREAM_CATALOG)
+
+
+class IncomeStream(RegistryView):
+    """Represents a single income stream
+    
+    A view on one row of the STREAMS registry: the attributes read and
+    write typed columns, so a million streams cost a few dozen bytes each.
+    """
+    __slots__ = ()
+    registry = STREAMS
     
+    def __init__(self, name: str, type: str, status: str, monthly_target: float,
+                 current_earnings: float, last_updated: Optional[str], agents: int = UNALLOCATED):
+        self._register(name, type, status, monthly_target, current_earnings, last_updated, agents)
+
 
 class WealthGenerator:
     """Main wealth generation orchestrator"""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, clock=None,
+                 event_log: Optional[EventLogWriter] = None, history=None, publisher=None,
+                 metrics: MetricsRegistry = METRICS, exporter: Optional[MetricsServer] = None,
+                 strategies: Optional[StrategyRegistry] = None, checkpoint_dir: Optional[str] = None,
+                 config_watcher=None):
         self.config = self._load_config(config_path)
-        self.income_streams: List[IncomeStream] = []
+        errors = validate_config(self.config)
+        if errors:
+            raise ValueError(f"Invalid config {config_path}: " + "; ".join(errors))
+        self.clock = clock or WallClock()
+        self.event_log = event_log
+        self.history = history  # Optional timeseries.TimeSeriesStore
+        self.publisher = publisher  # Optional status_feed.StatusPublisher
+        self.metrics = metrics
+        self.exporter = exporter  # Optional metrics.MetricsServer, started with run()
+        self.config_watcher = config_watcher  # Optional config_watcher.ConfigWatcher, applied between cycles
+        # Plugins under strategies/, imported the first time a stream needs one
+        self.strategies = strategies or StrategyRegistry(self.config, metrics)
+        self._cycle_latency = metrics.histogram("income_cycle_seconds")
+        self._log_reader = EventLogReader(event_log.base_path) if event_log else None
+        self._log_summary = ReportAccumulator()
+        self.aggregates = StreamAggregates()
+        self.risk = RiskEngine(self.aggregates, self.config)
+        self.allocator = Allocator(self.aggregates, self.config)
+        self._stream_seconds: Dict[int, float] = {}  # row -> wall seconds of its run this cycle
+        self._streams_cache = (None, None, None)  # (aggregates version, streams, stream p99s)
+        self.income_streams = []
         self.total_earnings = 0.0
-        self.start_time = datetime.now()
+        self.cycle_count = 0
+        self.start_time = self.clock.now()
+        self.checkpoints = None
+        if checkpoint_dir:
+            from checkpoint import StreamCheckpointer
+            self.checkpoints = StreamCheckpointer(self, checkpoint_dir)
         
     def _load_config(self, config_path: Optional[str]) -> Dict:
         """Load configuration from file or use defaults"""
@@ -61,79 +117,215 @@ class WealthGenerator:
                 "auto_reinvest": True,
                 "risk_management": True,
                 "diversification": True
-            }
+            },
+            # Streams bound to strategies/<name>.py: {name: {"executor": ..., "timeout": ...}}
+            "plugins": {}
         }
-        
-        if config_path and os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        return default_config
+        return load_config(config_path, default_config)
+    
+    @property
+    def income_streams(self) -> List[IncomeStream]:
+        """Streams being run; mutate through add_stream/remove_stream or reassign"""
+        return self._income_streams
+    
+    @income_streams.setter
+    def income_streams(self, streams: List[IncomeStream]):
+        self._set_streams(streams)
+    
+    def _set_streams(self, streams: List[IncomeStream], ids=None):
+        self._income_streams = list(streams)
+        self.aggregates.reset(self._income_streams, ids)
+    
+    def add_stream(self, stream: IncomeStream):
+        """Start running ``stream`` and count it in the status totals"""
+        self._income_streams.append(stream)
+        self.aggregates.add(stream)
+    
+    def remove_stream(self, stream: IncomeStream):
+        """Stop running ``stream`` (this object, not one with equal fields)"""
+        self._income_streams[:] = [s for s in self._income_streams if s._id != stream._id]
+        self.aggregates.remove(stream)
     
     def initialize_streams(self):
         """Initialize all income streams"""
         logger.info("Initializing income streams...")
         
-        streams_config = [
-            {"name": "API Monetization", "type": "passive", "target": 1000},
-            {"name": "Crypto Arbitrage", "type": "active", "target": 800},
-            {"name": "Content Generation", "type": "passive", "target": 600},
-            {"name": "Bounty Hunting", "type": "active", "target": 400},
-            {"name": "Affiliate Marketing", "type": "passive", "target": 200}
-        ]
-        
-        for stream_config in streams_config:
-            if self.config["strategies"].get(stream_config["name"].lower().replace(" ", "_"), True):
-                stream = IncomeStream(
-                    name=stream_config["name"],
-                    type=stream_config["type"],
-                    status="active",
-                    monthly_target=stream_config["target"],
-                    current_earnings=0.0,
-                    last_updated=datetime.now().isoformat()
-                )
-                self.income_streams.append(stream)
+        for spec in STREAM_CATALOG:
+            if self.config["strategies"].get(self._stream_key(spec["name"]), True):
+                stream = self._new_stream(spec)
+                self.add_stream(stream)
                 logger.info(f"Initialized: {stream.name}")
     
+    def _new_stream(self, spec: Dict) -> IncomeStream:
+        return IncomeStream(
+            name=spec["name"],
+            type=spec["type"],
+            status="active",
+            monthly_target=spec["target"] * self._target_scale(self.config),
+            current_earnings=0.0,
+            last_updated=self.clock.now().isoformat()
+        )
+    
+    @staticmethod
+    def _target_scale(config: Dict) -> float:
+        return config.get("targets", {}).get("monthly", CATALOG_MONTHLY) / CATALOG_MONTHLY
+    
+    async def apply_config(self, config: Dict) -> Dict:
+        """Switch to an already validated ``config`` between cycles
+        
+        Only what changed is touched: streams toggled in ``strategies``
+        are added or removed, a new ``targets.monthly`` rescales every
+        stream's target in place, and plugin runners are rebuilt only if
+        their settings changed. Other streams keep their state.
+        """
+        old = self.config
+        changed = changed_sections(old, config)
+        applied = {"sections": sorted(changed), "added": [], "removed": [], "rebound": []}
+        if not changed:
+            return applied
+        self.config = config
+        self.risk.configure(config)
+        self.allocator.configure(config)
+        
+        if "targets" in changed:
+            old_scale, new_scale = self._target_scale(old), self._target_scale(config)
+            if new_scale != old_scale and old_scale > 0:
+                for stream in self.income_streams:
+                    stream.monthly_target *= new_scale / old_scale
+        
+        if "strategies" in changed:
+            running = {self._stream_key(s.name): s for s in self.income_streams}
+            for spec in STREAM_CATALOG:
+                key = self._stream_key(spec["name"])
+                enabled = config["strategies"].get(key, True)
+                if enabled and key not in running:
+                    self.add_stream(self._new_stream(spec))
+                    applied["added"].append(spec["name"])
+                elif not enabled and key in running:
+                    self.remove_stream(running[key])
+                    applied["removed"].append(spec["name"])
+        
+        applied["rebound"] = await self.strategies.reconfigure(config)
+        self.metrics.counter("config_reloads_total").inc()
+        logger.info(f"Config applied: changed {', '.join(applied['sections'])}; "
+                    f"added {applied['added'] or 'none'}, removed {applied['removed'] or 'none'}, "
+                    f"rebuilt plugins {applied['rebound'] or 'none'}")
+        return applied
+    
     async def run_income_cycle(self):
         """Execute one cycle of income generation"""
+        import asyncio
+
         logger.info("Starting income generation cycle...")
         
-        tasks = []
-        for stream in self.income_streams:
-            if stream.status == "active":
-                tasks.append(self._process_stream(stream))
+        self.risk.resume_due(self.cycle_count)
+        active = [stream for stream in self.income_streams if stream.status == "active"]
+        sizes = self.risk.size(active)
         
-        # Run all streams concurrently
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Run all streams concurrently; plugin strategies are bounded by their own timeouts
+        self._stream_seconds.clear()  # only this cycle's streams, so departed rows never linger
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._process_stream(s, size) for s, size in zip(active, sizes)),
+                                       return_exceptions=True)
+        self._cycle_latency.record(time.perf_counter() - started)
+        self.risk.observe(active, results, self.cycle_count)
+        self.allocator.observe(active, results, sizes, [self._stream_seconds.get(s._id, 0.0) for s in active])
+        if self.allocator.due(self.cycle_count):
+            self.rebalance()
         
         # Update total earnings
-        for i, result in enumerate(results):
+        for stream, result in zip(active, results):
             if isinstance(result, Exception):
-                logger.error(f"Stream {self.income_streams[i].name} failed: {result}")
+                logger.error(f"Stream {stream.name} failed: {result!r}")
             else:
                 self.total_earnings += result
         
         logger.info(f"Cycle complete. Total earnings: ${self.total_earnings:.2f}")
     
-    async def _process_stream(self, stream: IncomeStream) -> float:
-        """Process a single income stream"""
+    def simulate_cycles(self, cycles: int, record: bool = False):
+        """Advance all active streams by ``cycles`` cycles in one vectorized batch
+
+        Produces the same earnings as calling ``run_income_cycle``
+        ``cycles`` times with the risk engine and the allocator off,
+        without the per-stream sleeps. Streams bound to strategy plugins
+        are advanced at their simulated rates. Returns the per-cycle
+        earnings history of the active streams when ``record`` is set.
+
+        The batch cannot follow the per-cycle resizing and retargeting of
+        ``automation.risk_management`` and ``automation.auto_reinvest``, so
+        it runs without them (with a warning) when they are on: streams run
+        at full size on their current targets, and streams paused by the
+        risk engine stay paused through the batch.
+        """
+        if self.risk.enabled or self.allocator.enabled:
+            logger.warning(f"Simulating {cycles} cycles without the risk engine and the allocator "
+                           f"(they only apply cycle by cycle in run_income_cycle)")
+        from cycle_engine import BatchCycleEngine
+
+        engine = BatchCycleEngine.from_streams(self.income_streams, total_earnings=self.total_earnings)
+        history = engine.advance(cycles, record=record)
+        engine.write_back(self.income_streams, timestamp=self.clock.now().isoformat())
+        self.total_earnings = engine.total_earnings
+        self._columns_written()
+
+        logger.info(f"Simulated {cycles} cycles. Total earnings: ${self.total_earnings:.2f}")
+        return history
+
+    def rebalance(self) -> Optional[Dict]:
+        """Reinvest and re-split targets and agents across the active streams now"""
+        active = [stream for stream in self.income_streams if stream.status == "active"]
+        summary = self.allocator.rebalance(active, self.cycle_count)
+        if summary:
+            self._columns_written()
+        return summary
+    
+    def _columns_written(self):
+        # Bulk column writes go past the aggregate and checkpoint watchers
+        self.aggregates.rebuild()
+        if self.checkpoints:
+            self.checkpoints.mark_all_dirty()
+    
+    async def _process_stream(self, stream: IncomeStream, size: float = 1.0) -> float:
+        """Process a single income stream at ``size`` (the risk engine's position multiplier)"""
         logger.info(f"Processing {stream.name}...")
+        started = time.perf_counter()
         
-        # Simulate income generation (replace with actual logic)
-        await asyncio.sleep(0.5)  # Simulate async work
-        
-        # Generate income based on stream type
-        if stream.type == "passive":
-            earnings = self._passive_income_strategy(stream)
+        runner = self.strategies.runner(self._stream_key(stream.name))
+        if runner is not None:
+            runner.risk_scale = size
+            runner.agents = None if stream.agents == UNALLOCATED else stream.agents
+            earnings = await runner.generate_income()
         else:
-            earnings = self._active_income_strategy(stream)
+            # Simulate income generation (replace with actual logic)
+            await self.clock.sleep(0.5)  # Simulate async work
+            
+            # Generate income based on stream type
+            if stream.type == "passive":
+                earnings = self._passive_income_strategy(stream) * size
+            else:
+                earnings = self._active_income_strategy(stream) * size
         
         # Update stream
         stream.current_earnings += earnings
-        stream.last_updated = datetime.now().isoformat()
+        stream.last_updated = self.clock.now().isoformat()
+        if self.event_log:
+            self.event_log.append({"type": "earning", "source": stream.name,
+                                   "amount": earnings, "ts": stream.last_updated})
+        if self.history is not None:
+            self.history.append(self.clock.now().timestamp(), stream.name, earnings)
         
+        # Wall time, so simulated-clock sleeps do not count
+        elapsed = time.perf_counter() - started
+        self._stream_seconds[stream._id] = elapsed
+        self.metrics.histogram("stream_process_seconds", stream=stream.name).record(elapsed)
+        self.metrics.counter("stream_earnings_total", stream=stream.name).inc(earnings)
         return earnings
     
+    @staticmethod
+    def _stream_key(name: str) -> str:
+        """Config and plugin key of a stream name ("API Monetization" -> "api_monetization")"""
+        return name.lower().replace(" ", "_")
+    
     def _passive_income_strategy(self, stream: IncomeStream) -> float:
         """Execute passive income strategy"""
         # Simulated passive earnings (replace with real implementation)
@@ -146,26 +338,69 @@ class WealthGenerator:
         base_rate = stream.monthly_target / 30 / 24  # Hourly rate
         return base_rate * 1.5  # Active strategies earn 50% more
     
-    def get_status(self) -> Dict:
-        """Get current system status"""
-        runtime = datetime.now() - self.start_time
+    def get_status(self, fresh: bool = False) -> Dict:
+        """Get current system status
+        
+        Counts and projections come from the running aggregates. The
+        per-stream part is rebuilt only when a stream changed since the
+        last call (or with ``fresh``); cached stream entries are shared
+        between calls and must be treated as read-only.
+        """
+        runtime = self.clock.now() - self.start_time
+        version, streams, stream_p99 = self._streams_cache
+        if fresh or version != self.aggregates.version:
+            streams = snapshot(self.income_streams, STREAM_FIELDS)
+            # Only streams that have run have a series (and the registry caps how many)
+            names = {s["name"] for s in streams}
+            stream_p99 = {
+                name: histogram.percentile(99) / 1000
+                for labels, histogram in self.metrics.labelled("stream_process_seconds").items()
+                for key, name in labels if key == "stream" and name in names
+            }
+            self._streams_cache = (self.aggregates.version, streams, stream_p99)
         
-        return {
+        status = {
             "total_earnings": self.total_earnings,
             "runtime_hours": runtime.total_seconds() / 3600,
-            "active_streams": len([s for s in self.income_streams if s.status == "active"]),
+            "active_streams": self.aggregates.active_count,
             "monthly_projection": self._calculate_monthly_projection(),
-            "streams": [asdict(s) for s in self.income_streams],
-            "efficiency": self._calculate_efficiency()
+            "by_type": self.aggregates.by_type(),
+            "risk": self.risk.summary(),
+            "allocator": self.allocator.summary(),
+            "streams": streams,
+            "efficiency": self._calculate_efficiency(),
+            "latency_ms": {
+                "cycle_p50": self._cycle_latency.percentile(50) / 1000,
+                "cycle_p99": self._cycle_latency.percentile(99) / 1000,
+                "streams": stream_p99,
+            }
         }
+        if self.history is not None:
+            # Served from hourly rollups, which the open chunk extends on append
+            now = self.clock.now().timestamp()
+            status["last_24h"] = self.history.totals(now - 86400, now, resolution="hour")
+        return status
+    
+    def earnings_history(self, resolution: str = "day", hours: Optional[float] = None,
+                         stream: Optional[str] = None) -> List[Dict]:
+        """Bucketed earnings from the history store (most recent ``hours`` if given)"""
+        if self.history is None:
+            return []
+        end = self.clock.now().timestamp()
+        start = end - hours * 3600 if hours else None
+        agg = self.history.aggregate(resolution, start, end + 1, stream=stream)
+        return [
+            {"bucket_start": datetime.fromtimestamp(int(b)).isoformat(), "earnings": float(total), "points": int(n)}
+            for b, total, n in zip(agg["bucket_start"], agg["sum"], agg["count"])
+        ]
     
     def _calculate_monthly_projection(self) -> float:
         """Calculate projected monthly earnings"""
-        return sum(s.monthly_target for s in self.income_streams if s.status == "active")
+        return self.aggregates.active_target
     
     def _calculate_efficiency(self) -> float:
         """Calculate system efficiency"""
-        runtime = datetime.now() - self.start_time
+        runtime = self.clock.now() - self.start_time
         if runtime.total_seconds() == 0:
             return 0.0
         
@@ -175,11 +410,22 @@ class WealthGenerator:
         return (hourly_actual / hourly_target * 100) if hourly_target > 0 else 0
     
     def export_report(self, output_path: str = "wealth_report.json"):
-        """Export detailed earnings report"""
+        """Export the earnings report
+        
+        Per-stream rows and latencies are left out, so the report stays
+        the same size however many streams run; per-stream totals come
+        from the event log summary and history from the time-series store.
+        """
         status = self.get_status()
+        report = {key: value for key, value in status.items() if key != "streams"}
+        report["latency_ms"] = {key: value for key, value in status["latency_ms"].items() if key != "streams"}
+        if self.event_log:
+            # Only records appended since the previous export are read
+            self.event_log.flush()
+            report["event_log"] = self._log_summary.update(self._log_reader).summary()
         
         with open(output_path, 'w') as f:
-            json.dump(status, f, indent=2)
+            json.dump(report, f, indent=2)
         
         logger.info(f"Report exported to {output_path}")
     
@@ -188,67 +434,164 @@ class WealthGenerator:
         logger.info("=" * 60)
         logger.info("Autonomous AI Wealth Generation Ecosystem")
         logger.info("=" * 60)
-        logger.info(f"Starting at: {datetime.now()}")
+        logger.info(f"Starting at: {self.clock.now()}")
         logger.info(f"Monthly target: ${self._calculate_monthly_projection():.2f}")
         logger.info("=" * 60)
         
-        self.initialize_streams()
+        if not (self.checkpoints and self.checkpoints.restore(IncomeStream)):
+            self.initialize_streams()
+        if self.publisher:
+            await self.publisher.start()
+        if self.exporter:
+            await self.exporter.start()
+        if self.config_watcher:
+            await self.config_watcher.start()
         
-        cycle_count = 0
-        end_time = datetime.now() + timedelta(hours=duration_hours) if duration_hours else None
+        end_time = self.clock.now() + timedelta(hours=duration_hours) if duration_hours else None
         
         try:
             while True:
-                cycle_count += 1
-                logger.info(f"\n--- Cycle {cycle_count} ---")
+                self.cycle_count += 1
+                logger.info(f"\n--- Cycle {self.cycle_count} ---")
+                
+                # Config edits land between cycles, never in the middle of one
+                config = self.config_watcher.take() if self.config_watcher else None
+                if config is not None:
+                    await self.apply_config(config)
                 
                 await self.run_income_cycle()
+                if self.checkpoints:
+                    await self.checkpoints.checkpoint()
                 
                 # Print status
                 status = self.get_status()
+                if self.publisher:
+                    self.publisher.publish(status)
                 logger.info(f"Total earnings: ${status['total_earnings']:.2f}")
                 logger.info(f"Efficiency: {status['efficiency']:.1f}%")
                 logger.info(f"Monthly projection: ${status['monthly_projection']:.2f}")
                 
                 # Check if duration limit reached
-                if end_time and datetime.now() >= end_time:
+                if end_time and self.clock.now() >= end_time:
                     logger.info("Duration limit reached")
                     break
                 
                 # Wait before next cycle (1 hour)
-                await asyncio.sleep(3600)
+                await self.clock.sleep(3600)
                 
         except KeyboardInterrupt:
             logger.info("\nShutdown requested...")
         finally:
+            if self.config_watcher:
+                await self.config_watcher.close()
             # Export final report
+            if self.checkpoints:
+                await self.checkpoints.checkpoint(snapshot=True)
+                await self.checkpoints.close()
             self.export_report()
+            await self.strategies.close()
+            if self.publisher:
+                await self.publisher.close()
+            if self.exporter:
+                await self.exporter.close()
             logger.info("\nFinal Statistics:")
-            logger.info(f"Total runtime: {(datetime.now() - self.start_time).total_seconds() / 3600:.2f} hours")
+            logger.info(f"Total runtime: {(self.clock.now() - self.start_time).total_seconds() / 3600:.2f} hours")
             logger.info(f"Total earnings: ${self.total_earnings:.2f}")
-            logger.info(f"Cycles completed: {cycle_count}")
+            logger.info(f"Cycles completed: {self.cycle_count}")
+
+
+def _clear_run_state(args, history):
+    """``--fresh``: drop the checkpoints, earnings history and metering log
+
+    Only the files those stores write are deleted, so pointing
+    --checkpoint-dir or --history at a shared directory is safe.
+    """
+    from checkpoint import CheckpointStore
+    from event_log import remove_segments
+    from strategies.api_monetization import DEFAULT_USAGE_LOG
+
+    if args.checkpoint_dir and os.path.isdir(args.checkpoint_dir):
+        CheckpointStore(args.checkpoint_dir).clear()
+    if history is not None:
+        history.clear()
+    config = load_config(args.config, {})
+    usage_log = config.get("api_monetization", {}).get("usage_log", DEFAULT_USAGE_LOG)
+    if usage_log:
+        remove_segments(usage_log)
+    logger.info("Starting fresh: cleared checkpoints, earnings history and the metering log")
 
 
 def main():
     """Main entry point"""
     import argparse
+    import asyncio
     
     parser = argparse.ArgumentParser(description="Autonomous Wealth Generation System")
     parser.add_argument('--config', '-c', help='Path to configuration file')
     parser.add_argument('--duration', '-d', type=int, help='Run duration in hours')
     parser.add_argument('--report', '-r', action='store_true', help='Generate report and exit')
+    parser.add_argument('--fast-forward', '-f', action='store_true',
+                        help='Run on a simulated clock that skips the waits between cycles')
+    parser.add_argument('--history', default='data/earnings',
+                        help='Directory of the earnings time-series store (empty to disable)')
+    parser.add_argument('--status-socket', default=DEFAULT_SOCKET,
+                        help='Unix socket for monitor.py dashboards (empty to disable)')
+    parser.add_argument('--checkpoint-dir', default='data/checkpoints',
+                        help='Checkpoint directory to resume from and save to (empty to disable)')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Start from zero: clear checkpoints, earnings history and the metering log')
+    parser.add_argument('--no-reload', action='store_true',
+                        help='Do not apply edits to the --config file while running')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help='Serve /metrics and /profile on this local port (0 to disable)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Start the sampling profiler immediately (toggle via /profile/start|stop)')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='Report import time per module for a simulation boot and exit')
     
     args = parser.parse_args()
     
+    if args.startup_profile:
+        from startup import print_profile
+        print_profile("wealth_generator", f"g = wealth_generator.WealthGenerator(config_path={args.config!r}, "
+                                          f"clock=wealth_generator.SimulatedClock()); g.initialize_streams()")
+        return
+    
     # Initialize system
-    generator = WealthGenerator(config_path=args.config)
+    clock = SimulatedClock() if args.fast_forward else None
     
     if args.report:
+        generator = WealthGenerator(config_path=args.config, clock=clock)
         generator.initialize_streams()
         generator.export_report()
     else:
-        # Run the system
-        asyncio.run(generator.run(duration_hours=args.duration))
+        # Run the system, streaming every earning to an append-only log
+        event_log = EventLogWriter(f"logs/wealth_events-{datetime.now():%Y%m%d-%H%M%S}.ndjson")
+        history = None
+        if args.history:
+            from timeseries import TimeSeriesStore
+            history = TimeSeriesStore(args.history)
+        publisher = StatusPublisher(args.status_socket) if args.status_socket else None
+        exporter = MetricsServer(port=args.metrics_port) if args.metrics_port or args.profile else None
+        if args.profile:
+            exporter.profiler.start()
+        if args.fresh:
+            _clear_run_state(args, history)
+        watcher = ConfigWatcher(args.config) if args.config and not args.no_reload else None
+        generator = WealthGenerator(config_path=args.config, clock=clock, event_log=event_log,
+                                    history=history, publisher=publisher, exporter=exporter,
+                                    checkpoint_dir=args.checkpoint_dir or None, config_watcher=watcher)
+        try:
+            asyncio.run(generator.run(duration_hours=args.duration))
+        finally:
+            event_log.close()
+            if history is not None:
+                history.close()
+            if args.profile:
+                profile_path = f"logs/profile-{datetime.now():%Y%m%d-%H%M%S}.txt"
+                with open(profile_path, 'w') as f:
+                    f.write(exporter.profiler.collapsed())
+                logger.info(f"Collapsed stacks written to {profile_path}")
 
 
 if __name__ == "__main__":